@@ -0,0 +1,52 @@
+from robot.api.deco import library, keyword
+from robot.libraries.BuiltIn import BuiltIn
+
+from SSHLibrary.client import SFTPRequestPipeline
+
+
+@library
+class TransferOrder:
+    """Records when remote directories are listed and when files are
+    queued for transferring by the SFTP client of the current connection."""
+
+    def __init__(self):
+        self.events = []
+        self._client = None
+        self._listdir = None
+
+    @keyword
+    def start_recording_transfer_order(self):
+        self.events = []
+        self._client = BuiltIn().get_library_instance('SSH').current.sftp_client
+        transfer = self._client._transfer
+        listdir = self._listdir = SFTPRequestPipeline.listdir
+
+        def recording_transfer(size, method, *args):
+            self.events.append(('queued', args[0]))
+            return transfer(size, method, *args)
+
+        def recording_listdir(pipeline, path, callback):
+            def listed(items):
+                self.events.append(('listed', path))
+                return callback(items)
+            return listdir(pipeline, path, listed)
+
+        self._client._transfer = recording_transfer
+        SFTPRequestPipeline.listdir = recording_listdir
+
+    @keyword
+    def stop_recording_transfer_order(self):
+        if self._client:
+            del self._client._transfer
+            SFTPRequestPipeline.listdir = self._listdir
+            self._client = None
+
+    @keyword
+    def transfers_should_be_queued_before_walk_finished(self):
+        kinds = [kind for kind, _ in self.events]
+        if 'queued' not in kinds or 'listed' not in kinds:
+            raise AssertionError(f'Nothing was recorded: {self.events}')
+        last_listed = len(kinds) - 1 - kinds[::-1].index('listed')
+        if kinds.index('queued') > last_listed:
+            raise AssertionError(f'Transfers were queued only after all directories were listed: '
+                                 f'{self.events}')
@@ -0,0 +1,41 @@
+#!/usr/bin/env python
+
+"""Removing ANSI escape sequences from coloured log output with non-ASCII
+text. Compares the incremental AnsiFilter with the regular expression and
+unicode-escape round trip the library used before it. Needs no server."""
+import argparse
+import re
+
+from common import parse_args, timed
+
+
+def remove_escapes_before(output):
+    ansi_escape = re.compile(r"(?:\x1B[@-_]|[\x80-\x9F])[0-?]*[ -/]*[@-~]", flags=re.IGNORECASE)
+    output = ansi_escape.sub("", output)
+    return (f"{output!r}")[1:-1].encode().decode("unicode-escape")
+
+
+def remove_escapes(text, chunk_size):
+    from SSHLibrary.client import AnsiFilter
+    ansi_filter = AnsiFilter()
+    return ''.join(ansi_filter.feed(text[i:i + chunk_size]) for i in range(0, len(text), chunk_size))
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--lines', type=int, default=50000)
+    parser.add_argument('--chunk-size', type=int, default=65536)
+    args = parse_args(parser)
+    line = '\x1b[32m2026-10-19\x1b[0m \x1b[1mINFO\x1b[0m service started on port 8080, user=äöü\r\n'
+    text = line * args.lines
+    print(f'{len(text) / 1e6:.1f} M characters')
+    before = remove_escapes_before(text)
+    after = remove_escapes(text, args.chunk_size)
+    print(f'before: {timed(remove_escapes_before, text) * 1000:.0f} ms, '
+          f'non-ASCII text preserved: {"äöü" in before}')
+    print(f'AnsiFilter, {args.chunk_size} character chunks: '
+          f'{timed(remove_escapes, text, args.chunk_size) * 1000:.0f} ms, '
+          f'non-ASCII text preserved: {"äöü" in after}')
+    ascii_text = text.replace('äöü', 'aou')
+    print('same result apart from the encoding:',
+          remove_escapes(ascii_text, args.chunk_size) == remove_escapes_before(ascii_text))
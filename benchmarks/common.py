@@ -0,0 +1,103 @@
+"""Helpers shared by the benchmark scripts.
+
+SSHLibrary is imported from ``PYTHONPATH``, so the same script can measure
+the working tree (``PYTHONPATH=src``) and an older checkout.
+"""
+import argparse
+import collections
+import os
+import time
+
+import paramiko
+from paramiko.sftp import CMD_NAMES
+
+
+REMOTE_DIR = 'sshlibrary-benchmark'
+
+
+def argument_parser(description):
+    """Returns a parser with the connection options of the benchmarks.
+
+    The defaults match the test Docker image published to local port 2222
+    and accessed through ``latency_proxy.py`` on port 2223.
+    """
+    parser = argparse.ArgumentParser(description=description)
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=2223)
+    parser.add_argument('--username', default='test')
+    parser.add_argument('--password', default='test')
+    parser.add_argument('--prompt', default='$ ')
+    return parser
+
+
+def parse_args(parser):
+    args = parser.parse_args()
+    import SSHLibrary
+    print(f'SSHLibrary {SSHLibrary.__version__} from {SSHLibrary.__file__}')
+    return args
+
+
+def connect(args, **config):
+    """Opens a connection and logs in. `config` is passed to `SSHClient`."""
+    from SSHLibrary.client import SSHClient
+    client = SSHClient(args.host, port=args.port, prompt=args.prompt, **config)
+    client.login(args.username, args.password)
+    return client
+
+
+def timed(function, *args, **kwargs):
+    """Calls `function` and returns its elapsed wall clock time in seconds."""
+    start = time.perf_counter()
+    function(*args, **kwargs)
+    return time.perf_counter() - start
+
+
+def best_of(runs, function, *args, **kwargs):
+    return min(timed(function, *args, **kwargs) for _ in range(runs))
+
+
+def create_tree(directory, trees=10, files=20, size=100):
+    """Creates `trees` directories three levels deep under `directory`,
+    each with `files` files of `size` bytes in the deepest one."""
+    for tree in range(trees):
+        deepest = os.path.join(directory, f'd{tree}', 'sub', 'deeper')
+        os.makedirs(deepest)
+        for index in range(files):
+            with open(os.path.join(deepest, f'f{index}.txt'), 'wb') as output:
+                output.write(b'x' * size)
+    return directory
+
+
+class RequestCounter(object):
+    """Counts the SFTP requests sent by all paramiko SFTP clients.
+
+    Usage::
+
+        with RequestCounter() as requests:
+            client.get_directory(...)
+        print(requests.total(), requests.counts)
+    """
+
+    def __init__(self):
+        self.counts = collections.Counter()
+        self._original = None
+
+    def __enter__(self):
+        original = self._original = paramiko.SFTPClient._async_request
+        counts = self.counts
+
+        def counting(sftp, fileobj, request_type, *args):
+            counts[CMD_NAMES.get(request_type, request_type)] += 1
+            return original(sftp, fileobj, request_type, *args)
+
+        paramiko.SFTPClient._async_request = counting
+        return self
+
+    def __exit__(self, *exc_info):
+        paramiko.SFTPClient._async_request = self._original
+
+    def total(self, exclude=()):
+        return sum(count for name, count in self.counts.items() if name not in exclude)
+
+    def __str__(self):
+        return ', '.join(f'{name} {count}' for name, count in self.counts.most_common())
@@ -0,0 +1,28 @@
+#!/usr/bin/env python
+
+"""SFTP requests and time of walking a remote tree of empty directories
+and symbolic links to them with a recursive Get Directory."""
+import os
+import tempfile
+
+from common import argument_parser, parse_args, connect, timed, RequestCounter, REMOTE_DIR
+
+
+if __name__ == '__main__':
+    parser = argument_parser(__doc__)
+    parser.add_argument('--directories', type=int, default=10,
+                        help='top level directories, each with the same number of subdirectories')
+    parser.add_argument('--links', type=int, default=50)
+    args = parse_args(parser)
+    client = connect(args)
+    last = args.directories - 1
+    client.execute_command(f'rm -rf {REMOTE_DIR}; mkdir -p {REMOTE_DIR}/d{{0..{last}}}/s{{0..{last}}}; '
+                           f'for i in $(seq 0 {args.links - 1}); do '
+                           f'ln -s d$((i % {args.directories})) {REMOTE_DIR}/l$i; done')
+    with tempfile.TemporaryDirectory() as directory:
+        with RequestCounter() as requests:
+            elapsed = timed(client.get_directory, REMOTE_DIR, os.path.join(directory, 'walk'), recursive=True)
+    print(f'{args.directories * (args.directories + 1)} directories and {args.links} links: '
+          f'{elapsed:.2f} s, {requests.counts["opendir"]} listings ({requests})')
+    client.execute_command(f'rm -rf {REMOTE_DIR}')
+    client.close()
@@ -0,0 +1,34 @@
+#!/usr/bin/env python
+
+"""SFTP requests and time of a recursive Get Directory with many small
+files in nested directories."""
+import filecmp
+import os
+import tempfile
+
+from common import argument_parser, parse_args, connect, timed, create_tree, RequestCounter, REMOTE_DIR
+
+
+if __name__ == '__main__':
+    parser = argument_parser(__doc__)
+    parser.add_argument('--parallel', type=int, nargs='+', default=[1, 4])
+    parser.add_argument('--trees', type=int, default=10)
+    parser.add_argument('--files', type=int, default=20, help='files per tree')
+    args = parse_args(parser)
+    client = connect(args)
+    client.execute_command(f'rm -rf {REMOTE_DIR}; mkdir {REMOTE_DIR}')
+    with tempfile.TemporaryDirectory() as directory:
+        source = create_tree(os.path.join(directory, 'tree'), args.trees, args.files)
+        client.put_directory(source, REMOTE_DIR, recursive=True, parallel_transfers=8)
+        for parallel in args.parallel:
+            destination = os.path.join(directory, f'parallel{parallel}')
+            with RequestCounter() as requests:
+                elapsed = timed(client.get_directory, f'{REMOTE_DIR}/tree', destination,
+                                recursive=True, parallel_transfers=parallel)
+            assert not filecmp.dircmp(os.path.join(source, 'd0', 'sub', 'deeper'),
+                                      os.path.join(destination, 'd0', 'sub', 'deeper')).diff_files
+            files = args.trees * args.files
+            print(f'parallel_transfers={parallel}: {files} files {elapsed:.2f} s, '
+                  f'{requests.total() / files:.1f} requests per file ({requests})')
+    client.execute_command(f'rm -rf {REMOTE_DIR}')
+    client.close()
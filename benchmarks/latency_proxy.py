@@ -0,0 +1,68 @@
+#!/usr/bin/env python
+
+"""usage: python benchmarks/latency_proxy.py [options]
+
+TCP proxy that delays all data passing through it, in both directions,
+by a fixed time. Used to measure SSHLibrary over a slow link against a
+local SSH server:
+
+    python benchmarks/latency_proxy.py --port 2223 --target-port 2222 --delay 0.02
+
+Connections to port 2223 are then forwarded to port 2222 so that each
+direction is 20 ms late, i.e. every round trip takes 40 ms longer.
+"""
+import argparse
+import asyncio
+
+
+async def delayed_pipe(reader, writer, delay):
+    loop = asyncio.get_running_loop()
+    queue = asyncio.Queue()
+
+    async def send():
+        while True:
+            due, data = await queue.get()
+            wait = due - loop.time()
+            if wait > 0:
+                await asyncio.sleep(wait)
+            if not data:
+                writer.close()
+                return
+            writer.write(data)
+            await writer.drain()
+
+    sender = asyncio.create_task(send())
+    while True:
+        data = await reader.read(65536)
+        await queue.put((loop.time() + delay, data))
+        if not data:
+            break
+    await sender
+
+
+async def serve(port, target_host, target_port, delay):
+    async def forward(client_reader, client_writer):
+        server_reader, server_writer = await asyncio.open_connection(target_host, target_port)
+        await asyncio.gather(delayed_pipe(client_reader, server_writer, delay),
+                             delayed_pipe(server_reader, client_writer, delay),
+                             return_exceptions=True)
+
+    server = await asyncio.start_server(forward, '127.0.0.1', port)
+    async with server:
+        await server.serve_forever()
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Delays TCP traffic to an SSH server.')
+    parser.add_argument('--port', type=int, default=2223, help='local port to listen to')
+    parser.add_argument('--target-host', default='127.0.0.1')
+    parser.add_argument('--target-port', type=int, default=2222)
+    parser.add_argument('--delay', type=float, default=0.02,
+                        help='delay in seconds added to each direction')
+    args = parser.parse_args()
+    print(f'Forwarding port {args.port} to {args.target_host}:{args.target_port} '
+          f'with {args.delay:g} s delay.')
+    try:
+        asyncio.run(serve(args.port, args.target_host, args.target_port, args.delay))
+    except KeyboardInterrupt:
+        pass
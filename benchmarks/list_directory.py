@@ -0,0 +1,22 @@
+#!/usr/bin/env python
+
+"""SFTP requests and time of listing a directory with files, directories
+and symbolic links to both."""
+from common import argument_parser, parse_args, connect, timed, RequestCounter, REMOTE_DIR
+
+
+if __name__ == '__main__':
+    parser = argument_parser(__doc__)
+    parser.add_argument('--entries', type=int, default=100, help='entries of each kind')
+    args = parse_args(parser)
+    client = connect(args)
+    client.execute_command(f'rm -rf {REMOTE_DIR}; mkdir {REMOTE_DIR}; cd {REMOTE_DIR}; '
+                           f'for i in $(seq 1 {args.entries}); do '
+                           f'touch f$i; ln -s f$i lf$i; mkdir d$i; ln -s d$i ld$i; done')
+    for method in ('list_files_in_dir', 'list_dirs_in_dir', 'list_dir'):
+        for run in ('first', 'second'):
+            with RequestCounter() as requests:
+                elapsed = timed(getattr(client, method), REMOTE_DIR, absolute=True)
+            print(f'{method}, {run} run: {elapsed:.2f} s ({requests})')
+    client.execute_command(f'rm -rf {REMOTE_DIR}')
+    client.close()
@@ -0,0 +1,24 @@
+#!/usr/bin/env python
+
+"""Logging in without a prompt, reading the server output with a fixed
+delay versus until the output has been quiet for a while."""
+from common import argument_parser, parse_args, best_of
+
+
+def login(args, **options):
+    from SSHLibrary.client import SSHClient
+    client = SSHClient(args.host, port=args.port)
+    client.login(args.username, args.password, **options)
+    client.close()
+
+
+if __name__ == '__main__':
+    parser = argument_parser(__doc__)
+    parser.add_argument('--delay', default='0.5 seconds')
+    parser.add_argument('--quiet-period', default='0.2 seconds')
+    parser.add_argument('--runs', type=int, default=3)
+    args = parse_args(parser)
+    for options in ({'delay': args.delay}, {'quiet_period': args.quiet_period}):
+        elapsed = best_of(args.runs, login, args, **options)
+        name, value = next(iter(options.items()))
+        print(f'login with {name}={value}: {elapsed * 1000:.0f} ms')
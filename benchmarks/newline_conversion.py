@@ -0,0 +1,60 @@
+#!/usr/bin/env python
+
+"""Converting the newlines of a large CRLF text file in blocks with
+NewlineConverter, compared with the regular expression used before it.
+Also checks that converting randomly split input gives the same result
+as converting it at once. Needs no server.
+
+The effect on uploads is measured by ``put_file_throughput.py``.
+"""
+import argparse
+import random
+import re
+
+from common import parse_args, timed
+from put_file_throughput import crlf_text
+
+
+def convert_before(data, newline, block_size):
+    return [re.sub(br'(\r\n|\r|\n)', newline, data[i:i + block_size])
+            for i in range(0, len(data), block_size)]
+
+
+def convert(data, newline, block_size):
+    from SSHLibrary.client import NewlineConverter
+    converter = NewlineConverter(newline)
+    view = memoryview(data)
+    blocks = [converter.convert(view[i:i + block_size]) for i in range(0, len(data), block_size)]
+    return blocks + [converter.flush()]
+
+
+def check_split_input(inputs):
+    from SSHLibrary.client import NewlineConverter
+    for _ in range(inputs):
+        data = bytes(random.choice(b'ab\r\n') for _ in range(random.randint(0, 40)))
+        newline = random.choice([b'\n', b'\r\n'])
+        converter = NewlineConverter(newline)
+        output, position = b'', 0
+        while position < len(data):
+            end = position + random.randint(1, 5)
+            output += converter.convert(memoryview(data)[position:end])
+            position = end
+        output += converter.flush()
+        assert output == re.sub(br'(\r\n|\r|\n)', newline, data), (data, newline, output)
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--text-lines', type=int, default=400000)
+    parser.add_argument('--block-size', type=int, default=262144)
+    parser.add_argument('--checked-inputs', type=int, default=3000)
+    args = parse_args(parser)
+    data = crlf_text(args.text_lines)
+    print(f'{len(data) / 1e6:.0f} MB of CRLF text, {args.block_size} byte blocks')
+    for newline in (b'\n', b'\r\n'):
+        before = timed(convert_before, data, newline, args.block_size)
+        after = timed(convert, data, newline, args.block_size)
+        print(f'to {newline!r}: regular expression {before * 1000:.0f} ms, NewlineConverter {after * 1000:.0f} ms')
+    random.seed(5)
+    check_split_input(args.checked_inputs)
+    print(f'{args.checked_inputs} randomly split inputs converted correctly')
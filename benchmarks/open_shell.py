@@ -0,0 +1,26 @@
+#!/usr/bin/env python
+
+"""Getting a second interactive shell by opening a new connection and
+logging in, versus opening another shell on an existing connection."""
+from common import argument_parser, parse_args, connect, timed
+
+
+def new_connection(args):
+    connect(args).close()
+
+
+def new_shell(client, name):
+    client.open_shell(name)
+    client.read_until_prompt()
+
+
+if __name__ == '__main__':
+    parser = argument_parser(__doc__)
+    parser.add_argument('--shells', type=int, default=5)
+    args = parse_args(parser)
+    elapsed = sum(timed(new_connection, args) for _ in range(args.shells))
+    print(f'new connection with login: {elapsed / args.shells * 1000:.0f} ms')
+    client = connect(args)
+    elapsed = sum(timed(new_shell, client, f'shell{i}') for i in range(args.shells))
+    print(f'open shell and read prompt: {elapsed / args.shells * 1000:.0f} ms')
+    client.close()
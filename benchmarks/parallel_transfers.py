@@ -0,0 +1,46 @@
+#!/usr/bin/env python
+
+"""Put Directory and Get Directory of a mix of large and small files with
+different numbers of parallel transfers, and the SFTP requests of a Get
+File with a glob pattern."""
+import filecmp
+import os
+import random
+import tempfile
+
+from common import argument_parser, parse_args, connect, timed, RequestCounter, REMOTE_DIR
+
+
+def create_files(directory, large, small):
+    random.seed(1)
+    for index in range(large + small):
+        size = 2000000 if index < large else random.randint(1000, 50000)
+        with open(os.path.join(directory, f'f{index:02d}.bin'), 'wb') as output:
+            output.write(os.urandom(size))
+
+
+if __name__ == '__main__':
+    parser = argument_parser(__doc__)
+    parser.add_argument('--parallel', type=int, nargs='+', default=[1, 4, 8])
+    parser.add_argument('--large', type=int, default=4, help='number of 2 MB files')
+    parser.add_argument('--small', type=int, default=36, help='number of 1-50 KB files')
+    args = parse_args(parser)
+    client = connect(args)
+    with tempfile.TemporaryDirectory() as directory:
+        source = os.path.join(directory, 'source')
+        os.mkdir(source)
+        create_files(source, args.large, args.small)
+        for parallel in args.parallel:
+            client.execute_command(f'rm -rf {REMOTE_DIR}')
+            put = timed(client.put_directory, source, REMOTE_DIR, parallel_transfers=parallel)
+            destination = os.path.join(directory, f'parallel{parallel}')
+            get = timed(client.get_directory, REMOTE_DIR, destination, parallel_transfers=parallel)
+            assert not filecmp.dircmp(source, destination).diff_files
+            print(f'parallel_transfers={parallel}: put {put:.2f} s, get {get:.2f} s')
+        destination = os.path.join(directory, 'pattern') + os.sep
+        with RequestCounter() as requests:
+            elapsed = timed(client.get_file, f'{REMOTE_DIR}/*.bin', destination, parallel_transfers=4)
+        print(f'Get File with a pattern, parallel_transfers=4: {elapsed:.2f} s, '
+              f'{requests.counts["stat"]} STAT requests')
+    client.execute_command(f'rm -rf {REMOTE_DIR}')
+    client.close()
@@ -0,0 +1,27 @@
+#!/usr/bin/env python
+
+"""SFTP requests and time of Put Directory with many small files in
+nested directories, to a new remote tree and over an existing one."""
+import os
+import tempfile
+
+from common import argument_parser, parse_args, connect, timed, create_tree, RequestCounter, REMOTE_DIR
+
+
+if __name__ == '__main__':
+    parser = argument_parser(__doc__)
+    parser.add_argument('--trees', type=int, default=10)
+    parser.add_argument('--files', type=int, default=20, help='files per tree')
+    args = parse_args(parser)
+    client = connect(args)
+    client.execute_command(f'rm -rf {REMOTE_DIR}; mkdir {REMOTE_DIR}')
+    with tempfile.TemporaryDirectory() as directory:
+        source = create_tree(os.path.join(directory, 'tree'), args.trees, args.files)
+        files = args.trees * args.files
+        for name in ('new tree', 'overwrite'):
+            with RequestCounter() as requests:
+                elapsed = timed(client.put_directory, source, REMOTE_DIR, recursive=True)
+            print(f'{name}: {files} files {elapsed:.2f} s, '
+                  f'{requests.total(exclude=("write",)) / files:.1f} requests per file without writes ({requests})')
+    client.execute_command(f'rm -rf {REMOTE_DIR}')
+    client.close()
@@ -0,0 +1,42 @@
+#!/usr/bin/env python
+
+"""Put File throughput of a large binary file and of a large CRLF text
+file converted to LF."""
+import os
+import random
+import tempfile
+
+from common import argument_parser, parse_args, connect, best_of, REMOTE_DIR
+
+
+def crlf_text(lines):
+    random.seed(2)
+    words = [b'alpha', b'beta', b'gamma', b'delta']
+    return b''.join(b' '.join(random.choices(words, k=8)) + b'\r\n' for _ in range(lines))
+
+
+if __name__ == '__main__':
+    parser = argument_parser(__doc__)
+    parser.add_argument('--binary-size', type=int, default=32000000)
+    parser.add_argument('--text-lines', type=int, default=400000)
+    parser.add_argument('--block-size', type=int, help='block_size of the connection')
+    parser.add_argument('--runs', type=int, default=2)
+    args = parse_args(parser)
+    config = {'block_size': args.block_size} if args.block_size else {}
+    client = connect(args, **config)
+    client.execute_command(f'mkdir -p {REMOTE_DIR}')
+    destination = f'{REMOTE_DIR}/upload'
+    with tempfile.TemporaryDirectory() as directory:
+        binary = os.path.join(directory, 'random.bin')
+        with open(binary, 'wb') as output:
+            output.write(os.urandom(args.binary_size))
+        text = os.path.join(directory, 'text.txt')
+        with open(text, 'wb') as output:
+            output.write(crlf_text(args.text_lines))
+        for path, newline in ((binary, ''), (text, 'LF')):
+            elapsed = best_of(args.runs, client.put_file, path, destination, newline=newline)
+            size = int(client.execute_command(f'stat -c %s {destination}')[0])
+            print(f'{os.path.getsize(path) / 1e6:.0f} MB {os.path.basename(path)}, '
+                  f'newline={newline or "unchanged"}: {elapsed:.2f} s, {size / elapsed / 1e6:.1f} MB/s')
+    client.execute_command(f'rm -rf {REMOTE_DIR}')
+    client.close()
@@ -0,0 +1,40 @@
+#!/usr/bin/env python
+
+"""Reading the output of ``cat`` on a large text file with non-ASCII
+characters, one character at a time and with Read Until."""
+import os
+import tempfile
+
+from common import argument_parser, parse_args, connect, timed, REMOTE_DIR
+
+
+def read_chars(client, end):
+    tail = ''
+    while not tail.endswith(end):
+        char = client.read_char()
+        if char:
+            tail = (tail + char)[-len(end):]
+
+
+if __name__ == '__main__':
+    parser = argument_parser(__doc__)
+    parser.add_argument('--lines', type=int, default=12000)
+    args = parse_args(parser)
+    client = connect(args, timeout=600)
+    with tempfile.TemporaryDirectory() as directory:
+        path = os.path.join(directory, 'output.txt')
+        with open(path, 'w', encoding='utf8') as output:
+            output.writelines(f'line {i} äöå {"x" * 60}\n' for i in range(args.lines))
+        print(f'{os.path.getsize(path) / 1e6:.1f} MB of output')
+        client.execute_command(f'mkdir -p {REMOTE_DIR}')
+        client.put_file(path, f'{REMOTE_DIR}/output.txt')
+    command = f'cat {REMOTE_DIR}/output.txt; echo "EN""D"'
+    client.write(command, add_newline=True)
+    client.read_until('\n')
+    print(f'read char by char: {timed(read_chars, client, "END"):.2f} s')
+    client.read_until_prompt()
+    client.write(command, add_newline=True)
+    client.read_until('\n')
+    print(f'read until: {timed(client.read_until, "END"):.3f} s')
+    client.execute_command(f'rm -rf {REMOTE_DIR}')
+    client.close()
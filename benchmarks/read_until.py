@@ -0,0 +1,96 @@
+#!/usr/bin/env python
+
+"""Read Until variants on large console output followed by a prompt.
+
+The output is served by a fake channel in chunks that arrive one at a
+time, so no server is needed and the results do not depend on the
+network.
+"""
+import argparse
+import os
+
+from common import parse_args, timed
+
+
+PROMPT = 'test@host $ '
+PROMPT_REGEXP = r'[a-z]+@[a-z]+ \$ '
+
+
+class ArrivingChannel(object):
+    """Fake paramiko channel on which the next chunk of `data` arrives
+    only after the previous one has been received."""
+
+    closed = eof_received = False
+
+    def __init__(self, data, chunk_size):
+        self._chunks = [data[i:i + chunk_size] for i in range(0, len(data), chunk_size)][::-1]
+        self._arrived = True
+        self._readable, writable = os.pipe()
+        os.write(writable, b'x')
+
+    def fileno(self):
+        return self._readable
+
+    def recv_ready(self):
+        if self._chunks and not self._arrived:
+            self._arrived = True
+            return False
+        return bool(self._chunks)
+
+    def recv(self, size):
+        chunk = self._chunks.pop()
+        if len(chunk) > size:
+            self._chunks.append(chunk[size:])
+            return chunk[:size]
+        self._arrived = False
+        return chunk
+
+    def resize_pty(self, width, height):
+        pass
+
+    def sendall(self, data):
+        pass
+
+    def close(self):
+        os.close(self._readable)
+
+
+class FakeClient(object):
+
+    def __init__(self, channel):
+        self._channel = channel
+
+    def invoke_shell(self, *args):
+        return self._channel
+
+
+def console_output(size):
+    line = 'x' * 60 + ' some console output 123\n'
+    return (line * (size // len(line)) + PROMPT).encode('ascii')
+
+
+def read(kind, data, chunk_size):
+    from SSHLibrary.client import SSHClient
+    client = SSHClient('localhost', timeout='10 minutes', prompt=f'REGEXP:{PROMPT_REGEXP}')
+    channel = ArrivingChannel(data, chunk_size)
+    client.client = FakeClient(channel)
+    if kind == 'literal':
+        output = client.read_until(PROMPT)
+    elif kind == 'prompt regexp':
+        output = client.read_until_prompt()
+    else:
+        output = client.read_until_regexp_with_prefix(PROMPT_REGEXP, 'prefix')
+    assert output.endswith(PROMPT), output[-20:]
+    channel.close()
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--sizes', type=float, nargs='+', default=[1, 4],
+                        help='output sizes in MiB')
+    parser.add_argument('--chunk-size', type=int, default=4096)
+    args = parse_args(parser)
+    for size in args.sizes:
+        data = console_output(int(size * 2 ** 20))
+        for kind in ('literal', 'prompt regexp', 'with prefix'):
+            print(f'{size:g} MiB, {kind}: {timed(read, kind, data, args.chunk_size):.2f} s')
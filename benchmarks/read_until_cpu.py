@@ -0,0 +1,20 @@
+#!/usr/bin/env python
+
+"""CPU time used by Read Until while waiting for output that arrives
+only after a few seconds."""
+import time
+
+from common import argument_parser, parse_args, connect
+
+
+if __name__ == '__main__':
+    parser = argument_parser(__doc__)
+    parser.add_argument('--wait', type=float, default=3, help='seconds to wait for the output')
+    args = parse_args(parser)
+    client = connect(args, timeout=args.wait + 10)
+    client.write(f'sleep {args.wait:g}; echo "do""ne"', add_newline=True)
+    client.read_until('\n')
+    wall, cpu = time.perf_counter(), time.process_time()
+    client.read_until('done')
+    print(f'waited {time.perf_counter() - wall:.2f} s, CPU {time.process_time() - cpu:.2f} s')
+    client.close()
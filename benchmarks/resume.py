@@ -0,0 +1,43 @@
+#!/usr/bin/env python
+
+"""Put File and Get File resuming a half transferred large file compared
+with transferring it in full."""
+import hashlib
+import os
+import tempfile
+
+from common import argument_parser, parse_args, connect, timed, REMOTE_DIR
+
+
+def sha256(path):
+    with open(path, 'rb') as source:
+        return hashlib.sha256(source.read()).hexdigest()
+
+
+if __name__ == '__main__':
+    parser = argument_parser(__doc__)
+    parser.add_argument('--size', type=int, default=50000000)
+    parser.add_argument('--resume', default='checksum', help='value of the resume argument')
+    args = parse_args(parser)
+    client = connect(args)
+    client.execute_command(f'rm -rf {REMOTE_DIR}; mkdir {REMOTE_DIR}')
+    half = args.size // 2
+    with tempfile.TemporaryDirectory() as directory:
+        source = os.path.join(directory, 'source.bin')
+        with open(source, 'wb') as output:
+            output.write(os.urandom(args.size))
+        checksum = sha256(source)
+        full = timed(client.put_file, source, f'{REMOTE_DIR}/full.bin')
+        client.execute_command(f'head -c {half} {REMOTE_DIR}/full.bin > {REMOTE_DIR}/partial.bin')
+        resumed = timed(client.put_file, source, f'{REMOTE_DIR}/partial.bin', resume=args.resume)
+        assert client.execute_command(f'sha256sum {REMOTE_DIR}/partial.bin')[0].split()[0] == checksum
+        print(f'put: full {full:.2f} s, resumed from half {resumed:.2f} s')
+        partial = os.path.join(directory, 'partial.bin')
+        with open(source, 'rb') as data, open(partial, 'wb') as output:
+            output.write(data.read(half))
+        resumed = timed(client.get_file, f'{REMOTE_DIR}/full.bin', partial, resume=args.resume)
+        assert sha256(partial) == checksum
+        full = timed(client.get_file, f'{REMOTE_DIR}/full.bin', os.path.join(directory, 'full.bin'))
+        print(f'get: full {full:.2f} s, resumed from half {resumed:.2f} s')
+    client.execute_command(f'rm -rf {REMOTE_DIR}')
+    client.close()
@@ -0,0 +1,34 @@
+#!/usr/bin/env python
+
+"""Put File and Get File of a large file as a whole and split into
+segments transferred over several SFTP sessions."""
+import filecmp
+import os
+import tempfile
+
+from common import argument_parser, parse_args, connect, timed, REMOTE_DIR
+
+
+if __name__ == '__main__':
+    parser = argument_parser(__doc__)
+    parser.add_argument('--size', type=int, default=200000000)
+    parser.add_argument('--segments', type=int, nargs='+', default=[4, 8])
+    args = parse_args(parser)
+    client = connect(args)
+    client.execute_command(f'rm -rf {REMOTE_DIR}; mkdir {REMOTE_DIR}')
+    destination = f'{REMOTE_DIR}/large.bin'
+    with tempfile.TemporaryDirectory() as directory:
+        source = os.path.join(directory, 'source.bin')
+        with open(source, 'wb') as output:
+            for _ in range(0, args.size, 2 ** 20):
+                output.write(os.urandom(min(2 ** 20, args.size - output.tell())))
+        for segments in [None] + args.segments:
+            client.execute_command(f'rm -f {destination}')
+            put = timed(client.put_file, source, destination, segments=segments)
+            copy = os.path.join(directory, f'segments{segments}.bin')
+            get = timed(client.get_file, destination, copy, segments=segments)
+            assert filecmp.cmp(source, copy, shallow=False)
+            os.remove(copy)
+            print(f'segments={segments or "whole file"}: put {put:.2f} s, get {get:.2f} s')
+    client.execute_command(f'rm -rf {REMOTE_DIR}')
+    client.close()
@@ -0,0 +1,49 @@
+#!/usr/bin/env python
+
+"""Time and peak traced memory of a Read Until waiting through megabytes
+of output that has no match before its end marker. Compares an unlimited
+shell buffer, an asciicast transcript and ``max_buffer_size``."""
+import os
+import tempfile
+import time
+import tracemalloc
+
+from common import argument_parser, parse_args, connect, REMOTE_DIR
+
+
+def read_through(args, command, transcript=None, max_buffer_size=None):
+    client = connect(args, timeout=60, max_buffer_size=max_buffer_size)
+    if transcript:
+        client.start_transcript(transcript)
+    client.write(command, add_newline=True)
+    client.read_until('\n')
+    tracemalloc.start()
+    start = time.perf_counter()
+    client.read_until('NO_MATCH_END')
+    elapsed = time.perf_counter() - start
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    client.close()
+    return elapsed, peak
+
+
+if __name__ == '__main__':
+    parser = argument_parser(__doc__)
+    parser.add_argument('--max-buffer-size', type=int, default=65536)
+    args = parse_args(parser)
+    client = connect(args)
+    with tempfile.TemporaryDirectory() as directory:
+        path = os.path.join(directory, 'output.txt')
+        with open(path, 'w', encoding='utf8') as output:
+            output.writelines(f'line {i} äöå {"x" * 60}\n' for i in range(12000))
+        client.execute_command(f'mkdir -p {REMOTE_DIR}')
+        client.put_file(path, f'{REMOTE_DIR}/output.txt')
+        command = f'for i in 1 2 3 4 5; do cat {REMOTE_DIR}/output.txt; done; echo "NO_""MATCH_END"'
+        print(f'{os.path.getsize(path) * 5 / 1e6:.1f} MB of output')
+        for name, options in (('no limit', {}),
+                              ('asciicast transcript', {'transcript': os.path.join(directory, 'shell.cast')}),
+                              (f'max_buffer_size={args.max_buffer_size}', {'max_buffer_size': args.max_buffer_size})):
+            elapsed, peak = read_through(args, command, **options)
+            print(f'{name}: {elapsed:.2f} s, {peak / 2 ** 20:.1f} MiB peak')
+    client.execute_command(f'rm -rf {REMOTE_DIR}')
+    client.close()
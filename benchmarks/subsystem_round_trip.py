@@ -0,0 +1,34 @@
+#!/usr/bin/env python
+
+"""Round trip of one framed message to a subsystem, opening a channel
+for every request versus keeping the subsystem open.
+
+Needs the ``echo`` subsystem of the test Docker image
+(``Subsystem echo cat`` in sshd_config).
+"""
+from common import argument_parser, parse_args, connect, timed
+
+
+def channel_per_request(client, name):
+    client.open_subsystem(name)
+    round_trip(client, name)
+    client.close_subsystem(name)
+
+
+def round_trip(client, name):
+    client.send_subsystem_message(name, '<get/>')
+    client.read_subsystem_message(name)
+
+
+if __name__ == '__main__':
+    parser = argument_parser(__doc__)
+    parser.add_argument('--subsystem', default='echo')
+    parser.add_argument('--requests', type=int, default=10)
+    args = parse_args(parser)
+    client = connect(args)
+    elapsed = sum(timed(channel_per_request, client, args.subsystem) for _ in range(args.requests))
+    print(f'channel per request: {elapsed / args.requests * 1000:.0f} ms')
+    client.open_subsystem(args.subsystem)
+    elapsed = sum(timed(round_trip, client, args.subsystem) for _ in range(args.requests))
+    print(f'persistent channel:  {elapsed / args.requests * 1000:.0f} ms')
+    client.close()
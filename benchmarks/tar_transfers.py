@@ -0,0 +1,54 @@
+#!/usr/bin/env python
+
+"""Put Directory and Get Directory of many small files over SFTP and as a
+tar stream with ``scp=TAR``, with and without compression."""
+import os
+import tempfile
+
+from common import argument_parser, parse_args, connect, timed, create_tree, REMOTE_DIR
+
+
+def create_logs(directory, directories=50, files=100):
+    for index in range(directories):
+        subdirectory = os.path.join(directory, f'd{index}')
+        os.makedirs(subdirectory)
+        for number in range(files):
+            with open(os.path.join(subdirectory, f'f{number}.log'), 'w') as output:
+                output.write(f'line {index} {number} some log text here\n' * 60)
+    return directory
+
+
+def size_of(directory):
+    return sum(os.path.getsize(os.path.join(root, name))
+               for root, _, names in os.walk(directory) for name in names)
+
+
+def transfer(client, source, destination, modes):
+    name = os.path.basename(source)
+    print(f'{name}: {sum(len(names) for _, _, names in os.walk(source))} files, '
+          f'{size_of(source) / 1e6:.2f} MB')
+    for scp, compression in modes:
+        client.execute_command(f'rm -rf {REMOTE_DIR}; mkdir {REMOTE_DIR}')
+        put = timed(client.put_directory, source, REMOTE_DIR, recursive=True,
+                    scp=scp, compression=compression)
+        target = os.path.join(destination, f'{name}-{scp}-{compression}')
+        get = timed(client.get_directory, f'{REMOTE_DIR}/{name}', target, recursive=True,
+                    scp=scp, compression=compression)
+        assert size_of(target) == size_of(source)
+        print(f'  scp={scp}, compression={compression}: put {put:.2f} s, get {get:.2f} s')
+
+
+if __name__ == '__main__':
+    parser = argument_parser(__doc__)
+    parser.add_argument('--skip-large', action='store_true',
+                        help='skip the tree of 5000 files, which is transferred only as tar')
+    args = parse_args(parser)
+    client = connect(args)
+    with tempfile.TemporaryDirectory() as directory:
+        tar_modes = [('TAR', None), ('TAR', 'gzip')]
+        transfer(client, create_tree(os.path.join(directory, 'tree')), directory,
+                 [('OFF', None)] + tar_modes)
+        if not args.skip_large:
+            transfer(client, create_logs(os.path.join(directory, 'logs')), directory, tar_modes)
+    client.execute_command(f'rm -rf {REMOTE_DIR}')
+    client.close()
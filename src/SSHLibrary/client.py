@@ -13,21 +13,41 @@
 #  See the License for the specific language governing permissions and
 #  limitations under the License.
 
+from contextlib import contextmanager
 from fnmatch import fnmatchcase
+from functools import lru_cache
 import os
 import re
+import queue
+import select
 import stat
+import threading
 import time
+import errno
 import glob
+import hashlib
+import itertools
 import posixpath
 import ntpath
+import shlex
+import tarfile
 import fnmatch
+import codecs
+import zlib
+from collections import deque
 
 from .config import (Configuration, IntegerEntry, NewlineEntry, StringEntry,
                      TimeEntry)
 from robot.api import logger
-from robot.utils import is_bytes, is_string, is_truthy, is_list_like
+from robot.utils import is_bytes, is_string, is_truthy, is_list_like, TRUE_STRINGS
 from .pythonforward import LocalPortForwarding
+from .sampler import ResourceSampler
+from .transcript import ShellTranscript
+
+try:
+    from re import _parser as sre_parse
+except ImportError:
+    import sre_parse
 
 try:
     import paramiko
@@ -37,6 +57,10 @@ except ImportError as e:
         'Make sure you have Paramiko installed.'
     )
 
+from paramiko.sftp import (CMD_ATTRS, CMD_CLOSE, CMD_FSETSTAT, CMD_HANDLE, CMD_MKDIR, CMD_NAME, CMD_OPEN, CMD_OPENDIR,
+                           CMD_READDIR, CMD_STAT, CMD_STATUS, CMD_WRITE,
+                           SFTP_FLAG_CREATE, SFTP_FLAG_EXCL, SFTP_FLAG_TRUNC, SFTP_FLAG_WRITE, int64)
+
 try:
     import scp
 except ImportError:
@@ -45,6 +69,14 @@ except ImportError:
         'Make sure you have SCP installed.'
     )
 
+try:
+    from compression import zstd
+except ImportError:
+    try:
+        import zstandard as zstd
+    except ImportError:
+        zstd = None
+
 
 # There doesn't seem to be a simpler way to increase banner timeout
 def _custom_start_client(self, *args, **kwargs):
@@ -78,7 +110,8 @@ class SSHClientException(RuntimeError):
 class _ClientConfiguration(Configuration):
 
     def __init__(self, host, alias, port, timeout, newline, prompt, term_type,
-                 width, height, path_separator, encoding, escape_ansi, encoding_errors):
+                 width, height, path_separator, encoding, escape_ansi, encoding_errors,
+                 max_buffer_size=None, parallel_transfers=1, block_size=262144):
         super(_ClientConfiguration, self).__init__(
             index=IntegerEntry(None),
             host=StringEntry(host),
@@ -93,7 +126,10 @@ class _ClientConfiguration(Configuration):
             path_separator=StringEntry(path_separator),
             encoding=StringEntry(encoding),
             escape_ansi=StringEntry(escape_ansi),
-            encoding_errors=StringEntry(encoding_errors)
+            encoding_errors=StringEntry(encoding_errors),
+            max_buffer_size=IntegerEntry(max_buffer_size),
+            parallel_transfers=IntegerEntry(parallel_transfers),
+            block_size=IntegerEntry(block_size)
         )
 
 
@@ -104,22 +140,25 @@ class SSHClient(object):
     """
 
     tunnel = None
+    sampler = None
+    DEFAULT_SHELL = 'default'
 
     def __init__(self, host, alias=None, port=22, timeout=3, newline='LF',
                  prompt=None, term_type='vt100', width=80, height=24,
-                 path_separator='/', encoding='utf8', escape_ansi=False, encoding_errors='strict'):
+                 path_separator='/', encoding='utf8', escape_ansi=False, encoding_errors='strict',
+                 max_buffer_size=None, parallel_transfers=1, block_size=262144):
         self.config = _ClientConfiguration(host, alias, port, timeout, newline,
                                            prompt, term_type, width, height,
-                                           path_separator, encoding, escape_ansi, encoding_errors)
+                                           path_separator, encoding, escape_ansi, encoding_errors,
+                                           max_buffer_size, parallel_transfers, block_size)
         self._sftp_client = None
         self._scp_transfer_client = None
         self._scp_all_client = None
-        self._shell = None
+        self._shells = {}
+        self._current_shell = None
         self._started_commands = []
-        self._receive_buffer = ""
+        self._subsystems = {}
         self.client = self._get_client()
-        self.width = width
-        self.height = height
 
     @property
     def sftp_client(self):
@@ -130,6 +169,7 @@ class SSHClient(object):
         """
         if not self._sftp_client:
             self._sftp_client = self._create_sftp_client()
+        self._sftp_client.block_size = self.config.block_size or SFTPClient.block_size
         return self._sftp_client
 
     @property
@@ -154,28 +194,150 @@ class SSHClient(object):
             self._scp_all_client = self._create_scp_all_client()
         return self._scp_all_client
 
+    @property
+    def shell_is_open(self):
+        """`True` if a shell is open on the connection."""
+        return self._current_shell is not None
+
     @property
     def shell(self):
-        """Gets the shell for the connection.
+        """Gets the current shell for the connection.
+
+        The default shell is opened when the shell is needed for the first
+        time and no other shell is open.
 
         :returns: An object of the class type
             :py:class:`Shell`.
         """
-        if not self._shell:
-            self._shell = self._create_shell()
-        if self.width != self.config.width or self.height != self.config.height:
-            self._shell.resize(self.config.width, self.config.height)
-            self.width, self.height = self.config.width, self.config.height
-        return self._shell
+        if self._current_shell is None:
+            self.open_shell(self.DEFAULT_SHELL)
+        shell = self._shells[self._current_shell]
+        if not shell.fixed_size and (shell.width, shell.height) != (self.config.width, self.config.height):
+            shell.resize(self.config.width, self.config.height)
+        shell.max_buffer_size = self.config.max_buffer_size
+        shell.escape_ansi = is_truthy(self.config.escape_ansi)
+        return shell
+
+    @property
+    def current_shell(self):
+        """Name of the current shell or `None` if no shell is open."""
+        return self._current_shell
+
+    def open_shell(self, name, term_type=None, width=None, height=None, prompt=None):
+        """Opens a new interactive shell on the same connection and makes
+        it the current shell.
+
+        Every shell has its own pseudo terminal, receive buffer and prompt.
+
+        :param str name: Name used for addressing the shell.
+
+        :param str term_type: Terminal type. Defaults to the configured one.
+
+        :param int width: Terminal width. If neither `width` nor `height` is
+            given, the shell follows the configured terminal size.
+
+        :param int height: Terminal height.
+
+        :param str prompt: Prompt of the shell. Defaults to the configured
+            prompt.
+
+        :raises SSHClientException: If a shell with the same name is
+            already open.
+        """
+        if name in self._shells:
+            raise SSHClientException(f"Shell '{name}' is already open.")
+        fixed_size = width is not None or height is not None
+        width = int(width) if width is not None else self.config.width
+        height = int(height) if height is not None else self.config.height
+        self._shells[name] = Shell(self.client, term_type or self.config.term_type, width, height,
+                                   name=name, prompt=prompt, fixed_size=fixed_size)
+        self._current_shell = name
+
+    def switch_shell(self, name):
+        """Makes the shell `name` the current shell.
+
+        If `name` is `None`, there is no current shell afterwards.
+
+        :raises SSHClientException: If no shell with the given name is open.
+
+        :returns: Name of the previously current shell.
+        """
+        if name is not None:
+            self._get_shell(name)
+        previous, self._current_shell = self._current_shell, name
+        return previous
+
+    def close_shell(self, name=None):
+        """Closes the shell `name` or the current shell by default.
+
+        If the current shell is closed, there is no current shell until
+        another shell is switched to or opened.
+
+        :raises SSHClientException: If no shell with the given name is open.
+        """
+        if name is None:
+            name = self._current_shell
+        self._get_shell(name).close()
+        del self._shells[name]
+        if name == self._current_shell:
+            self._current_shell = None
+
+    def _get_shell(self, name):
+        try:
+            return self._shells[name]
+        except KeyError:
+            raise SSHClientException(f"Shell '{name}' is not open.")
+
+    def start_transcript(self, path, output_format=None):
+        """Starts writing everything received by the current shell to `path`.
+
+        The output is written by a background thread. See
+        :py:class:`ShellTranscript` for the supported formats.
+
+        :param str path: Path to the local transcript file. Existing text
+            transcript is appended to, asciicast transcript overwritten.
+
+        :param str output_format: `text` or `asciicast`. By default
+            `asciicast` is used if the path has `.cast` extension.
+        """
+        shell = self.shell
+        try:
+            transcript = ShellTranscript(path, output_format, self.config.encoding,
+                                         shell.width, shell.height, self.config.term_type)
+        except ValueError as error:
+            raise SSHClientException(error)
+        shell.start_transcript(transcript)
+
+    def stop_transcript(self):
+        """Stops writing the transcript of the current shell.
+
+        :returns: Path to the transcript file or `None` if no transcript
+            was written.
+        """
+        return self.shell.stop_transcript()
+
+    @property
+    def _prompt(self):
+        shell = self._shells.get(self._current_shell)
+        return shell.prompt if shell and shell.prompt else self.config.prompt
 
     def close(self):
         """Closes the connection."""
         if self.tunnel:
             self.tunnel.close()
+        if self.sampler:
+            self.sampler.stop()
+            self.sampler = None
         self._sftp_client = None
         self._scp_transfer_client = None
         self._scp_all_client = None
-        self._shell = None
+        for shell in self._shells.values():
+            shell.stop_transcript()
+        self._shells = {}
+        self._current_shell = None
+        for subsystem in self._subsystems.values():
+            subsystem.close()
+        self._subsystems = {}
         self.client.close()
         try:
             logger.log_background_messages()
@@ -183,7 +345,7 @@ class SSHClient(object):
             pass
 
     def login(self, username=None, password=None, allow_agent=False, look_for_keys=False, delay=None, proxy_cmd=None,
-              read_config=False, jumphost_connection=None, keep_alive_interval='0 seconds'):
+              read_config=False, jumphost_connection=None, keep_alive_interval='0 seconds', quiet_period=None):
         """Logs into the remote host using password authentication.
 
         This method reads the output from the remote host after logging in,
@@ -208,6 +370,10 @@ class SSHClient(object):
             the output after logging in. The delay is only effective if
             the prompt is not set.
 
+        :param str quiet_period: The `quiet_period` passed to
+            :py:meth:`read` instead of `delay`, if given. Only effective if
+            the prompt is not set.
+
         :param read_config: reads or ignores host entries from ``~/.ssh/config`` file. This parameter will read the hostname,
         port number, username and proxy command.
 
@@ -229,7 +395,7 @@ class SSHClient(object):
         except SSHClientException:
             self.client.close()
             raise SSHClientException(f"Authentication failed for user '{self._decode(username)}'.")
-        return self._read_login_output(delay)
+        return self._read_login_output(delay, quiet_period)
 
     def _encode(self, text):
         if is_bytes(text):
@@ -241,16 +407,17 @@ class SSHClient(object):
     def _decode(self, bytes):
         return bytes.decode(self.config.encoding, self.config.encoding_errors)
 
-    def _read_login_output(self, delay):
-        if not self.config.prompt:
-            return self.read(delay)
-        elif self.config.prompt.startswith('REGEXP:'):
-            return self.read_until_regexp(self.config.prompt[7:])
+    def _read_login_output(self, delay, quiet_period=None):
+        if not self._prompt:
+            return self.read(delay, quiet_period)
+        elif self._prompt.startswith('REGEXP:'):
+            return self.read_until_regexp(self._prompt[7:])
         return self.read_until_prompt()
 
     def login_with_public_key(self, username, keyfile, password, allow_agent=False,
                               look_for_keys=False, delay=None, proxy_cmd=None,
-                              jumphost_connection=None, read_config=False, keep_alive_interval='0 seconds'):
+                              jumphost_connection=None, read_config=False, keep_alive_interval='0 seconds',
+                              quiet_period=None):
         """Logs into the remote host using the public key authentication.
 
         This method reads the output from the remote host after logging in,
@@ -274,6 +441,10 @@ class SSHClient(object):
             the output after logging in. The delay is only effective if
             the prompt is not set.
 
+        :param str quiet_period: The `quiet_period` passed to
+            :py:meth:`read` instead of `delay`, if given. Only effective if
+            the prompt is not set.
+
         :param str proxy_cmd : Proxy command
 
         :param SSHClient jumphost_connection : An instance of
@@ -300,7 +471,7 @@ class SSHClient(object):
         except SSHClientException:
             self.client.close()
             raise SSHClientException(f"Login with public key failed for user '{self._decode(username)}'.")
-        return self._read_login_output(delay)
+        return self._read_login_output(delay, quiet_period)
 
     def _verify_key_file(self, keyfile):
         if not os.path.exists(keyfile):
@@ -311,7 +482,8 @@ class SSHClient(object):
             raise SSHClientException(f"Could not read key file '{keyfile}'.")
 
     def execute_command(self, command, sudo=False, sudo_password=None, timeout=None, output_during_execution=False,
-                        output_if_timeout=False, invoke_subsystem=False, forward_agent=False):
+                        output_if_timeout=False, invoke_subsystem=False, forward_agent=False, compression=None,
+                        output_mode='text', idle_timeout=None):
         """Executes the `command` on the remote host.
 
         This method waits until the output triggered by the execution of the
@@ -328,14 +500,27 @@ class SSHClient(object):
 
         :param invoke_subsystem will request a subsystem on the server.
 
+        :param str compression: If given, the standard output of the command
+            is compressed on the remote host with this compressor, either
+            `gzip` or `zstd`, and decompressed while it is read.
+
+        :param str output_mode: Type of the returned `stdout` and `stderr`.
+            See :py:meth:`read_command_output`.
+
+        :param idle_timeout: Maximum time the command may run without
+            producing any output. See :py:meth:`read_command_output`.
+
         :returns: A 3-tuple (stdout, stderr, return_code) with values
             `stdout` and `stderr` as strings and `return_code` as an integer.
         """
-        self.start_command(command, sudo, sudo_password, invoke_subsystem, forward_agent)
+        RemoteCommand._parse_output_mode(output_mode)
+        self.start_command(command, sudo, sudo_password, invoke_subsystem, forward_agent, compression)
         return self.read_command_output(timeout=timeout, output_during_execution=output_during_execution,
-                                        output_if_timeout=output_if_timeout)
+                                        output_if_timeout=output_if_timeout, output_mode=output_mode,
+                                        idle_timeout=idle_timeout)
 
-    def start_command(self, command, sudo=False, sudo_password=None, invoke_subsystem=False, forward_agent=False):
+    def start_command(self, command, sudo=False, sudo_password=None, invoke_subsystem=False, forward_agent=False,
+                      compression=None):
         """Starts the execution of the `command` on the remote host.
 
         The started `command` is pushed into an internal stack. This stack
@@ -354,19 +539,31 @@ class SSHClient(object):
         :param sudo_password are used for executing commands within a sudo session.
 
         :param invoke_subsystem will request a subsystem on the server.
+
+        :param str compression: If given, the standard output of the command
+            is compressed on the remote host. See :py:meth:`execute_command`.
         """
         command = self._encode(command)
 
         self._started_commands.append(
-            self._start_command(command, sudo, sudo_password, invoke_subsystem, forward_agent))
+            self._start_command(command, sudo, sudo_password, invoke_subsystem, forward_agent, compression))
 
-    def read_command_output(self, timeout=None, output_during_execution=False, output_if_timeout=False):
+    def read_command_output(self, timeout=None, output_during_execution=False, output_if_timeout=False,
+                            output_mode='text', idle_timeout=None):
         """Reads the output of the previous started command.
 
         The previous started command, started with :py:meth:`start_command`,
         is popped out of the stack and its outputs (stdout, stderr and the
         return code) are read and returned.
 
+        :param str output_mode: `text` returns `stdout` and `stderr` decoded
+            as strings, `bytes` returns them undecoded as bytes and
+            `memoryview` as memoryviews over the buffers they were read into.
+
+        :param idle_timeout: If given, reading fails if the command does not
+            write anything to stdout or stderr during this time. Unlike
+            `timeout`, this time is restarted whenever output is received.
+
         :raises SSHClientException: If there are no started commands to read
             output from.
 
@@ -375,10 +572,74 @@ class SSHClient(object):
         """
         if timeout:
             timeout = float(TimeEntry(timeout).value)
+        if idle_timeout:
+            idle_timeout = float(TimeEntry(idle_timeout).value)
         try:
-            return self._started_commands.pop().read_outputs(timeout, output_during_execution, output_if_timeout)
+            command = self._started_commands.pop()
         except IndexError:
             raise SSHClientException('No started commands to read output from.')
+        return command.read_outputs(timeout, output_during_execution, output_if_timeout, output_mode, idle_timeout)
+
+    def open_subsystem(self, name, framing='delimiter', delimiter=None):
+        """Opens the subsystem `name` on a channel that is kept open.
+
+        Messages are exchanged with the subsystem using
+        :py:meth:`send_subsystem_message` and :py:meth:`read_subsystem_message`
+        until the subsystem is closed with :py:meth:`close_subsystem`.
+
+        :param str name: Name of the subsystem, e.g. `netconf`. Used also
+            for identifying the subsystem in the other methods.
+
+        :param str framing: Either `delimiter`, where each message ends with
+            the `delimiter`, or `chunked` for the length-prefixed chunked
+            framing of RFC 6242.
+
+        :param str delimiter: The end-of-message delimiter used with the
+            `delimiter` framing. Defaults to `]]>]]>`.
+
+        :raises SSHClientException: If the subsystem is already open or the
+            server refuses to start it.
+        """
+        if name in self._subsystems:
+            raise SSHClientException(f"Subsystem '{name}' is already open.")
+        framer = MessageFramer(framing, self._encode(delimiter) if delimiter else None)
+        transport = self.client.get_transport()
+        if not transport:
+            raise AssertionError("Connection not open")
+        channel = transport.open_session(timeout=float(self.config.timeout))
+        try:
+            channel.invoke_subsystem(self._encode(name))
+        except paramiko.SSHException as error:
+            channel.close()
+            raise SSHClientException(f"Opening subsystem '{name}' failed: {error}")
+        self._subsystems[name] = SubsystemSession(channel, name, framer)
+
+    def send_subsystem_message(self, name, message):
+        """Sends a framed `message` to the open subsystem `name`."""
+        self._get_subsystem(name).send(self._encode(message))
+
+    def read_subsystem_message(self, name, timeout=None):
+        """Reads exactly one framed message from the open subsystem `name`.
+
+        :param timeout: Time to wait for a complete message. Defaults to
+            the connection timeout.
+
+        :returns: The message without framing, decoded to a string.
+        """
+        subsystem = self._get_subsystem(name)
+        timeout = TimeEntry(timeout) if timeout else self.config.get('timeout')
+        return self._decode(subsystem.read(float(timeout.value)))
+
+    def close_subsystem(self, name):
+        """Closes the open subsystem `name` and its channel."""
+        self._get_subsystem(name).close()
+        del self._subsystems[name]
+
+    def _get_subsystem(self, name):
+        try:
+            return self._subsystems[name]
+        except KeyError:
+            raise SSHClientException(f"Subsystem '{name}' is not open.")
 
     def write(self, text, add_newline=False):
         """Writes `text` in the current shell.
@@ -394,7 +655,7 @@ class SSHClient(object):
             text += self._encode(self.config.newline)
         self.shell.write(text)
 
-    def read(self, delay=None):
+    def read(self, delay=None, quiet_period=None):
         """Reads all output available in the current shell.
 
         Reading always consumes the output, meaning that after being read,
@@ -408,27 +669,54 @@ class SSHClient(object):
             (the number of seconds) or in Robot Framework's time format, e.g.
             `4.5s`, `3 minutes`, `2 min 3 sec`.
 
+        :param str quiet_period: If given, this method reads until no output
+            has arrived for `quiet_period`, measured from the last received
+            output, or the configured timeout expires. Used instead of
+            `delay`. Can be given in the same formats as `delay`.
+
         :returns: The read output from the remote host.
         """
-        output = self.shell.read()
-        if delay:
+        shell = self.shell
+        output = self._read_text()
+        if quiet_period:
+            output += self._read_until_quiet(quiet_period)
+        elif delay:
             output += self._delayed_read(delay)
-        output = self._receive_buffer + self._decode(output)
-        self._receive_buffer = ""
+        output = shell.receive_buffer + output
+        shell.receive_buffer = ""
         return output
 
+    def _read_text(self):
+        return self.shell.read_text(self.config.encoding, self.config.encoding_errors)
+
     def _delayed_read(self, delay):
         delay = TimeEntry(delay).value
         max_time = time.time() + self.config.get('timeout').value
-        output = b''
+        output = ''
         while time.time() < max_time:
             time.sleep(delay)
-            read = self.shell.read()
+            read = self._read_text()
             if not read:
                 break
             output += read
         return output
 
+    def _read_until_quiet(self, quiet_period):
+        quiet_period = TimeEntry(quiet_period).value
+        shell = self.shell
+        # Output available before the call has just been read, so the quiet
+        # period starts now.
+        last_output_time = time.time()
+        max_time = last_output_time + self.config.get('timeout').value
+        output = ''
+        while True:
+            remaining = min(last_output_time + quiet_period, max_time) - time.time()
+            if remaining <= 0:
+                return output
+            if shell.wait_for_output(remaining):
+                output += self._read_text()
+                last_output_time = time.time()
+
     def read_char(self):
         """Reads a single Unicode character from the current shell.
 
@@ -437,21 +725,19 @@ class SSHClient(object):
 
         :returns: A single char read from the output.
         """
-        if self._receive_buffer:
-            char = self._receive_buffer[0]
-            self._receive_buffer = self._receive_buffer[1:]
+        # Already decoded output is returned without the `shell` property,
+        # which applies the configuration and is too slow to use per char.
+        shell = self._shells.get(self._current_shell)
+        if shell and not shell.receive_buffer:
+            char = shell.next_decoded_char()
+            if char:
+                return char
+        shell = self.shell
+        if shell.receive_buffer:
+            char = shell.receive_buffer[0]
+            shell.receive_buffer = shell.receive_buffer[1:]
             return char
-
-        server_output = b''
-        while True:
-            try:
-                server_output += self.shell.read_byte()
-                return self._decode(server_output)
-            except UnicodeDecodeError as e:
-                if e.reason == 'unexpected end of data':
-                    pass
-                else:
-                    raise
+        return shell.read_char(self.config.encoding, self.config.encoding_errors)
 
     def read_until(self, expected):
         """Reads output from the current shell until the `expected` text is
@@ -469,46 +755,207 @@ class SSHClient(object):
 
         :returns: The read output, including the encountered `expected` text.
         """
-        return self._read_until(lambda s: expected in s, expected)
+        return self._read_until(OutputMatcher(expected))
 
-    def _read_until(self, matcher, expected, timeout=None):
+    def _read_until(self, matcher, timeout=None, prefix=''):
         timeout = TimeEntry(timeout) if timeout else self.config.get('timeout')
         max_time = time.time() + timeout.value
-        while time.time() < max_time:
-            undecoded = self._single_complete_read_to_buffer(max_time)
-            if undecoded:
-                self._receive_buffer += undecoded.decode(
-                    self.config.encoding, "ignore"
-                )
-            match = matcher(self._receive_buffer)
-            if match:
-                if hasattr(match, "end"):
-                    end = match.end()
-                else:
-                    end = self._receive_buffer.index(expected) + len(expected)
-                output = self._receive_buffer[0:end]
-                self._receive_buffer = self._receive_buffer[end:]
-                return output
-        output = self._receive_buffer
-        self._receive_buffer = ""
-        raise SSHClientException(f"No match found for '{expected}' in {timeout}\nOutput:\n{output}.")
+        shell = self.shell
+        # Output is collected to local variables, which CPython can extend
+        # in place. With a prefix the searched text is extended with the new
+        # output instead of being rebuilt on every read.
+        output, shell.receive_buffer = shell.receive_buffer, ""
+        text = prefix + output if prefix else None
+        try:
+            while True:
+                end = matcher.search(text if prefix else output)
+                if end is not None:
+                    end -= len(prefix)
+                    shell.receive_buffer = output[end:]
+                    return self._limit_output(output[:end])
+                if not prefix:
+                    output = self._limit_searched_output(output, matcher)
+                remaining = max_time - time.time()
+                if remaining <= 0:
+                    break
+                shell.wait_for_output(remaining)
+                received = self._read_text()
+                output += received
+                if prefix:
+                    text += received
+        except UnicodeDecodeError:
+            shell.receive_buffer = output
+            raise
+        raise SSHClientException(f"No match found for '{matcher.expected}' in {timeout}\nOutput:\n{output}.")
+
+    def _limit_output(self, output):
+        limit = self.config.max_buffer_size
+        return output[-limit:] if limit and len(output) > limit else output
+
+    def _limit_searched_output(self, output, matcher):
+        # Called only after `output` has been searched, so that nothing is
+        # discarded unsearched. The overlap needed by the next search is kept.
+        limit = self.config.max_buffer_size
+        if limit and len(output) > max(limit, matcher.overlap):
+            limit = max(limit, matcher.overlap)
+            matcher.discard(len(output) - limit)
+            output = output[-limit:]
+        return output
+
+    def read_until_any(self, patterns):
+        """Reads output from the current shell until any of the `patterns`
+        matches or the timeout expires.
+
+        The output is scanned once for all the patterns, see
+        :py:class:`AnyOutputMatcher` for details.
+
+        :param list patterns: Texts to look for in the output. Patterns
+            starting with `REGEXP:` are regular expressions.
 
-    def _single_complete_read_to_buffer(self, max_time):
-        """Fill receive buffer with a single read with completed
-        last character.
-        In case of timeout, leftover bytes are returned.
+        :raises SSHClientException: If none of the patterns matches before
+            the timeout expires.
+
+        :returns: A 2-tuple (index, output) where `index` is the index of the
+            matching pattern and `output` the read output including the
+            matched text.
         """
-        server_output = self.shell.read()
-        while time.time() < max_time:
+        matcher = AnyOutputMatcher(patterns)
+        output = self._read_until(matcher)
+        return matcher.index, output
+
+    def run_dialog(self, steps, fail_on=()):
+        """Runs an interactive dialog in the current shell.
+
+        Each step waits for its `expect` pattern and then writes its `send`
+        text, if any, followed by the configured newline. All output is read
+        from the same shell buffer and the whole dialog runs in a single
+        call. See :py:class:`DialogStep` for the step format.
+
+        By default steps are run in the given order. Steps with the same
+        `name` are alternatives: the dialog waits for any of their patterns
+        and continues with the step that matched. A step can continue to
+        any named step using `next`, or end the dialog with `next` `END`.
+        Otherwise the dialog continues with the step following the
+        alternatives.
+
+        :param list steps: Steps as dictionaries or :py:class:`DialogStep`
+            objects.
+
+        :param list fail_on: Patterns that make the dialog fail immediately
+            if found in the output during any step.
+
+        :raises SSHClientException: If a step times out or output matching
+            `fail_on` is encountered.
+
+        :returns: The transcript as a list of dictionaries, one per executed
+            step, containing `step` (index of the step), `name`, `expect`,
+            `output`, `sent` and `elapsed` (seconds spent waiting for the
+            output).
+        """
+        steps = [step if isinstance(step, DialogStep) else DialogStep.from_dict(step, index)
+                 for index, step in enumerate(steps)]
+        if not steps:
+            raise SSHClientException('Dialog must have at least one step.')
+        if is_string(fail_on):
+            fail_on = [fail_on]
+        fail_on = list(fail_on or [])
+        states, order = self._get_dialog_states(steps)
+        transcript = []
+        state = order[0]
+        while state != DialogStep.END:
+            alternatives = states[state]
+            matcher = AnyOutputMatcher([step.expect for step in alternatives] + fail_on)
+            timeouts = [step.timeout for step in alternatives]
+            timeout = max(timeouts) if None not in timeouts else None
+            start_time = time.time()
             try:
-                self._receive_buffer += self._decode(server_output)
-                return None
-            except UnicodeDecodeError as e:
-                if e.reason == 'unexpected end of data':
-                    server_output += self.shell.read_byte()
-                else:
-                    raise
-        return server_output
+                output = self._read_until(matcher, timeout)
+            except SSHClientException as error:
+                raise SSHClientException(f"Dialog failed in step '{state}': {error}")
+            if matcher.index >= len(alternatives):
+                raise SSHClientException(f"Dialog failed in step '{state}': found "
+                                         f"'{fail_on[matcher.index - len(alternatives)]}'."
+                                         f"\nOutput:\n{output}")
+            step = alternatives[matcher.index]
+            if step.send is not None:
+                self.write(step.send, add_newline=True)
+            transcript.append({'step': step.index, 'name': step.name, 'expect': step.expect,
+                               'output': output, 'sent': step.send,
+                               'elapsed': round(time.time() - start_time, 3)})
+            state = step.next or self._get_next_dialog_state(state, order)
+        return transcript
+
+    def _get_dialog_states(self, steps):
+        states = {}
+        for step in steps:
+            states.setdefault(step.name, []).append(step)
+        for step in steps:
+            if step.next and step.next != DialogStep.END and step.next not in states:
+                raise SSHClientException(f"Dialog step '{step.name}' has unknown next step '{step.next}'.")
+        return states, list(states)
+
+    def _get_next_dialog_state(self, state, order):
+        index = order.index(state) + 1
+        return order[index] if index < len(order) else DialogStep.END
+
+    @staticmethod
+    def read_until_in_any(clients, expected, timeout=None):
+        """Reads output from the current shells of `clients` until `expected`
+        is found in any of them or the timeout expires.
+
+        All the shells are waited on with a single `select` call, so a match
+        is noticed as soon as the output arrives, regardless of the shell it
+        arrives to. Output read from the other shells is kept in their
+        buffers and can be read normally afterwards.
+
+        :param list clients: :py:class:`SSHClient` objects to read from.
+
+        :param str expected: The text to look for in the output. Texts
+            starting with `REGEXP:` are regular expressions.
+
+        :param timeout: Defaults to the longest configured timeout of the
+            `clients`.
+
+        :raises SSHClientException: If `expected` is not found in any of the
+            outputs when the timeout expires.
+
+        :returns: The client whose output matched, the read output including
+            the match and the time the matching output was received as
+            seconds since the epoch.
+        """
+        if not clients:
+            raise SSHClientException('No connections to read from.')
+        timeout = TimeEntry(timeout) if timeout else \
+            max((client.config.get('timeout') for client in clients), key=lambda entry: entry.value)
+        max_time = time.time() + timeout.value
+        shells = [client.shell for client in clients]
+        matchers = [AnyOutputMatcher([expected]) for _ in clients]
+        outputs = []
+        for shell in shells:
+            outputs.append(shell.receive_buffer)
+            shell.receive_buffer = ""
+        received_time = time.time()
+        try:
+            while True:
+                for index, (matcher, output) in enumerate(zip(matchers, outputs)):
+                    end = matcher.search(output)
+                    if end is not None:
+                        outputs[index] = output[end:]
+                        return clients[index], clients[index]._limit_output(output[:end]), received_time
+                    outputs[index] = clients[index]._limit_searched_output(output, matcher)
+                remaining = max_time - time.time()
+                if remaining <= 0:
+                    break
+                Shell.wait_for_any(shells, remaining)
+                received_time = time.time()
+                for index, client in enumerate(clients):
+                    outputs[index] += client._read_text()
+        finally:
+            for shell, output in zip(shells, outputs):
+                shell.receive_buffer = output
+        details = ''.join(f"\nOutput of connection '{client.config.alias or client.config.index}':\n{output}"
+                          for client, output in zip(clients, outputs))
+        raise SSHClientException(f"No match found for '{expected}' in {timeout}.{details}")
 
     def read_until_newline(self):
         """Reads output from the current shell until a newline character is
@@ -544,24 +991,26 @@ class SSHClient(object):
 
         :returns: The read output, including the encountered prompt.
         """
-        if not self.config.prompt:
+        prompt = self._prompt
+        if not prompt:
             raise SSHClientException('Prompt is not set.')
 
-        if self.config.prompt.startswith('REGEXP:'):
-            output = self.read_until_regexp(self.config.prompt[7:])
+        if prompt.startswith('REGEXP:'):
+            output = self.read_until_regexp(prompt[7:])
         else:
-            output = self.read_until(self.config.prompt)
+            output = self.read_until(prompt)
         if strip_prompt:
             output = self._strip_prompt(output)
         return output
 
     def _strip_prompt(self, output):
-        if self.config.prompt.startswith('REGEXP:'):
-            pattern = re.compile(self.config.prompt[7:])
+        prompt = self._prompt
+        if prompt.startswith('REGEXP:'):
+            pattern = OutputMatcher.compile(prompt[7:])
             match = pattern.search(output)
             length = match.end() - match.start()
         else:
-            length = len(self.config.prompt)
+            length = len(prompt)
         return output[:-length]
 
     def read_until_regexp(self, regexp):
@@ -581,9 +1030,7 @@ class SSHClient(object):
 
         :returns: The read output up and until the `regexp` matches.
         """
-        if is_string(regexp):
-            regexp = re.compile(regexp)
-        return self._read_until(lambda s: regexp.search(s), regexp.pattern)
+        return self._read_until(OutputMatcher(regexp, regexp=True))
 
     def read_until_regexp_with_prefix(self, regexp, prefix):
         """
@@ -596,28 +1043,7 @@ class SSHClient(object):
 
         timeout is defined with :py:meth:`open_connection()`
         """
-        if is_string(regexp):
-            regexp = re.compile(regexp)
-        matcher = regexp.search
-        expected = regexp.pattern
-        timeout = self.config.get('timeout')
-        max_time = time.time() + float(timeout.value)
-        while time.time() < max_time:
-            undecoded = self._single_complete_read_to_buffer(max_time)
-            if undecoded:
-                self._receive_buffer += undecoded.decode(
-                    self.config.encoding, "ignore"
-                )
-            match = matcher(prefix + self._receive_buffer)
-            if match:
-                end = match.end() - len(prefix)
-                ret = self._receive_buffer[0:end]
-                self._receive_buffer = self._receive_buffer[end:]
-                return ret
-        output = self._receive_buffer
-        self._receive_buffer = ""
-        raise SSHClientException(
-            f"No match found for '{expected}' in {timeout}\nOutput:\n{output}")
+        return self._read_until(OutputMatcher(regexp, regexp=True), prefix=prefix)
 
     def write_until_expected(self, text, expected, timeout, interval):
         """Writes `text` repeatedly in the current shell until the `expected`
@@ -647,48 +1073,64 @@ class SSHClient(object):
         while time.time() < max_time:
             self.write(text)
             try:
-                return self._read_until(lambda s: expected in s, expected,
-                                        timeout=interval.value)
+                return self._read_until(OutputMatcher(expected), timeout=interval.value)
             except SSHClientException:
                 pass
         raise SSHClientException(f"No match found for '{expected}' in {timeout}.")
 
     def put_file(self, source, destination='.', mode='0o744', newline='',
-                 scp='OFF', scp_preserve_times=False):
+                 scp='OFF', scp_preserve_times=False, parallel_transfers=None, resume=False,
+                 segments=None, segment_size=None):
         """Calls :py:meth:`SFTPClient.put_file` with the given
         arguments.
 
+        `parallel_transfers` defaults to the connection specific value.
+
         See :py:meth:`SFTPClient.put_file` for more documentation.
         """
         client = self._create_client(scp)
         return client.put_file(source, destination, scp_preserve_times, mode, newline,
-                               self.config.path_separator)
+                               self.config.path_separator,
+                               self._parallel_transfers(parallel_transfers), resume, segments,
+                               segment_size)
 
     def put_directory(self, source, destination='.', mode='0o744', newline='',
-                      recursive=False, scp='OFF', scp_preserve_times=False):
+                      recursive=False, scp='OFF', scp_preserve_times=False,
+                      parallel_transfers=None, newline_pattern=None, compression=None):
         """Calls :py:meth:`SFTPClient.put_directory` with the given
         arguments and the connection specific path separator.
 
         The connection specific path separator is set when calling
         :py:meth:`open_connection`.
 
+        With `scp` set to `TAR`, :py:meth:`TarTransferClient.put_directory`
+        is called instead and `compression` is passed to it.
+
         See :py:meth:`SFTPClient.put_directory` for more documentation.
         """
-        client = self._create_client(scp)
-        return client.put_directory(source, destination, scp_preserve_times, mode,
-                                    newline, self.config.path_separator, recursive)
-
-    def get_file(self, source, destination='.', scp='OFF', scp_preserve_times=False):
+        args = (source, destination, scp_preserve_times, mode, newline,
+                self.config.path_separator, recursive,
+                self._parallel_transfers(parallel_transfers), newline_pattern)
+        if scp.upper() == 'TAR':
+            return self._create_tar_transfer_client().put_directory(*args, compression=compression)
+        return self._create_client(scp).put_directory(*args)
+
+    def get_file(self, source, destination='.', scp='OFF', scp_preserve_times=False,
+                 parallel_transfers=None, resume=False, segments=None, segment_size=None):
         """Calls :py:meth:`SFTPClient.get_file` with the given
         arguments.
 
+        `parallel_transfers` defaults to the connection specific value.
+
         See :py:meth:`SFTPClient.get_file` for more documentation.
         """
         client = self._create_client(scp)
         if scp == 'ALL':
             sources = self._get_files_for_scp_all(source)
             return client.get_file(sources, destination, scp_preserve_times, self.config.path_separator)
-        return client.get_file(source, destination, scp_preserve_times, self.config.path_separator)
+        return client.get_file(source, destination, scp_preserve_times, self.config.path_separator,
+                               self._parallel_transfers(parallel_transfers), resume, segments,
+                               segment_size)
 
     def _get_files_for_scp_all(self, source):
         sources = self.execute_command(f'printf "%s\\n" {source}')
@@ -697,19 +1139,29 @@ class SSHClient(object):
         return result
 
     def get_directory(self, source, destination='.', recursive=False,
-                      scp='OFF', scp_preserve_times=False):
+                      scp='OFF', scp_preserve_times=False, parallel_transfers=None,
+                      compression=None):
         """Calls :py:meth:`SFTPClient.get_directory` with the given
         arguments and the connection specific path separator.
 
         The connection specific path separator is set when calling
         :py:meth:`open_connection`.
 
+        With `scp` set to `TAR`, :py:meth:`TarTransferClient.get_directory`
+        is called instead and `compression` is passed to it.
+
         See :py:meth:`SFTPClient.get_directory` for more documentation.
         """
-        client = self._create_client(scp)
-        return client.get_directory(source, destination, scp_preserve_times,
-                                    self.config.path_separator,
-                                    recursive)
+        args = (source, destination, scp_preserve_times, self.config.path_separator,
+                recursive, self._parallel_transfers(parallel_transfers))
+        if scp.upper() == 'TAR':
+            return self._create_tar_transfer_client().get_directory(*args, compression=compression)
+        return self._create_client(scp).get_directory(*args)
+
+    def _parallel_transfers(self, parallel_transfers):
+        if parallel_transfers is None:
+            return self.config.parallel_transfers or 1
+        return int(parallel_transfers)
 
     def list_dir(self, path, pattern=None, absolute=False):
         """Calls :py:meth:`SFTPClient.list_dir` with the given
@@ -987,8 +1439,9 @@ class SSHClient(object):
         except Exception:
             raise SSHClientException(f'Unable to connect to port {port} on {host}')
 
-    def _start_command(self, command, sudo=False, sudo_password=None, invoke_subsystem=False, forward_agent=False):
-        cmd = RemoteCommand(command, self.config.encoding)
+    def _start_command(self, command, sudo=False, sudo_password=None, invoke_subsystem=False, forward_agent=False,
+                       compression=None):
+        cmd = RemoteCommand(command, self.config.encoding, compression)
         transport = self.client.get_transport()
         if not transport:
             raise AssertionError("Connection not open")
@@ -1009,13 +1462,54 @@ class SSHClient(object):
     def _create_scp_all_client(self):
         return SCPClient(self.client)
 
-    def _create_shell(self):
-        return Shell(self.client, self.config.term_type,
-                     self.config.width, self.config.height)
+    def _create_tar_transfer_client(self):
+        return TarTransferClient(self.client, self.sftp_client)
 
     def create_local_ssh_tunnel(self, local_port, remote_host, remote_port, bind_address):
         self._create_local_port_forwarder(local_port, remote_host, remote_port, bind_address)
 
+    def start_resource_sampler(self, interval=1, output=None, output_format=None):
+        """Starts sampling the resource usage of the remote host in the background.
+
+        See :py:class:`ResourceSampler` for details.
+
+        :param interval: Time between samples.
+
+        :param str output: If given, the samples are written to this local file
+            as they are collected.
+
+        :param str output_format: Either `csv` or `json`. By default `json` is
+            used if `output` has extension `.json` or `.jsonl`, and `csv` otherwise.
+
+        :raises SSHClientException: If a sampler is already running or
+            `output_format` is invalid.
+        """
+        if self.sampler:
+            raise SSHClientException('Resource sampler is already running.')
+        transport = self.client.get_transport()
+        if not transport:
+            raise AssertionError("Connection not open")
+        try:
+            sampler = ResourceSampler(transport, float(TimeEntry(interval).value), output, output_format,
+                                      self.config.encoding)
+        except ValueError as error:
+            raise SSHClientException(error)
+        sampler.start()
+        self.sampler = sampler
+
+    def stop_resource_sampler(self):
+        """Stops the running resource sampler.
+
+        :raises SSHClientException: If no sampler is running.
+
+        :returns: The summary statistics of the collected samples, see
+            :py:meth:`ResourceSampler.summary`.
+        """
+        if not self.sampler:
+            raise SSHClientException('Resource sampler is not running.')
+        sampler, self.sampler = self.sampler, None
+        return sampler.stop()
+
     def _create_local_port_forwarder(self, local_port, remote_host, remote_port, bind_address):
         transport = self.client.get_transport()
         if not transport:
@@ -1025,25 +1519,173 @@ class SSHClient(object):
 
 
 class Shell(object):
-    def __init__(self, client, term_type, term_width, term_height):
+    """Interactive shell on the remote host.
+
+    Output is received in chunks of `receive_size` bytes into a reusable
+    buffer and decoded incrementally, so that a multibyte character split
+    between reads is completed by the next read instead of being read one
+    byte at a time.
+
+    Several shells can be open on the same connection. Each of them has its
+    own channel, terminal size, prompt and `receive_buffer` holding output
+    that has been read but not yet consumed. If `max_buffer_size` is set,
+    only that many of the newest characters are kept in the buffer. If
+    `escape_ansi` is set, ANSI escape sequences are removed from the output
+    as it is decoded using an :py:class:`AnsiFilter`.
+
+    Received output can also be written to a :py:class:`ShellTranscript`.
+    """
+    RECEIVE_SIZE = 65536
+    PARTIAL_CHARACTER_TIMEOUT = 1.0
+
+    def __init__(self, client, term_type, term_width, term_height, receive_size=None,
+                 name=None, prompt=None, fixed_size=False):
         try:
             self._shell = client.invoke_shell(term_type, term_width, term_height)
         except AttributeError:
             raise RuntimeError('Cannot open session, you need to establish a connection first.')
+        self.name = name
+        self.prompt = prompt
+        self.width = term_width
+        self.height = term_height
+        self.fixed_size = fixed_size
+        self.max_buffer_size = None
+        self.escape_ansi = False
+        self._ansi_filter = AnsiFilter()
+        self._receive_buffer = ''
+        self._transcript = None
+        self.receive_size = receive_size or self.RECEIVE_SIZE
+        self._received = bytearray()
+        self._decoder = None
+        self._encoding = None
+        self._text = ''
+        self._position = 0
+
+    @property
+    def receive_buffer(self):
+        return self._receive_buffer
+
+    @receive_buffer.setter
+    def receive_buffer(self, text):
+        if self.max_buffer_size and len(text) > self.max_buffer_size:
+            text = text[-self.max_buffer_size:]
+        self._receive_buffer = text
+
+    def start_transcript(self, transcript):
+        self.stop_transcript()
+        transcript.start()
+        self._transcript = transcript
+
+    def stop_transcript(self):
+        if not self._transcript:
+            return None
+        transcript, self._transcript = self._transcript, None
+        transcript.close()
+        return transcript.path
 
     def read(self):
-        data = b''
-        while self._output_available():
-            data += self._shell.recv(4096)
+        """Returns all available output as bytes."""
+        self._receive()
+        data = bytes(self._received)
+        del self._received[:]
         return data
 
-    def read_byte(self):
-        if self._output_available():
-            return self._shell.recv(1)
-        return b''
+    def read_text(self, encoding, errors='strict'):
+        """Returns all available output decoded to a string.
+
+        A possible incomplete multibyte character at the end of the output is
+        kept and returned when the rest of it has been received.
+        """
+        text = self._text[self._position:]
+        self._text = ''
+        self._position = 0
+        decoder = self._get_decoder(encoding, errors)
+        self._receive()
+        try:
+            decoded = decoder.decode(self._received)
+        finally:
+            del self._received[:]
+        if self.escape_ansi:
+            decoded = self._ansi_filter.feed(decoded)
+        return text + decoded
+
+    def read_char(self, encoding, errors='strict'):
+        """Returns the next character of the output or an empty string if
+        there is no output available."""
+        if self._position >= len(self._text):
+            text = self.read_text(encoding, errors)
+            while not text and self._has_partial_character():
+                if not self.wait_for_output(self.PARTIAL_CHARACTER_TIMEOUT):
+                    break
+                text = self.read_text(encoding, errors)
+            if not text:
+                return ''
+            self._text = text
+        return self.next_decoded_char()
+
+    def next_decoded_char(self):
+        """Returns the next character of the output that has already been
+        received and decoded, or an empty string if there is none."""
+        if self._position >= len(self._text):
+            return ''
+        char = self._text[self._position]
+        self._position += 1
+        return char
+
+    def _receive(self):
+        while self._output_available():
+            data = self._shell.recv(self.receive_size)
+            self._received += data
+            if self._transcript:
+                self._transcript.write(data)
+
+    def _get_decoder(self, encoding, errors):
+        if encoding != self._encoding:
+            self._decoder = codecs.getincrementaldecoder(encoding)(errors)
+            self._encoding = encoding
+        self._decoder.errors = errors
+        return self._decoder
+
+    def _has_partial_character(self):
+        return bool(self._decoder and self._decoder.getstate()[0])
 
     def resize(self, width, height):
         self._shell.resize_pty(width=width, height=height)
+        self.width, self.height = width, height
+
+    def wait_for_output(self, timeout):
+        """Waits until output is available or `timeout` seconds have passed.
+
+        Waiting is done with `select` on the channel, so it does not use CPU
+        and returns immediately when data arrives.
+
+        :returns: `True` if output is available, `False` otherwise.
+        """
+        return self.wait_for_any([self], timeout)
+
+    @staticmethod
+    def wait_for_any(shells, timeout):
+        """Waits until any of the `shells` has output available or `timeout`
+        seconds have passed.
+
+        :returns: `True` if output is available, `False` otherwise.
+        """
+        if any(shell._has_output() for shell in shells):
+            return True
+        timeout = max(timeout, 0)
+        # Channels stay readable after they have been closed.
+        channels = [shell._shell for shell in shells
+                    if not (shell._shell.closed or shell._shell.eof_received)]
+        if channels:
+            select.select(channels, [], [], timeout)
+        else:
+            time.sleep(timeout)
+        return any(shell._has_output() for shell in shells)
+
+    def _has_output(self):
+        # Output decoded by `read_char` but not returned yet is available
+        # without receiving anything from the channel.
+        return self._position < len(self._text) or self._output_available()
 
     def _output_available(self):
         return self._shell.recv_ready()
@@ -1051,6 +1693,329 @@ class Shell(object):
     def write(self, text):
         self._shell.sendall(text)
 
+    def close(self):
+        self.stop_transcript()
+        self._shell.close()
+
+
+class AnsiFilter(object):
+    """Removes ANSI escape sequences from output that is received in chunks.
+
+    Control sequences (CSI), operating system commands (OSC), device
+    control strings and other escape sequences as well as C1 control
+    characters are removed. A sequence that is incomplete at the end of a
+    chunk is kept and completed with the next chunk, so sequences split
+    between reads are removed too. Complete sequences are removed with a
+    single regular expression substitution, so filtering is linear in the
+    length of the output and does not alter other characters.
+    """
+    MAX_SEQUENCE_LENGTH = 4096
+    # The lookahead lets the regular expression engine skip quickly to the
+    # next possible introducer.
+    _sequence = re.compile(r"""(?=[\x1b\x80-\x9f])(?:
+        (?:\x1b\[|\x9b)[0-?]*[ -/]*[@-~]                        # CSI
+      | (?:\x1b[]PX^_]|[\x90\x98\x9d-\x9f]).*?(?:\x07|\x1b\\|\x9c)  # OSC, DCS, SOS, PM, APC
+      | \x1b[ -/]*[0-~]                                        # Other escapes
+      | [\x1b\x80-\x9f])                                       # C1 and invalid
+    """, re.VERBOSE | re.DOTALL)
+    _partial_sequence = re.compile(r"""
+        (?:(?:\x1b\[|\x9b)[0-?]*[ -/]*
+      | (?:\x1b[]PX^_]|[\x90\x98\x9d-\x9f])(?:[^\x07\x1b\x9c]|\x1b(?!\\))*
+      | \x1b[ -/]*)\Z
+    """, re.VERBOSE | re.DOTALL)
+
+    def __init__(self):
+        self._pending = ''
+
+    def feed(self, text):
+        """Returns `text` without escape sequences.
+
+        An incomplete sequence at the end of `text` is not returned but
+        prepended to the text given in the next call.
+        """
+        if self._pending:
+            text, self._pending = self._pending + text, ''
+        partial = self._partial_sequence.search(text, max(len(text) - self.MAX_SEQUENCE_LENGTH, 0))
+        if partial:
+            text, self._pending = text[:partial.start()], text[partial.start():]
+        return self._sequence.sub('', text)
+
+
+class OutputMatcher(object):
+    """Finds the first match of the expected text or regular expression in
+    output that grows between the searches.
+
+    Only the output not searched yet is scanned, extended backwards so that
+    matches spanning the previous end of the output are not missed. With
+    texts and regular expressions having an upper bound for the match
+    length, the extension is the longest possible match. Regular expressions
+    that cannot match a newline are searched starting from the line where
+    the previous search ended. This keeps reading large outputs linear
+    instead of rescanning everything after each read. Other regular
+    expressions, as well as those containing lookahead assertions or
+    backreferences, are searched from the beginning every time.
+    """
+    _newline_categories = ('CATEGORY_SPACE', 'CATEGORY_NOT_DIGIT', 'CATEGORY_NOT_WORD')
+    _other_categories = ('CATEGORY_NOT_SPACE', 'CATEGORY_DIGIT', 'CATEGORY_WORD')
+
+    def __init__(self, expected, regexp=False):
+        if regexp:
+            self._pattern = self.compile(expected)
+            self.expected = self._pattern.pattern
+            self._window, self._within_line = self._get_search_limits(self._pattern)
+        else:
+            self._pattern = None
+            self.expected = expected
+            self._window, self._within_line = max(len(expected) - 1, 0), False
+        self._searched = None
+        self.match = None
+
+    @staticmethod
+    @lru_cache(maxsize=256)
+    def compile(pattern):
+        """Compiles `pattern` and caches the result.
+
+        Already compiled patterns are returned as is.
+        """
+        if is_string(pattern):
+            return re.compile(pattern)
+        return pattern
+
+    @classmethod
+    @lru_cache(maxsize=256)
+    def _get_search_limits(cls, pattern):
+        try:
+            parsed = sre_parse.parse(pattern.pattern, pattern.flags)
+        except Exception:
+            return None, False
+        if cls._needs_full_search(parsed):
+            return None, False
+        max_width = parsed.getwidth()[1]
+        window = max_width if max_width < sre_parse.MAXREPEAT - 1 else None
+        return window, not cls._can_match_newline(parsed, parsed.state.flags)
+
+    @classmethod
+    def _needs_full_search(cls, items):
+        for op, av in items:
+            if op in (sre_parse.ASSERT, sre_parse.ASSERT_NOT) and av[0] > 0:
+                return True
+            if op in (sre_parse.GROUPREF, sre_parse.GROUPREF_EXISTS):
+                return True
+            if any(cls._needs_full_search(sub) for sub in cls._subpatterns(av)):
+                return True
+        return False
+
+    @classmethod
+    def _can_match_newline(cls, items, flags):
+        newline = ord('\n')
+        for op, av in items:
+            if op is sre_parse.LITERAL:
+                found = av == newline
+            elif op is sre_parse.NOT_LITERAL:
+                found = av != newline
+            elif op is sre_parse.ANY:
+                found = bool(flags & re.DOTALL)
+            elif op is sre_parse.IN:
+                found = cls._set_contains_newline(av, newline)
+            elif op in (sre_parse.AT, sre_parse.ASSERT, sre_parse.ASSERT_NOT):
+                found = False
+            elif op is sre_parse.SUBPATTERN:
+                found = cls._can_match_newline(av[-1], (flags | av[1]) & ~av[2])
+            else:
+                subpatterns = list(cls._subpatterns(av))
+                found = not subpatterns or any(cls._can_match_newline(sub, flags) for sub in subpatterns)
+            if found:
+                return True
+        return False
+
+    @classmethod
+    def _set_contains_newline(cls, items, newline):
+        found = False
+        negate = False
+        for op, av in items:
+            if op is sre_parse.NEGATE:
+                negate = True
+            elif op is sre_parse.LITERAL:
+                found = found or av == newline
+            elif op is sre_parse.RANGE:
+                found = found or av[0] <= newline <= av[1]
+            elif op is sre_parse.CATEGORY and str(av) in cls._other_categories:
+                pass
+            elif op is sre_parse.CATEGORY and str(av) in cls._newline_categories:
+                found = True
+            else:
+                return True
+        return found != negate
+
+    @staticmethod
+    def _subpatterns(av):
+        for value in av if isinstance(av, (tuple, list)) else [av]:
+            for sub in value if isinstance(value, list) else [value]:
+                if isinstance(sub, sre_parse.SubPattern):
+                    yield sub
+
+    @property
+    def overlap(self):
+        """Number of characters at the end of the searched text the next
+        search needs, or `0` if the search is not limited to the end."""
+        return self._window or 0
+
+    def discard(self, count):
+        """Tells that `count` characters were removed from the beginning of
+        the text since the previous search."""
+        if self._searched is not None:
+            self._searched = max(self._searched - count, 0)
+
+    def search(self, text):
+        """Returns the end index of the first match in `text` or `None`.
+
+        `text` must start with the text given in the previous call.
+        """
+        if self._searched == len(text):
+            return None
+        start = 0
+        if self._searched is not None:
+            if self._window is not None:
+                start = max(self._searched - self._window, 0)
+            if self._within_line:
+                start = max(start, text.rfind('\n', 0, self._searched) + 1)
+        self._searched = len(text)
+        if self._pattern:
+            self.match = self._pattern.search(text, start)
+            return self.match.end() if self.match else None
+        index = text.find(self.expected, start)
+        return index + len(self.expected) if index != -1 else None
+
+
+class AnyOutputMatcher(object):
+    """Finds the first match of any of the given texts or regular expressions
+    in output that grows between the searches.
+
+    Patterns starting with `REGEXP:` are regular expressions, others are
+    literal texts. The patterns are combined into a single regular
+    expression with a named group for each pattern, so that the output is
+    scanned only once regardless of the number of patterns. If that is not
+    possible because a pattern contains backreferences or global inline
+    flags, the patterns are searched separately. In both cases the match
+    starting first wins and, if several matches start at the same
+    position, the one given first.
+
+    The index of the matching pattern is available as `index` after a
+    successful :py:meth:`search`.
+    """
+    REGEXP_PREFIX = 'REGEXP:'
+    _group_name = 'sshlibrary_pattern_%d'
+
+    def __init__(self, patterns):
+        if not patterns:
+            raise SSHClientException('At least one pattern must be given.')
+        regexps = [pattern[len(self.REGEXP_PREFIX):] if pattern.startswith(self.REGEXP_PREFIX)
+                   else re.escape(pattern) for pattern in patterns]
+        self.expected = "' or '".join(patterns)
+        self.index = None
+        self._combined = self._combine(regexps)
+        if self._combined:
+            self._matchers = [OutputMatcher(self._combined, regexp=True)]
+        else:
+            self._matchers = [OutputMatcher(regexp, regexp=True) for regexp in regexps]
+
+    def _combine(self, regexps):
+        for regexp in regexps:
+            try:
+                parsed = sre_parse.parse(regexp)
+            except re.error as error:
+                raise SSHClientException(f"Invalid regular expression '{regexp}': {error}")
+            if parsed.state.flags & ~re.UNICODE or self._has_backreference(parsed):
+                return None
+        combined = '|'.join(f'(?P<{self._group_name % index}>{regexp})'
+                            for index, regexp in enumerate(regexps))
+        try:
+            return OutputMatcher.compile(combined)
+        except re.error:
+            return None
+
+    @classmethod
+    def _has_backreference(cls, items):
+        for op, av in items:
+            if op in (sre_parse.GROUPREF, sre_parse.GROUPREF_EXISTS):
+                return True
+            if any(cls._has_backreference(sub) for sub in OutputMatcher._subpatterns(av)):
+                return True
+        return False
+
+    @property
+    def overlap(self):
+        """See :py:attr:`OutputMatcher.overlap`."""
+        return max(matcher.overlap for matcher in self._matchers)
+
+    def discard(self, count):
+        """See :py:meth:`OutputMatcher.discard`."""
+        for matcher in self._matchers:
+            matcher.discard(count)
+
+    def search(self, text):
+        """Returns the end index of the first match in `text` or `None`.
+
+        `text` must start with the text given in the previous call.
+        """
+        if self._combined:
+            end = self._matchers[0].search(text)
+            if end is not None:
+                self.index = int(self._matchers[0].match.lastgroup.rsplit('_', 1)[1])
+            return end
+        first = None
+        for index, matcher in enumerate(self._matchers):
+            if matcher.search(text) is not None:
+                if first is None or matcher.match.start() < first.start():
+                    first, self.index = matcher.match, index
+        return first.end() if first else None
+
+
+class DialogStep(object):
+    """A single step of a dialog run with :py:meth:`SSHClient.run_dialog`.
+
+    :param str expect: Text to wait for. Patterns starting with `REGEXP:`
+        are regular expressions.
+
+    :param str send: Text to write after `expect` has been found. Nothing
+        is written if not given.
+
+    :param timeout: Time to wait for `expect`. Defaults to the connection
+        timeout.
+
+    :param str name: Name of the step. Steps having the same name are
+        alternatives. Defaults to the index of the step.
+
+    :param str next: Name of the step to continue with, or `END` to end
+        the dialog.
+    """
+    END = 'END'
+    KEYS = ('expect', 'send', 'timeout', 'name', 'next')
+
+    def __init__(self, index, expect, send=None, timeout=None, name=None, next=None):
+        if not is_string(expect) or not expect:
+            raise SSHClientException(f'Dialog step {index} must have a non-empty expect pattern.')
+        self.index = index
+        self.expect = expect
+        self.send = str(send) if send is not None else None
+        self.timeout = TimeEntry(timeout).value if timeout else None
+        self.name = str(name) if name is not None else str(index)
+        self.next = str(next) if next is not None else None
+
+    @classmethod
+    def from_dict(cls, step, index):
+        try:
+            items = dict(step)
+        except (TypeError, ValueError):
+            raise SSHClientException(f'Dialog step {index} must be a dictionary, got {step!r}.')
+        if 'expect' not in items:
+            raise SSHClientException(f'Dialog step {index} must have a non-empty expect pattern.')
+        unknown = sorted(set(items) - set(cls.KEYS))
+        if unknown:
+            raise SSHClientException(f"Dialog step {index} has unknown keys {', '.join(unknown)}. "
+                                     f"Valid keys are {', '.join(cls.KEYS)}.")
+        return cls(index, **items)
+
 
 class SFTPClient(object):
     """Base class for the SFTP implementation.
@@ -1059,12 +2024,21 @@ class SFTPClient(object):
     specific implementations for getting, putting and listing files and
     directories.
     """
+    block_size = 262144
+    segment_size = 16777216
 
     def __init__(self, ssh_client, encoding):
         self.ssh_client = ssh_client
         self._client = ssh_client.open_sftp()
         self._encoding = encoding
         self._homedir = self._absolute_path(b'.')
+        self._workers = {}
+        self._transfers = None
+        self._transfer_numbers = itertools.count()
+        self._sizes = {}
+        self._remote_dirs = None
+        self._remote_files = None
+        self._absolute_paths = {}
 
     def is_file(self, path):
         """Checks if the `path` points to a regular file on the remote host.
@@ -1123,26 +2097,23 @@ class SFTPClient(object):
                                    absolute)
 
     def _list_filtered(self, path, filter_method, pattern=None, absolute=False):
-        self._verify_remote_dir_exists(path)
-        items = filter_method(path)
+        items = filter_method(path, self._list_remote_dir(path))
         if pattern:
             items = self._filter_by_pattern(items, pattern)
         if absolute:
             items = self._include_absolute_path(items, path)
         return items
 
-    def _verify_remote_dir_exists(self, path):
-        if not self.is_dir(path):
-            raise SSHClientException(f"There was no directory matching '{path}'.")
-
-    def _get_item_names(self, path):
-        return [item.name for item in self._list(path)]
+    def _get_item_names(self, path, items):
+        return [item.name for item in items]
 
     def _filter_by_pattern(self, items, pattern):
         return [name for name in items if fnmatchcase(name, pattern)]
 
     def _include_absolute_path(self, items, path):
-        absolute_path = self._absolute_path(path)
+        if path not in self._absolute_paths:
+            self._absolute_paths[path] = self._absolute_path(path)
+        absolute_path = self._absolute_paths[path]
         if absolute_path[1:3] == ':\\':
             absolute_path += '\\'
         else:
@@ -1170,16 +2141,27 @@ class SFTPClient(object):
         return self._list_filtered(path, self._get_file_names, pattern,
                                    absolute)
 
-    def _get_file_names(self, path):
-        return [item.name
-                for item in self._list(path)
-                if item.is_regular()
-                or (item.is_link()
-                    and not self._is_dir_symlink(path, item.name))]
+    def _get_file_names(self, path, items):
+        return [item.name for item in self._get_files(path, items)]
 
-    def _is_dir_symlink(self, path, item):
-        resolved_link = self._readlink(f'{path}/{item}')
-        return self.is_dir(f'{path}/{resolved_link}')
+    def _get_files(self, path, items):
+        # Regular files and symlinks not pointing to directories. Symlinks
+        # are replaced with what they point to, unless they are broken.
+        links = [item for item in items if item.is_link()]
+        targets = dict(zip((link.name for link in links),
+                           self._stat_all(f'{path}/{link.name}' for link in links)))
+        files = []
+        for item in items:
+            if item.is_link():
+                target = targets[item.name]
+                if target and target.is_directory():
+                    continue
+                if target:
+                    item = SFTPFileInfo(item.name, target.mode, target.size)
+            elif not item.is_regular():
+                continue
+            files.append(item)
+        return files
 
     def list_dirs_in_dir(self, path, pattern=None, absolute=False):
         """Gets the directory names, or optionally the absolute paths, on the
@@ -1202,13 +2184,14 @@ class SFTPClient(object):
         return self._list_filtered(path, self._get_directory_names, pattern,
                                    absolute)
 
-    def _get_directory_names(self, path):
-        return [item.name for item in self._list(path) if item.is_directory()]
+    def _get_directory_names(self, path, items):
+        return [item.name for item in items if item.is_directory()]
 
     def get_directory(self, source, destination, scp_preserve_time, path_separator='/',
-                      recursive=False):
-        destination = self.build_destination(source, destination, path_separator)
-        return self._get_directory(source, destination, path_separator, recursive, scp_preserve_time)
+                      recursive=False, parallel_transfers=1):
+        with self._parallel(parallel_transfers):
+            destination = self.build_destination(source, destination, path_separator)
+            return self._get_directory(source, destination, path_separator, recursive, scp_preserve_time)
 
     def _get_directory(self, source, destination, path_separator='/',
                        recursive=False, scp_preserve_times=False):
@@ -1230,28 +2213,121 @@ class SFTPClient(object):
         :param bool recursive: If `True`, the subdirectories in the `source`
             path are downloaded as well.
 
+        With parallel transfers, the files are queued for downloading as
+        soon as the walk finds them, so downloading starts while the rest of
+        the tree is still being listed.
+
         :returns: A list of 2-tuples for all the downloaded files. These tuples
             contain the remote path as the first value and the local target
             path as the second.
         """
         source = self._remove_ending_path_separator(path_separator, source)
-        self._verify_remote_dir_exists(source)
-        files = []
-        items = self.list_dir(source)
-        if items:
-            for item in items:
-                remote = source + path_separator + item
-                local = os.path.join(destination, item)
-                if self.is_file(remote):
-                    files += self.get_file(remote, local, scp_preserve_times)
-                elif recursive:
-                    files += self.get_directory(remote, local, scp_preserve_times, path_separator,
-                                                recursive)
-        else:
-            if not os.path.exists(destination):
-                os.makedirs(destination)
-            files.append((source, destination))
-        return files
+        destinations = {source: destination}
+        files = {}
+        pending = []
+
+        def found(directory, item):
+            remote = directory + path_separator + item.name
+            local = os.path.join(destinations[directory], item.name)
+            if item.is_directory():
+                destinations[remote] = self.build_destination(remote, local, path_separator)
+                return
+            local = files[remote] = os.path.abspath(local)
+            self._create_missing_local_dirs(local, False)
+            # Without parallel transfers the files are downloaded with this
+            # client, which cannot be used before the walk has finished.
+            if self._transfers is None:
+                pending.append((item.size, remote, local))
+            else:
+                self._transfer(item.size, '_get_file', remote, local, scp_preserve_times)
+
+        listings = self._walk_remote_dir(source, path_separator, recursive, found)
+        for size, remote, local in pending:
+            self._transfer(size, '_get_file', remote, local, scp_preserve_times)
+        return self._get_directory_files(source, path_separator, listings, destinations, files)
+
+    def _get_directory_files(self, directory, path_separator, listings, destinations, files):
+        # The downloaded files in the order of the listings, subdirectories
+        # in place of their names, and the empty directories created.
+        items = listings[directory]
+        if not items:
+            if not os.path.exists(destinations[directory]):
+                os.makedirs(destinations[directory])
+            return [(directory, destinations[directory])]
+        result = []
+        for item in items:
+            remote = directory + path_separator + item.name
+            if remote in files:
+                result.append((remote, files[remote]))
+            elif remote in listings:
+                result += self._get_directory_files(remote, path_separator, listings, destinations, files)
+        return result
+
+    def _list_remote_dir(self, path):
+        """Lists the items of the remote directory `path` with their
+        attributes using a single directory listing."""
+        try:
+            return list(self._list(path))
+        except IOError:
+            raise SSHClientException(f"There was no directory matching '{path}'.")
+
+    def _walk_remote_dir(self, path, path_separator, recursive, found=None):
+        """Lists the remote directory `path`, and optionally its
+        subdirectories, using pipelined requests.
+
+        All the subdirectories found so far are listed at the same time.
+        Symlinks are replaced with the items they point to, unless they are
+        broken.
+
+        :param found: If given, called with the directory and the item for
+            every regular file, and every subdirectory when `recursive`, as
+            soon as it is found. Subdirectories are reported before their
+            contents.
+
+        :returns: A dictionary mapping the listed directory paths to lists of
+            their items.
+        """
+        listings = {}
+        errors = []
+        requests = SFTPRequestPipeline(self._client)
+
+        def list_dir(directory):
+            requests.listdir(directory.encode(self._encoding),
+                             lambda items: listed(directory, items))
+
+        def listed(directory, items):
+            if items is None:
+                errors.append(SSHClientException(f"There was no directory matching '{directory}'."))
+                return
+            items = listings[directory] = [self._to_file_info(item) for item in items]
+            for index, item in enumerate(items):
+                remote = directory + path_separator + item.name
+                if item.is_link():
+                    requests.stat(remote.encode(self._encoding),
+                                  lambda attributes, directory=directory, items=items, index=index:
+                                  resolved(directory, items, index, attributes))
+                else:
+                    found_item(directory, item)
+
+        def resolved(directory, items, index, attributes):
+            if attributes:
+                items[index] = SFTPFileInfo(items[index].name, attributes.st_mode, attributes.st_size)
+                found_item(directory, items[index])
+
+        def found_item(directory, item):
+            if item.is_regular():
+                if found:
+                    found(directory, item)
+            elif recursive and item.is_directory():
+                if found:
+                    found(directory, item)
+                list_dir(directory + path_separator + item.name)
+
+        list_dir(path)
+        requests.wait()
+        if errors:
+            raise errors[0]
+        return listings
 
     def build_destination(self, source, destination, path_separator):
         """Add parent directory from source to destination path if destination is '.'
@@ -1279,7 +2355,8 @@ class SFTPClient(object):
             source = source[:-len(path_separator)]
         return source
 
-    def get_file(self, source, destination, scp_preserve_times, path_separator='/'):
+    def get_file(self, source, destination, scp_preserve_times, path_separator='/',
+                 parallel_transfers=1, resume=False, segments=None, segment_size=None):
         r"""Downloads file(s) from the remote host to the local machine.
 
         :param str source: Must be the path to an existing file on the remote
@@ -1299,18 +2376,46 @@ class SFTPClient(object):
             paths on the remote host. On Windows, this must be set as `\`.
             The default is `/`, which is also the default on Linux-like systems.
 
+        :param int parallel_transfers: Maximum number of files transferred
+            at the same time, each over its own SFTP session.
+
+        :param resume: If `True`, the downloads continue from the end of
+            existing local files shorter than the remote files. If
+            `checksum`, the existing content must also match the beginning
+            of the remote file. Otherwise files are downloaded completely.
+
+        :param int segments: If at least `2`, files larger than two segments
+            are downloaded in segments of `segment_size` bytes, this many
+            segments at the same time, each over its own SFTP session.
+            The checksums of the downloaded files are verified afterwards.
+            Files are not downloaded in segments when resuming.
+
+        :param int segment_size: Size of the segments in bytes. Defaults to
+            `SFTPClient.segment_size`.
+
         :returns: A list of 2-tuples for all the downloaded files. These tuples
             contain the remote path as the first value and the local target
             path as the second.
         """
-        remote_files = self._get_get_file_sources(source, path_separator)
-        if not remote_files:
-            msg = f"There were no source files matching '{source}'."
-            raise SSHClientException(msg)
-        local_files = self._get_get_file_destinations(remote_files, destination)
-        files = list(zip(remote_files, local_files))
-        for src, dst in files:
-            self._get_file(src, dst, scp_preserve_times)
+        resume = self._get_resume_mode(resume)
+        segmented = []
+        with self._parallel(max(int(parallel_transfers or 1), int(segments or 1))):
+            remote_files = self._get_get_file_sources(source, path_separator)
+            if not remote_files:
+                msg = f"There were no source files matching '{source}'."
+                raise SSHClientException(msg)
+            local_files = self._get_get_file_destinations(remote_files, destination)
+            files = list(zip(remote_files, local_files))
+            for src, dst in files:
+                size = self._remote_size(src)
+                ranges = self._get_segments(size, segments, segment_size) if not resume else []
+                if ranges:
+                    self._get_file_in_segments(src, dst, size, ranges)
+                    segmented.append((dst, src, size))
+                else:
+                    self._transfer(size, '_get_file', src, dst, scp_preserve_times, resume)
+        for local_path, remote_path, size in segmented:
+            self._verify_checksum(local_path, remote_path, size)
         return files
 
     def _get_get_file_sources(self, source, path_separator):
@@ -1320,11 +2425,15 @@ class SFTPClient(object):
             path, pattern = '', source
         if not path:
             path = '.'
-        if not self.is_file(source):
-            return [filename for filename in
-                    self.list_files_in_dir(path, pattern, absolute=True)]
-        else:
+        if self.is_file(source):
             return [source]
+        files = [item for item in self._get_files(path, self._list_remote_dir(path))
+                 if not pattern or fnmatchcase(item.name, pattern)]
+        sources = self._include_absolute_path([item.name for item in files], path)
+        if self._transfers is not None:
+            # Sizes from the listing, so that they need not be stat'ed.
+            self._sizes.update((source, item.size) for source, item in zip(sources, files))
+        return sources
 
     def _get_get_file_destinations(self, source_files, destination):
         target_is_dir = destination.endswith(os.sep) or destination == '.'
@@ -1345,7 +2454,8 @@ class SFTPClient(object):
             os.makedirs(destination)
 
     def put_directory(self, source, destination, scp_preserve_times, mode, newline,
-                      path_separator='/', recursive=False):
+                      path_separator='/', recursive=False, parallel_transfers=1,
+                      newline_pattern=None):
         r"""Uploads directory(-ies) from the local machine to the remote host,
         optionally with subdirectories included.
 
@@ -1371,6 +2481,12 @@ class SFTPClient(object):
         :param bool recursive: If `True`, the subdirectories in the `source`
             path are uploaded as well.
 
+        :param int parallel_transfers: Maximum number of files transferred
+            at the same time, each over its own SFTP session.
+
+        :param str newline_pattern: If given, the newline characters are
+            converted only in the files whose name matches this glob pattern.
+
         :returns: A list of 2-tuples for all the uploaded files. These tuples
             contain the local path as the first value and the remote target
             path as the second.
@@ -1381,11 +2497,15 @@ class SFTPClient(object):
         if self.is_dir(destination):
             destination = destination + path_separator + \
                           source.rsplit(os.path.sep)[-1]
-        return self._put_directory(source, destination, mode, newline,
-                                   path_separator, recursive, scp_preserve_times)
+        with self._remote_directory_cache(), self._parallel(parallel_transfers):
+            self._prepare_remote_tree(source, destination, mode, path_separator, recursive)
+            return self._put_directory(source, destination, mode, newline,
+                                       path_separator, recursive, scp_preserve_times,
+                                       newline_pattern)
 
     def _put_directory(self, source, destination, mode, newline,
-                       path_separator, recursive, scp_preserve_times=False):
+                       path_separator, recursive, scp_preserve_times=False,
+                       newline_pattern=None):
         files = []
         items = os.listdir(source)
         if items:
@@ -1393,22 +2513,59 @@ class SFTPClient(object):
                 local_path = os.path.join(source, item)
                 remote_path = destination + path_separator + item
                 if os.path.isfile(local_path):
+                    convert = not newline_pattern or fnmatchcase(item, newline_pattern)
                     files += self.put_file(local_path, remote_path, scp_preserve_times,
-                                           mode, newline, path_separator)
+                                           mode, newline if convert else '', path_separator)
                 elif recursive and os.path.isdir(local_path):
                     files += self._put_directory(local_path, remote_path,
                                                  mode, newline,
-                                                 path_separator, recursive, scp_preserve_times)
+                                                 path_separator, recursive, scp_preserve_times,
+                                                 newline_pattern)
         else:
             self._create_missing_remote_path(destination, mode)
             files.append((source, destination))
         return files
 
+    def _prepare_remote_tree(self, source, destination, mode, path_separator, recursive):
+        """Creates the remote directories of a directory upload and checks
+        which of its files exist already, using pipelined requests."""
+        directories, files = self._get_put_directory_targets(source, destination, path_separator, recursive)
+        self._create_missing_remote_paths([self._format_destination_path(path, path_separator)
+                                           for path in directories], mode)
+        files = [self._format_destination_path(path, path_separator) for path in files]
+        files = [path for path in files if not self._is_in_created_dir(path, '/')]
+        for path, item in zip(files, self._stat_all(files)):
+            if item and item.is_directory():
+                self._remote_dirs[self._remote_key(path)] = False
+            else:
+                self._remote_files[self._remote_key(path)] = item is not None
+
+    def _get_put_directory_targets(self, source, destination, path_separator, recursive):
+        # The remote directories and files `_put_directory` is going to upload.
+        directories, files = [], []
+        items = os.listdir(source)
+        if not items:
+            directories.append(destination)
+        for item in items:
+            local_path = os.path.join(source, item)
+            remote_path = destination + path_separator + item
+            if os.path.isfile(local_path):
+                if destination not in directories:
+                    directories.append(destination)
+                files.append(remote_path)
+            elif recursive and os.path.isdir(local_path):
+                subdirectories, subdirectory_files = self._get_put_directory_targets(
+                    local_path, remote_path, path_separator, recursive)
+                directories += subdirectories
+                files += subdirectory_files
+        return directories, files
+
     def _verify_local_dir_exists(self, path):
         if not os.path.isdir(path):
             raise SSHClientException(f"There was no source path matching '{path}'.")
 
-    def put_file(self, sources, destination, scp_preserve_times, mode, newline, path_separator='/'):
+    def put_file(self, sources, destination, scp_preserve_times, mode, newline, path_separator='/',
+                 parallel_transfers=1, resume=False, segments=None, segment_size=None):
         r"""Uploads the file(s) from the local machine to the remote host.
 
         :param str sources: Must be the path to an existing file on the remote
@@ -1436,6 +2593,25 @@ class SFTPClient(object):
             paths on the remote host. On Windows, this must be set as `\`.
             The default is `/`, which is also the default on Linux-like systems.
 
+        :param int parallel_transfers: Maximum number of files transferred
+            at the same time, each over its own SFTP session.
+
+        :param resume: If `True`, the uploads continue from the end of
+            existing remote files shorter than the local files. If
+            `checksum`, the existing content must also match the beginning
+            of the local file. Otherwise files are uploaded completely.
+            Uploads converting newlines are never resumed.
+
+        :param int segments: If at least `2`, files larger than two segments
+            are uploaded in segments of `segment_size` bytes, this many
+            segments at the same time, each over its own SFTP session.
+            The checksums of the uploaded files are verified afterwards.
+            Files are not uploaded in segments when resuming or converting
+            newlines.
+
+        :param int segment_size: Size of the segments in bytes. Defaults to
+            `SFTPClient.segment_size`.
+
         :returns: A list of 2-tuples for all the uploaded files. These tuples
             contain the local path as the first value and the remote target
             path as the second.
@@ -1443,14 +2619,27 @@ class SFTPClient(object):
         if mode:
             mode = int(mode, 8)
         newline = {'CRLF': '\r\n', 'LF': '\n'}.get(newline.upper(), None)
+        resume = self._get_resume_mode(resume)
         local_files = self._get_put_file_sources(sources)
-        remote_files, remote_dir = self._get_put_file_destinations(local_files,
-                                                                   destination,
-                                                                   path_separator)
-        self._create_missing_remote_path(remote_dir, mode)
-        files = list(zip(local_files, remote_files))
-        for source, destination in files:
-            self._put_file(source, destination, mode, newline, path_separator, scp_preserve_times)
+        with self._remote_directory_cache():
+            remote_files, remote_dir = self._get_put_file_destinations(local_files,
+                                                                       destination,
+                                                                       path_separator)
+            self._create_missing_remote_path(remote_dir, mode)
+            files = list(zip(local_files, remote_files))
+            segmented = []
+            with self._parallel(max(int(parallel_transfers or 1), int(segments or 1))):
+                for source, destination in files:
+                    size = os.path.getsize(source)
+                    ranges = self._get_segments(size, segments, segment_size) if not (resume or newline) else []
+                    if ranges:
+                        self._put_file_in_segments(source, destination, size, mode, ranges)
+                        segmented.append((source, destination, size))
+                    else:
+                        self._transfer(size, '_put_file', source, destination, mode,
+                                       newline, path_separator, scp_preserve_times, resume)
+        for local_path, remote_path, size in segmented:
+            self._verify_checksum(local_path, remote_path, size)
         return files
 
     def _get_put_file_sources(self, source):
@@ -1465,9 +2654,7 @@ class SFTPClient(object):
         return sources
 
     def _get_put_file_destinations(self, sources, destination, path_separator):
-        if destination[1:3] == ':' + path_separator:
-            destination = path_separator + destination
-        destination = self._format_destination_path(destination)
+        destination = self._format_destination_path(destination, path_separator)
         if destination == '.':
             destination = self._homedir + '/'
         if len(sources) > 1 and destination[-1] != '/' and not self.is_dir(destination):
@@ -1482,7 +2669,9 @@ class SFTPClient(object):
                      for path in sources]
         return files, dir_path
 
-    def _format_destination_path(self, destination):
+    def _format_destination_path(self, destination, path_separator):
+        if destination[1:3] == ':' + path_separator:
+            destination = path_separator + destination
         destination = destination.replace('\\', '/')
         destination = ntpath.splitdrive(destination)[-1]
         return destination
@@ -1497,72 +2686,452 @@ class SFTPClient(object):
 
         if not _isabs(destination):
             destination = path_separator.join([self._homedir, destination])
-        if self.is_dir(destination):
+        if not self._is_known_file_path(destination, path_separator) and self.is_dir(destination):
             return destination, ''
         return destination.rsplit(path_separator, 1)
 
+    @contextmanager
+    def _remote_directory_cache(self):
+        """Remembers the remote directories known to exist, and whether the
+        checked remote files exist, until the outermost block exits.
+
+        Remote directories are not expected to be removed during a single
+        upload, so each of them needs to be checked or created only once.
+        """
+        if self._remote_dirs is not None:
+            yield
+            return
+        self._remote_dirs = {}
+        self._remote_files = {}
+        try:
+            yield
+        finally:
+            self._remote_dirs = None
+            self._remote_files = None
+
+    def _remote_key(self, path):
+        if is_string(path):
+            path = path.encode(self._encoding)
+        if not path.startswith(b'/'):
+            path = posixpath.join(self._homedir.encode(self._encoding), path)
+        return path
+
+    def _is_in_created_dir(self, path, path_separator):
+        # Nothing exists in a directory created by the ongoing upload, except
+        # what the upload itself has created.
+        if not self._remote_dirs or path_separator not in path:
+            return False
+        parent = path.rsplit(path_separator, 1)[0]
+        return (self._remote_dirs.get(self._remote_key(parent), False)
+                and self._remote_key(path) not in self._remote_dirs)
+
+    def _is_known_file_path(self, path, path_separator):
+        # The files checked before the upload are not directories either.
+        return (self._is_in_created_dir(path, path_separator)
+                or bool(self._remote_files) and self._remote_key(path) in self._remote_files)
+
+    def _is_known_remote_file(self, path):
+        return bool(self._remote_files) and self._remote_files.get(self._remote_key(path), False)
+
     def _create_missing_remote_path(self, path, mode):
+        self._create_missing_remote_paths([path], mode)
+
+    def _create_missing_remote_paths(self, paths, mode):
+        """Creates the missing remote directories `paths` and their parents.
+
+        All the directories not known to exist are stat'ed at once using
+        pipelined requests. The missing ones are then created one level at
+        a time, each level with pipelined requests.
+        """
+        known_dirs = self._remote_dirs if self._remote_dirs is not None else {}
+        chains = [self._get_remote_path_chain(path) for path in paths]
+        found = {}
+
+        def stat_received(directory, attributes):
+            found[directory] = attributes is not None
+
+        requests = SFTPRequestPipeline(self._client)
+        for chain in chains:
+            for directory in chain:
+                if known_dirs.get(directory):
+                    # Created by this upload, so nothing below it exists.
+                    break
+                if directory not in known_dirs and directory not in found:
+                    found[directory] = False
+                    requests.stat(directory, lambda attributes, directory=directory:
+                                  stat_received(directory, attributes))
+        requests.wait()
+        missing = []
+        for chain in chains:
+            created = False
+            for directory in chain:
+                if directory not in known_dirs:
+                    known_dirs[directory] = created or not found[directory]
+                    if known_dirs[directory]:
+                        missing.append(directory)
+                created = known_dirs[directory]
+        if missing and not isinstance(mode, int):
+            mode = int(mode, 8)
+        for _, level in itertools.groupby(sorted(missing, key=self._remote_path_depth),
+                                          key=self._remote_path_depth):
+            requests = SFTPRequestPipeline(self._client)
+            for directory in level:
+                requests.mkdir(directory, mode)
+            requests.wait()
+
+    @staticmethod
+    def _remote_path_depth(path):
+        return path.count(b'/')
+
+    def _get_remote_path_chain(self, path):
+        # The directory `path` and all its parents, the topmost first.
         if is_string(path):
             path = path.encode(self._encoding)
         if path.startswith(b'/'):
             current_dir = b'/'
         else:
-            current_dir = self._absolute_path(b'.').encode(self._encoding)
+            current_dir = self._homedir.encode(self._encoding)
+        chain = []
         for dir_name in path.split(b'/'):
             if dir_name:
                 current_dir = posixpath.join(current_dir, dir_name)
+            if current_dir not in chain:
+                chain.append(current_dir)
+        return chain
+
+    def _put_file(self, source, destination, mode, newline, path_separator, scp_preserve_times=False,
+                  resume=False):
+        position = 0
+        if resume and not newline:
             try:
-                self._client.stat(current_dir)
-            except:
-                if not isinstance(mode, int):
-                    mode = int(mode, 8)
-                self._client.mkdir(current_dir, mode)
-
-    def _put_file(self, source, destination, mode, newline, path_separator, scp_preserve_times=False):
-        remote_file = self._create_remote_file(destination, mode)
+                remote_size = self._client.stat(destination.encode(self._encoding)).st_size
+            except IOError:
+                remote_size = 0
+            position = self._get_resume_position(source, destination, os.path.getsize(source),
+                                                 remote_size, resume)
+        if position:
+            if position == os.path.getsize(source):
+                return
+            logger.info(f"Resuming upload of '{source}' at byte {position}.")
+            remote_file = SFTPFileWriter(self._client, self._open_remote_file(destination.encode(self._encoding), 0))
+        else:
+            remote_file = self._create_remote_file(destination, mode)
+        converter = NewlineConverter(newline.encode(self._encoding)) if newline else None
+        block = bytearray(self.block_size)
+        view = memoryview(block)
         with open(source, 'rb') as local_file:
-            position = 0
+            local_file.seek(position)
             while True:
-                data = local_file.read(4096)
-                if not data:
+                size = local_file.readinto(block)
+                if not size:
                     break
-                if newline:
-                    data = re.sub(br'(\r\n|\r|\n)', newline.encode(self._encoding), data)
+                data = view[:size]
+                if converter:
+                    data = converter.convert(data)
                 self._write_to_remote_file(remote_file, data, position)
                 position += len(data)
+            if converter:
+                self._write_to_remote_file(remote_file, converter.flush(), position)
+            self._close_remote_file(remote_file)
+
+    def _get_segments(self, size, segments, segment_size):
+        """Returns the `(offset, length)` byte ranges a file of `size` bytes
+        is transferred in, or an empty list if it is transferred as a whole.
+        """
+        segments = int(segments or 1)
+        segment_size = int(segment_size or self.segment_size)
+        if segments < 2 or self._transfers is None or not size or size < 2 * segment_size:
+            return []
+        return [(offset, min(segment_size, size - offset)) for offset in range(0, size, segment_size)]
+
+    def _put_file_in_segments(self, source, destination, size, mode, ranges):
+        logger.info(f"Uploading '{source}' in {len(ranges)} segments.")
+        self._create_remote_file(destination, mode).close()
+        # Preallocates the file, so segments can be written in any order.
+        self._client.truncate(destination.encode(self._encoding), size)
+        for offset, length in ranges:
+            self._transfer(length, '_put_segment', source, destination, offset, length)
+
+    def _put_segment(self, source, destination, offset, length):
+        remote_file = SFTPFileWriter(self._client, self._open_remote_file(destination.encode(self._encoding), 0))
+        block = bytearray(self.block_size)
+        view = memoryview(block)
+        end = offset + length
+        with open(source, 'rb') as local_file:
+            local_file.seek(offset)
+            position = offset
+            while position < end:
+                size = local_file.readinto(view[:min(self.block_size, end - position)])
+                if not size:
+                    break
+                self._write_to_remote_file(remote_file, view[:size], position)
+                position += size
             self._close_remote_file(remote_file)
 
+    def _get_file_in_segments(self, remote_path, local_path, size, ranges):
+        logger.info(f"Downloading '{remote_path}' in {len(ranges)} segments.")
+        with open(local_path, 'wb') as local_file:
+            local_file.truncate(size)
+        for offset, length in ranges:
+            self._transfer(length, '_get_segment', remote_path, local_path, offset, length)
+
+    def _get_segment(self, remote_path, local_path, offset, length):
+        with self._client.open(remote_path.encode(self._encoding), 'rb') as remote_file, \
+                open(local_path, 'r+b') as local_file:
+            remote_file.seek(offset)
+            remote_file.prefetch(offset + length)
+            local_file.seek(offset)
+            remaining = length
+            while remaining:
+                data = remote_file.read(min(self.block_size, remaining))
+                if not data:
+                    break
+                local_file.write(data)
+                remaining -= len(data)
+
+    def _verify_checksum(self, local_path, remote_path, size):
+        remote_checksum = self._remote_checksum(remote_path, size)
+        if remote_checksum is None:
+            logger.warn(f"Checksum of '{remote_path}' could not be calculated on the remote host. "
+                        f"Transferred file was not verified.")
+        elif remote_checksum != self._local_checksum(local_path, size):
+            raise SSHClientException(f"Checksums of '{local_path}' and '{remote_path}' do not match "
+                                     f"after the transfer.")
+
+    @contextmanager
+    def _parallel(self, parallel_transfers):
+        """Transfers the files queued inside the block in parallel.
+
+        Worker threads with their own SFTP sessions start transferring the
+        queued files, largest first, while the block is still finding more.
+        When the block exits, this client helps to transfer the rest.
+
+        Nested blocks join the outermost one. With less than two parallel
+        transfers files are transferred immediately, one at a time.
+        """
+        parallel_transfers = int(parallel_transfers or 1)
+        if self._transfers is not None or parallel_transfers < 2:
+            yield
+            return
+        transfers = self._transfers = queue.PriorityQueue()
+        errors = []
+        threads = [threading.Thread(target=self._process_transfers, args=(index, transfers, errors))
+                   for index in range(1, parallel_transfers)]
+        for thread in threads:
+            thread.daemon = True
+            thread.start()
+        try:
+            try:
+                yield
+            except BaseException:
+                errors.append(None)
+                raise
+            self._process_transfers(0, transfers, errors)
+        finally:
+            for index, _ in enumerate(threads):
+                transfers.put((float('inf'), index, None, ()))
+            for thread in threads:
+                thread.join()
+            self._transfers = None
+            self._sizes = {}
+        if errors:
+            raise errors[0]
+
+    def _transfer(self, size, method, *args):
+        if self._transfers is None:
+            getattr(self, method)(*args)
+        else:
+            # Largest files first so that a big file started last does not
+            # leave the other sessions idle at the end.
+            self._transfers.put((-(size or 0), next(self._transfer_numbers), method, args))
+
+    def _remote_size(self, path):
+        if self._transfers is None:
+            return None
+        if path not in self._sizes:
+            self._stat(path)
+        return self._sizes[path]
+
+    def _process_transfers(self, index, transfers, errors):
+        """Transfers queued files until the queue is closed or a transfer
+        fails. This client, index 0, stops when the queue is empty."""
+        client = None
+        try:
+            while not errors:
+                try:
+                    _, _, method, args = transfers.get(block=index != 0)
+                except queue.Empty:
+                    return
+                if method is None:
+                    return
+                client = client or self._get_worker(index)
+                getattr(client, method)(*args)
+        except Exception as error:
+            errors.append(error)
+
+    def _get_worker(self, index):
+        """Returns a client with its own SFTP session for the parallel
+        transfer `index`. Index 0 is this client itself."""
+        if not index:
+            return self
+        if index not in self._workers:
+            self._workers[index] = self.__class__(self.ssh_client, self._encoding)
+        worker = self._workers[index]
+        worker.block_size = self.block_size
+        worker._remote_files = self._remote_files
+        return worker
+
     def _list(self, path):
         path = path.encode(self._encoding)
         for item in self._client.listdir_attr(path):
-            filename = item.filename
-            if is_bytes(filename):
-                filename = filename.decode(self._encoding)
-            yield SFTPFileInfo(filename, item.st_mode)
+            yield self._to_file_info(item)
+
+    def _to_file_info(self, attributes):
+        filename = attributes.filename
+        if is_bytes(filename):
+            filename = filename.decode(self._encoding)
+        return SFTPFileInfo(filename, attributes.st_mode, attributes.st_size)
 
     def _stat(self, path):
-        path = path.encode(self._encoding)
-        attributes = self._client.stat(path)
-        return SFTPFileInfo('', attributes.st_mode)
+        attributes = self._client.stat(path.encode(self._encoding))
+        if self._transfers is not None:
+            self._sizes[path] = attributes.st_size
+        return SFTPFileInfo('', attributes.st_mode, attributes.st_size)
+
+    def _stat_all(self, paths):
+        """Stats the remote `paths` using pipelined requests.
+
+        Returns `SFTPFileInfo` objects in the order of `paths`, and `None`
+        for the paths that could not be stat'ed.
+        """
+        results = []
+        requests = SFTPRequestPipeline(self._client)
+        for index, path in enumerate(paths):
+            results.append(None)
+            requests.stat(path.encode(self._encoding),
+                          lambda attributes, index=index: self._set_stat_result(results, index, attributes))
+        requests.wait()
+        return results
+
+    def _set_stat_result(self, results, index, attributes):
+        if attributes:
+            results[index] = SFTPFileInfo('', attributes.st_mode, attributes.st_size)
 
     def _create_remote_file(self, destination, mode):
-        file_exists = self.is_file(destination)
+        if self._is_known_remote_file(destination):
+            # The file exists already and its mode is left as it is.
+            return SFTPFileWriter(self._client, self._open_remote_file(destination.encode(self._encoding),
+                                                                       SFTP_FLAG_TRUNC))
         destination = destination.encode(self._encoding)
-        remote_file = self._client.file(destination, 'wb')
-        remote_file.set_pipelined(True)
-        if not file_exists and mode:
-            self._client.chmod(destination, mode)
+        attributes = paramiko.SFTPAttributes()
+        attributes.st_mode = mode or None
+        try:
+            remote_file = self._open_remote_file(destination, SFTP_FLAG_EXCL, attributes)
+        except IOError as error:
+            if not self._file_exists_error(error, destination):
+                raise
+            # The file exists already and its mode is left as it is.
+            return SFTPFileWriter(self._client, self._open_remote_file(destination, SFTP_FLAG_TRUNC))
+        remote_file = SFTPFileWriter(self._client, remote_file)
+        if mode:
+            # Servers apply their umask to the mode given when opening.
+            remote_file.set_mode(mode)
         return remote_file
 
+    def _file_exists_error(self, error, path):
+        # SFTP version 3 has no status for existing files, so servers report
+        # them as a generic failure. Whether the file exists is then checked.
+        if error.errno == errno.EEXIST:
+            return True
+        if error.errno is not None:
+            return False
+        try:
+            return not stat.S_ISDIR(self._client.stat(path).st_mode or 0)
+        except IOError:
+            return False
+
+    def _open_remote_file(self, path, flags, attributes=None):
+        response, message = self._client._request(CMD_OPEN, path, SFTP_FLAG_WRITE | SFTP_FLAG_CREATE | flags,
+                                                  attributes or paramiko.SFTPAttributes())
+        if response != CMD_HANDLE:
+            raise SSHClientException(f"Opening remote file '{path.decode(self._encoding)}' failed.")
+        return paramiko.SFTPFile(self._client, message.get_binary(), 'wb')
+
     def _write_to_remote_file(self, remote_file, data, position):
-        remote_file.write(data)
+        remote_file.write(data, position)
 
     def _close_remote_file(self, remote_file):
         remote_file.close()
 
-    def _get_file(self, remote_path, local_path, scp_preserve_times):
-        remote_path = remote_path.encode(self._encoding)
-        self._client.get(remote_path, local_path)
+    def _get_file(self, remote_path, local_path, scp_preserve_times, resume=False):
+        position = 0
+        if resume and os.path.isfile(local_path):
+            remote_size = self._client.stat(remote_path.encode(self._encoding)).st_size
+            position = self._get_resume_position(local_path, remote_path, remote_size,
+                                                 os.path.getsize(local_path), resume)
+        if not position:
+            self._client.get(remote_path.encode(self._encoding), local_path)
+            return
+        if position == remote_size:
+            return
+        logger.info(f"Resuming download of '{remote_path}' at byte {position}.")
+        with self._client.open(remote_path.encode(self._encoding), 'rb') as remote_file, \
+                open(local_path, 'ab') as local_file:
+            remote_file.seek(position)
+            remote_file.prefetch(remote_size)
+            while True:
+                data = remote_file.read(self.block_size)
+                if not data:
+                    break
+                local_file.write(data)
+
+    def _get_resume_mode(self, resume):
+        if str(resume).lower() == 'checksum':
+            return 'checksum'
+        return is_truthy(resume)
+
+    def _get_resume_position(self, local_path, remote_path, size, existing_size, resume):
+        """Returns the position where a transfer of `size` bytes continues,
+        when `existing_size` bytes have already been transferred.
+
+        Returns `0` if the transfer must start from the beginning, because
+        there is nothing to continue or the existing content does not match.
+        """
+        if not existing_size or existing_size > size:
+            return 0
+        if resume == 'checksum':
+            remote_checksum = self._remote_checksum(remote_path, existing_size)
+            if not remote_checksum or remote_checksum != self._local_checksum(local_path, existing_size):
+                return 0
+        return existing_size
+
+    def _local_checksum(self, path, length):
+        """Returns the SHA-256 checksum of the first `length` bytes of the
+        local file `path`."""
+        checksum = hashlib.sha256()
+        with open(path, 'rb') as local_file:
+            remaining = length
+            while remaining:
+                data = local_file.read(min(remaining, self.block_size))
+                if not data:
+                    break
+                checksum.update(data)
+                remaining -= len(data)
+        return checksum.hexdigest()
+
+    def _remote_checksum(self, path, length):
+        """Returns the SHA-256 checksum of the first `length` bytes of the
+        remote file `path`, or `None` if it cannot be calculated.
+
+        The checksum is calculated on the remote host using `head` and
+        `sha256sum`.
+        """
+        command = f'head -c {length} -- {shlex.quote(path)} | sha256sum'
+        _, stdout, _ = self.ssh_client.exec_command(command.encode(self._encoding))
+        output = stdout.read().decode('ASCII', 'replace').split()
+        if not output or len(output[0]) != 64:
+            return None
+        return output[0]
 
     def _absolute_path(self, path):
         if not self._is_windows_path(path):
@@ -1574,9 +3143,6 @@ class SFTPClient(object):
     def _is_windows_path(self, path):
         return bool(ntpath.splitdrive(path)[0])
 
-    def _readlink(self, path):
-        return self._client.readlink(path)
-
 
 class SCPClient(object):
     def __init__(self, ssh_client):
@@ -1613,14 +3179,451 @@ class SCPTransferClient(SFTPClient):
         self._scp_client = scp.SCPClient(ssh_client.get_transport())
         super(SCPTransferClient, self).__init__(ssh_client, encoding)
 
-    def _put_file(self, source, destination, mode, newline, path_separator, scp_preserve_times=False):
-        self._create_remote_file(destination, mode)
+    def _put_file(self, source, destination, mode, newline, path_separator, scp_preserve_times=False,
+                  resume=False):
+        self._create_remote_file(destination, mode).close()
         self._scp_client.put(source, destination, preserve_times=is_truthy(scp_preserve_times))
 
-    def _get_file(self, remote_path, local_path, scp_preserve_times=False):
+    def _get_segments(self, size, segments, segment_size):
+        # scp transfers files only as a whole.
+        return []
+
+    def _get_file(self, remote_path, local_path, scp_preserve_times=False, resume=False):
         self._scp_client.get(remote_path, local_path, preserve_times=is_truthy(scp_preserve_times))
 
 
+class TarTransferClient(object):
+    """Transfers directories as tar archives streamed through `tar` run on
+    the remote host.
+
+    The archive is packed and unpacked while it is transferred, so no
+    archive files are created on either machine. Modes, modification times
+    and symlinks are kept. If `tar` cannot be run on the remote host, the
+    directories are transferred with the given SFTP client instead.
+    """
+    BUFFER_SIZE = 65536
+    # Marker bytes written by the remote command before the archive.
+    PLAIN = b't'
+    GZIP = b'z'
+    COMPRESSIONS = ('gzip',)
+
+    def __init__(self, ssh_client, sftp_client):
+        self._ssh_client = ssh_client
+        self._sftp = sftp_client
+
+    def put_directory(self, source, destination, scp_preserve_times, mode, newline,
+                      path_separator='/', recursive=False, parallel_transfers=1,
+                      newline_pattern=None, compression=None):
+        """Uploads the directory `source` to `destination` as a tar archive.
+
+        `mode`, `newline`, `newline_pattern`, `scp_preserve_times` and
+        `parallel_transfers` are only used if the directory is transferred
+        with SFTP, because `tar` is not available on the remote host.
+
+        :param str compression: If `gzip`, the archive is compressed, if
+            `gzip` is available on the remote host.
+
+        :returns: A list of 2-tuples for all the uploaded files. These tuples
+            contain the local path as the first value and the remote target
+            path as the second.
+        """
+        self._sftp._verify_local_dir_exists(source)
+        target = self._sftp._remove_ending_path_separator(path_separator, destination)
+        if self._sftp.is_dir(target):
+            target += path_separator + os.path.basename(os.path.normpath(source))
+        channel, compressed = self._start(f'mkdir -p -- {shlex.quote(target)} || exit 1',
+                                          target, 'xpof -', compression)
+        if not channel:
+            return self._sftp.put_directory(source, destination, scp_preserve_times, mode, newline,
+                                            path_separator, recursive, parallel_transfers,
+                                            newline_pattern)
+        files = []
+        stream = ArchiveChannel(channel, compressed)
+        try:
+            with tarfile.open(fileobj=stream, mode='w|', bufsize=self.BUFFER_SIZE) as archive:
+                self._pack(archive, source, target, path_separator, recursive, files)
+        except (OSError, tarfile.TarError) as error:
+            channel.close()
+            raise SSHClientException(f"Packing '{source}' failed: {error}")
+        finally:
+            stream.close()
+        self._wait(channel, f"Unpacking the archive to '{target}' on the remote host failed")
+        return files
+
+    def _pack(self, archive, source, target, path_separator, recursive, files):
+        def add_file(member):
+            if member.isfile():
+                name = member.name[2:]
+                files.append((os.path.join(source, *name.split('/')), target + path_separator + name))
+            return member
+
+        archive.add(source, arcname='.', recursive=recursive, filter=add_file)
+        if not recursive:
+            for item in sorted(os.listdir(source)):
+                local_path = os.path.join(source, item)
+                if os.path.isfile(local_path):
+                    archive.add(local_path, arcname='./' + item, filter=add_file)
+
+    def get_directory(self, source, destination, scp_preserve_times, path_separator='/',
+                      recursive=False, parallel_transfers=1, compression=None):
+        """Downloads the directory `source` to `destination` as a tar archive.
+
+        `scp_preserve_times` and `parallel_transfers` are only used if the
+        directory is transferred with SFTP, because `tar` is not available
+        on the remote host.
+
+        :param str compression: If `gzip`, the archive is compressed, if
+            `gzip` is available on the remote host.
+
+        :returns: A list of 2-tuples for all the downloaded files. These tuples
+            contain the remote path as the first value and the local target
+            path as the second.
+        """
+        source = self._sftp._remove_ending_path_separator(path_separator, source)
+        if recursive:
+            names = ['.']
+        else:
+            names = ['./' + name for name in
+                     self._sftp._get_file_names(source, self._sftp._list_remote_dir(source))]
+        channel, compressed = None, False
+        if names:
+            channel, compressed = self._start('', source, f"cf - {' '.join(shlex.quote(name) for name in names)}",
+                                              compression)
+        if not channel:
+            return self._sftp.get_directory(source, destination, scp_preserve_times, path_separator,
+                                            recursive, parallel_transfers)
+        destination = self._sftp.build_destination(source, destination, path_separator)
+        files = []
+        try:
+            with LocalTarFile.open(fileobj=ArchiveChannel(channel, compressed), mode='r|',
+                                   bufsize=self.BUFFER_SIZE) as archive:
+                members = self._unpacked(archive, source, destination, path_separator, files)
+                if hasattr(tarfile, 'tar_filter'):
+                    archive.extractall(destination, members, filter='tar')
+                else:
+                    archive.extractall(destination, members)
+        except tarfile.TarError as error:
+            self._wait(channel, f"Packing '{source}' on the remote host failed")
+            raise SSHClientException(f"Unpacking the archive of '{source}' failed: {error}")
+        self._wait(channel, f"Packing '{source}' on the remote host failed")
+        return files or [(source, destination)]
+
+    def _unpacked(self, archive, source, destination, path_separator, files):
+        for member in archive:
+            if member.isfile():
+                name = member.name[2:] if member.name.startswith('./') else member.name
+                files.append((source + path_separator + name,
+                              os.path.abspath(os.path.join(destination, *name.split('/')))))
+            yield member
+
+    def _start(self, prepare, directory, arguments, compression):
+        """Starts `tar` with `arguments` in the remote `directory`.
+
+        :returns: A 2-tuple containing the channel of the command and whether
+            the archive is gzip compressed, or `(None, False)` if `tar` could
+            not be started.
+        """
+        if compression and str(compression).lower() not in self.COMPRESSIONS:
+            raise SSHClientException(f"Invalid compression '{compression}'. "
+                                     f"Supported values are {' and '.join(self.COMPRESSIONS)}.")
+        lines = ['command -v tar >/dev/null 2>&1 || exit 1']
+        if prepare:
+            lines.append(prepare)
+        lines.append(f'cd -- {shlex.quote(directory)} || exit 1')
+        if compression:
+            lines.append(f'if command -v gzip >/dev/null 2>&1; then '
+                         f'printf {self.GZIP.decode()}; exec tar -z{arguments}; fi')
+        lines.append(f'printf {self.PLAIN.decode()}; exec tar -{arguments}')
+        channel = self._ssh_client.get_transport().open_session()
+        channel.exec_command('\n'.join(lines).encode(self._sftp._encoding))
+        marker = channel.recv(1)
+        if marker not in (self.PLAIN, self.GZIP):
+            channel.close()
+            logger.info("Running 'tar' on the remote host failed, transferring with SFTP.")
+            return None, False
+        return channel, marker == self.GZIP
+
+    def _wait(self, channel, message):
+        stderr = channel.makefile_stderr('rb').read()
+        if channel.recv_exit_status() != 0:
+            stderr = stderr.decode(self._sftp._encoding, 'replace').strip()
+            raise SSHClientException(f'{message}: {stderr}')
+
+
+class ArchiveChannel(object):
+    """File-like access to an archive sent or received through a channel.
+
+    Used as the file object of a streamed tar archive. The data is gzip
+    compressed or decompressed on the fly if `compressed` is true.
+    """
+    RECEIVE_SIZE = 65536
+
+    def __init__(self, channel, compressed=False):
+        self._channel = channel
+        self._compressor = None
+        self._decompressor = None
+        if compressed:
+            self._compressor = zlib.compressobj(6, zlib.DEFLATED, 16 + zlib.MAX_WBITS)
+            self._decompressor = zlib.decompressobj(16 + zlib.MAX_WBITS)
+        self._pending = b''
+        self._eof = False
+        self._send_failed = False
+
+    def write(self, data):
+        size = len(data)
+        if self._compressor:
+            data = self._compressor.compress(data)
+        if data:
+            self._send(data)
+        return size
+
+    def close(self):
+        """Sends the rest of the archive and signals its end."""
+        if self._compressor:
+            self._send(self._compressor.flush())
+            self._compressor = None
+        self._channel.shutdown_write()
+
+    def _send(self, data):
+        # The channel is closed if the remote command has failed. The rest of
+        # the archive is then dropped and the failure is reported based on
+        # the exit status of the command.
+        if not self._send_failed:
+            try:
+                self._channel.sendall(data)
+            except OSError:
+                self._send_failed = True
+
+    def read(self, size=-1):
+        while not self._pending and not self._eof:
+            data = self._channel.recv(self.RECEIVE_SIZE)
+            if not data:
+                self._eof = True
+                self._pending = self._decompressor.flush() if self._decompressor else b''
+            else:
+                self._pending = self._decompressor.decompress(data) if self._decompressor else data
+        if size < 0:
+            size = len(self._pending)
+        data, self._pending = self._pending[:size], self._pending[size:]
+        return data
+
+
+class LocalTarFile(tarfile.TarFile):
+    """Tar archive extracted without changing the owner of the files, so
+    that they are owned by the local user like files downloaded with SFTP."""
+
+    def chown(self, tarinfo, targetpath, numeric_owner):
+        pass
+
+
+class NewlineConverter(object):
+    """Converts the line breaks of data read in blocks to `newline`.
+
+    `\\r\\n`, `\\r` and `\\n` are all converted. A `\\r` ending a block is
+    held back until the next block shows whether it starts a `\\r\\n`, so
+    the result does not depend on where the blocks are split.
+    """
+
+    def __init__(self, newline):
+        self._newline = newline
+        self._pending_cr = False
+
+    def convert(self, data):
+        """Returns the converted `data` as bytes."""
+        data = bytes(data)
+        prefix = b''
+        if self._pending_cr:
+            prefix = self._newline
+            if data.startswith(b'\n'):
+                data = data[1:]
+        self._pending_cr = data.endswith(b'\r')
+        if self._pending_cr:
+            data = data[:-1]
+        if b'\r' in data:
+            data = data.replace(b'\r\n', b'\n').replace(b'\r', b'\n')
+        if self._newline != b'\n':
+            data = data.replace(b'\n', self._newline)
+        return prefix + data if prefix else data
+
+    def flush(self):
+        """Returns what is held back after the last block."""
+        if self._pending_cr:
+            self._pending_cr = False
+            return self._newline
+        return b''
+
+
+class SFTPRequestPipeline(object):
+    """Sends SFTP requests without waiting for the responses to the earlier
+    ones.
+
+    Every request can be given a callback, which is called with the type and
+    the message of its response. Responses are handled in the order they
+    arrive, which is not necessarily the order of the requests. At most
+    `MAX_PENDING_REQUESTS` requests are unanswered at a time, so the server
+    is never left waiting for its responses to be read.
+
+    Callbacks may send new requests, so requests depending on the response
+    to another one, like reading a directory after opening it, can be
+    pipelined as well. An exception raised by a callback is raised by the
+    `send` or `wait` call that handled the response.
+    """
+    MAX_PENDING_REQUESTS = 64
+
+    def __init__(self, sftp):
+        self._sftp = sftp
+        self._callbacks = {}
+        self._responses = deque()
+        self._unanswered = 0
+        self._handling = False
+
+    def send(self, request_type, *args, callback=None):
+        """Sends a request and returns its request id."""
+        while self._unanswered >= self.MAX_PENDING_REQUESTS:
+            self._sftp._read_response()
+        request = self._sftp._async_request(self, request_type, *args)
+        self._callbacks[request] = callback
+        self._unanswered += 1
+        self._handle_responses()
+        return request
+
+    def wait(self):
+        """Waits until all the requests, also the ones sent by callbacks
+        while waiting, are answered and their responses handled."""
+        while self._callbacks:
+            if not self._responses:
+                self._sftp._read_response()
+            self._handle_responses()
+
+    def check(self, response_type, message, expected_type=CMD_STATUS):
+        """Returns the `message` of a response of the `expected_type`.
+
+        Raises `IOError`, or `EOFError` at the end of a file or directory,
+        if the response is an error status.
+        """
+        if response_type == CMD_STATUS:
+            self._sftp._convert_status(message)
+        if response_type != expected_type:
+            raise SSHClientException(f'Unexpected response to SFTP request: {response_type}.')
+        return message
+
+    def stat(self, path, callback):
+        """Stats `path` and calls `callback` with its attributes, or with
+        `None` if it cannot be stat'ed."""
+        def received(response_type, message):
+            try:
+                message = self.check(response_type, message, CMD_ATTRS)
+            except IOError:
+                callback(None)
+            else:
+                callback(paramiko.SFTPAttributes._from_msg(message))
+        self.send(CMD_STAT, path, callback=received)
+
+    def mkdir(self, path, mode):
+        """Creates the directory `path`. Raises `IOError` if that fails."""
+        attributes = paramiko.SFTPAttributes()
+        attributes.st_mode = mode
+        self.send(CMD_MKDIR, path, attributes, callback=self.check)
+
+    def listdir(self, path, callback):
+        """Lists the directory `path` and calls `callback` with its items as
+        `SFTPAttributes`, or with `None` if it cannot be listed.
+
+        The directory is read one request at a time, but any number of
+        directories can be listed at the same time.
+        """
+        items = []
+
+        def opened(response_type, message):
+            try:
+                handle = self.check(response_type, message, CMD_HANDLE).get_binary()
+            except IOError:
+                callback(None)
+            else:
+                self.send(CMD_READDIR, handle, callback=lambda *response: read(handle, *response))
+
+        def read(handle, response_type, message):
+            try:
+                message = self.check(response_type, message, CMD_NAME)
+            except (IOError, EOFError) as error:
+                self.send(CMD_CLOSE, handle)
+                callback(items if isinstance(error, EOFError) else None)
+                return
+            for _ in range(message.get_int()):
+                filename = message.get_text()
+                longname = message.get_text()
+                attributes = paramiko.SFTPAttributes._from_msg(message, filename, longname)
+                if filename not in ('.', '..'):
+                    items.append(attributes)
+            self.send(CMD_READDIR, handle, callback=lambda *response: read(handle, *response))
+
+        self.send(CMD_OPENDIR, path, callback=opened)
+
+    def _handle_responses(self):
+        # Callbacks sending requests must not handle responses themselves.
+        if self._handling:
+            return
+        self._handling = True
+        try:
+            while self._responses:
+                request, response_type, message = self._responses.popleft()
+                callback = self._callbacks.pop(request)
+                if callback:
+                    callback(response_type, message)
+        finally:
+            self._handling = False
+
+    def _async_response(self, response_type, message, request):
+        # Called by paramiko for every response to a request of this pipeline.
+        self._unanswered -= 1
+        self._responses.append((request, response_type, message))
+
+
+class SFTPFileWriter(object):
+    """Writes a remote file opened with SFTP using pipelined write requests.
+
+    Data is sent as write requests of at most `REQUEST_SIZE` bytes without
+    waiting for the server to acknowledge the earlier ones. Every
+    acknowledgement is checked, so a failed write is reported when it is
+    noticed instead of being silently ignored.
+    """
+    REQUEST_SIZE = 32768
+
+    def __init__(self, sftp, remote_file):
+        self._file = remote_file
+        self._requests = SFTPRequestPipeline(sftp)
+
+    def set_mode(self, mode):
+        """Sends a request to change the mode of the remote file."""
+        attributes = paramiko.SFTPAttributes()
+        attributes.st_mode = mode
+        self._send(CMD_FSETSTAT, self._file.handle, attributes)
+
+    def write(self, data, position):
+        """Sends `data` to be written at `position` of the remote file.
+
+        The data is copied to the request messages before returning, so the
+        caller may reuse its buffer.
+        """
+        data = memoryview(data)
+        for start in range(0, len(data), self.REQUEST_SIZE):
+            self._send(CMD_WRITE, self._file.handle, int64(position + start),
+                       data[start:start + self.REQUEST_SIZE])
+
+    def close(self):
+        """Closes the file and waits until all requests are acknowledged.
+
+        The close request is pipelined with the preceding requests, so
+        closing does not cost a round trip of its own.
+        """
+        self._send(CMD_CLOSE, self._file.handle)
+        self._file._closed = True
+        self._requests.wait()
+
+    def _send(self, request_type, *args):
+        self._requests.send(request_type, *args, callback=self._requests.check)
+
+
 class RemoteCommand(object):
     """Base class for the remote command.
 
@@ -1628,11 +3631,15 @@ class RemoteCommand(object):
     language specific implementations for running the command on the remote
     host.
     """
+    OUTPUT_MODES = ('text', 'bytes', 'memoryview')
+    RECEIVE_SIZE = 65536
+    MAX_WAIT = 0.1
 
-    def __init__(self, command, encoding):
+    def __init__(self, command, encoding, compression=None):
         self._command = command
         self._encoding = encoding
         self._shell = None
+        self._decompressor = OutputDecompressor(compression) if compression else None
 
     def run_in(self, shell, sudo=False, sudo_password=None, invoke_subsystem=False):
         """Runs this command in the given `shell`.
@@ -1653,52 +3660,118 @@ class RemoteCommand(object):
         else:
             self._execute_with_sudo(sudo_password)
 
-    def read_outputs(self, timeout=None, output_during_execution=False, output_if_timeout=False):
-        stderr, stdout = self._receive_stdout_and_stderr(timeout, output_during_execution, output_if_timeout)
+    def read_outputs(self, timeout=None, output_during_execution=False, output_if_timeout=False,
+                     output_mode='text', idle_timeout=None):
+        """Reads the outputs and the return code of this command.
+
+        :param float timeout: Maximum time in seconds the command may run.
+
+        :param float idle_timeout: Maximum time in seconds the command may
+            run without writing anything to stdout or stderr. The time is
+            reset whenever output is received.
+
+        :param str output_mode: `text` decodes the outputs with the
+            connection encoding, `bytes` returns them as bytes and
+            `memoryview` returns memoryviews over the receive buffers, so that
+            the outputs are not copied once more after they have been read.
+
+        :returns: A 3-tuple (stdout, stderr, return_code).
+        """
+        output_mode = self._parse_output_mode(output_mode)
+        stderr, stdout = self._receive_stdout_and_stderr(timeout, output_during_execution, output_if_timeout,
+                                                         idle_timeout)
         rc = self._shell.recv_exit_status()
         self._shell.close()
-        return stdout, stderr, rc
-
-    def _receive_stdout_and_stderr(self, timeout=None, output_during_execution=False, output_if_timeout=False):
-        stdout_filebuffer = self._shell.makefile('rb', -1)
-        stderr_filebuffer = self._shell.makefile_stderr('rb', -1)
-        stdouts = []
-        stderrs = []
+        if self._decompressor:
+            self._decompressor.log_statistics()
+        return self._convert_output(stdout, output_mode), self._convert_output(stderr, output_mode), rc
+
+    @classmethod
+    def _parse_output_mode(cls, output_mode):
+        output_mode = str(output_mode or 'text').lower()
+        if output_mode not in cls.OUTPUT_MODES:
+            raise SSHClientException(f"Invalid output mode '{output_mode}'. Supported values are "
+                                     f"{', '.join(cls.OUTPUT_MODES)}.")
+        return output_mode
+
+    def _convert_output(self, output, output_mode):
+        if output_mode == 'bytes':
+            return bytes(output)
+        if output_mode == 'memoryview':
+            return memoryview(output)
+        return output.decode(self._encoding)
+
+    def _receive_stdout_and_stderr(self, timeout=None, output_during_execution=False, output_if_timeout=False,
+                                   idle_timeout=None):
+        stdout = bytearray()
+        stderr = bytearray()
+        end_time = time.time() + timeout if timeout else None
+        last_output_time = time.time()
         while self._shell_open():
-            self._flush_stdout_and_stderr(stderr_filebuffer, stderrs, stdout_filebuffer, stdouts, timeout,
-                                          output_during_execution, output_if_timeout)
-            time.sleep(0.01)  # lets not be so busy
-        stdout = (b''.join(stdouts) + stdout_filebuffer.read()).decode(self._encoding)
-        stderr = (b''.join(stderrs) + stderr_filebuffer.read()).decode(self._encoding)
+            if self._output_logging(stderr, stdout, output_during_execution):
+                last_output_time = time.time()
+            if not self._shell.status_event.is_set():
+                self._verify_not_timed_out(stderr, stdout, end_time, timeout, last_output_time, idle_timeout,
+                                           output_if_timeout)
+            self._wait_for_output(end_time, last_output_time, idle_timeout)
+        self._receive_remaining(self._shell.recv, stdout, self._decompress)
+        if self._decompressor:
+            stdout.extend(self._decompressor.flush())
+        self._receive_remaining(self._shell.recv_stderr, stderr)
         return stderr, stdout
 
-    def _flush_stdout_and_stderr(self, stderr_filebuffer, stderrs, stdout_filebuffer, stdouts, timeout=None,
-                                 output_during_execution=False, output_if_timeout=False):
-        if timeout:
-            end_time = time.time() + timeout
-            while time.time() < end_time:
-                if self._shell.status_event.wait(0):
-                    break
-                self._output_logging(stderr_filebuffer, stderrs, stdout_filebuffer, stdouts, output_during_execution)
-            if not self._shell.status_event.isSet():
-                if is_truthy(output_if_timeout):
-                    logger.info(stdouts)
-                    logger.info(stderrs)
-                raise SSHClientException(f'Timed out in {int(timeout)} seconds')
+    def _verify_not_timed_out(self, stderr, stdout, end_time, timeout, last_output_time, idle_timeout,
+                              output_if_timeout):
+        now = time.time()
+        if end_time and now >= end_time:
+            message = f'Timed out in {int(timeout)} seconds'
+        elif idle_timeout and now - last_output_time >= idle_timeout:
+            message = f'Timed out after {idle_timeout:g} seconds without output'
         else:
-            self._output_logging(stderr_filebuffer, stderrs, stdout_filebuffer, stdouts, output_during_execution)
+            return
+        if is_truthy(output_if_timeout):
+            logger.info(stdout.decode(self._encoding, 'replace'))
+            logger.info(stderr.decode(self._encoding, 'replace'))
+        raise SSHClientException(message)
+
+    def _wait_for_output(self, end_time, last_output_time, idle_timeout):
+        # Waking up regularly is still needed for noticing the exit status,
+        # which does not make the channel readable.
+        deadlines = [time.time() + self.MAX_WAIT]
+        if end_time:
+            deadlines.append(end_time)
+        if idle_timeout:
+            deadlines.append(last_output_time + idle_timeout)
+        wait = max(min(deadlines) - time.time(), 0)
+        select.select([self._shell], [], [], wait)
+
+    def _receive_remaining(self, recv, buffer, process=None):
+        while True:
+            data = recv(self.RECEIVE_SIZE)
+            if not data:
+                break
+            buffer.extend(process(data) if process else data)
+
+    def _decompress(self, data):
+        if self._decompressor:
+            return self._decompressor.decompress(data)
+        return data
 
-    def _output_logging(self, stderr_filebuffer, stderrs, stdout_filebuffer, stdouts, output_during_execution=False):
+    def _output_logging(self, stderr, stdout, output_during_execution=False):
+        received = False
         if self._shell.recv_ready():
-            stdout_output = stdout_filebuffer.read(len(self._shell.in_buffer))
+            stdout_output = self._decompress(self._shell.recv(len(self._shell.in_buffer)))
             if is_truthy(output_during_execution):
                 logger.console(stdout_output)
-            stdouts.append(stdout_output)
+            stdout.extend(stdout_output)
+            received = True
         if self._shell.recv_stderr_ready():
-            stderr_output = stderr_filebuffer.read(len(self._shell.in_stderr_buffer))
+            stderr_output = self._shell.recv_stderr(len(self._shell.in_stderr_buffer))
             if is_truthy(output_during_execution):
                 logger.console(stderr_output)
-            stderrs.append(stderr_output)
+            stderr.extend(stderr_output)
+            received = True
+        return received
 
     def _shell_open(self):
         return not (self._shell.closed or
@@ -1707,29 +3780,274 @@ class RemoteCommand(object):
                     not self._shell.active)
 
     def _execute(self):
-        self._shell.exec_command(self._command)
+        self._shell.exec_command(self._compressed(self._command))
 
     def _execute_with_sudo(self, sudo_password=None):
         command = self._command.decode(self._encoding)
         if sudo_password is None:
-            self._shell.exec_command('sudo ' + command)
+            self._shell.exec_command(self._compressed('sudo ' + command))
         else:
-            self._shell.exec_command(f'sudo --stdin --prompt "" {command}')
+            self._shell.exec_command(self._compressed(f'sudo --stdin --prompt "" {command}'))
             self._shell.sendall('\n\n' + sudo_password + '\n')
 
+    def _compressed(self, command):
+        if not self._decompressor:
+            return command
+        if is_bytes(command):
+            command = command.decode(self._encoding)
+        return self._decompressor.wrap(command).encode(self._encoding)
+
     def _invoke(self):
+        self._decompressor = None
         self._shell.invoke_subsystem(self._command)
 
 
+class OutputDecompressor(object):
+    """Decompresses the standard output of a command while it is read.
+
+    The command is wrapped with :py:meth:`wrap` so that its standard output
+    is piped through the first compressor found on the remote host. The
+    wrapped command writes a single marker byte before the output telling
+    which compressor was used, or that none was available and the output
+    is sent as is.
+    """
+
+    # Compressor name, marker byte and the remote command compressing stdin.
+    COMPRESSORS = (('zstd', b'z', 'zstd -q -c'),
+                   ('gzip', b'g', 'gzip -c'))
+    PLAIN = b'p'
+
+    def __init__(self, compression):
+        # True and Robot Framework's true strings like `yes` mean gzip.
+        if compression is True or str(compression).upper() in TRUE_STRINGS:
+            compression = 'gzip'
+        compression = str(compression).lower()
+        names = [name for name, _, _ in self.COMPRESSORS]
+        if compression not in names:
+            raise SSHClientException(f"Invalid compression '{compression}'. "
+                                     f"Supported values are {' and '.join(names)}.")
+        if compression == 'zstd' and not zstd:
+            logger.info("Decompressing zstd requires the 'zstandard' module, "
+                        "using gzip instead.")
+            compression = 'gzip'
+        self._compressors = self.COMPRESSORS[names.index(compression):]
+        self._decompressor = None
+        self._method = None
+        self._received = 0
+        self._decompressed = 0
+        self._start_time = time.time()
+
+    def wrap(self, command):
+        """Returns `command` wrapped to compress its standard output.
+
+        The exit status of the command is preserved. File descriptors 3 and
+        4 are used for passing the compressed output and the exit status
+        around the pipe and are closed for the command itself.
+        """
+        lines = []
+        for index, (name, marker, compressor) in enumerate(self._compressors):
+            lines.append(f"{'elif' if index else 'if'} command -v {name} >/dev/null 2>&1; then")
+            lines.append(f"printf {marker.decode()}; exec 3>&1")
+            lines.append(f"rc=$( {{ {{ ( {command}")
+            lines.append(f") 3>&- 4>&-; echo $? >&4; }} | {compressor} >&3 3>&- 4>&-; }} 4>&1 ); exit $rc")
+        lines.append(f"else printf {self.PLAIN.decode()}")
+        lines.append(command)
+        lines.append('fi')
+        return '\n'.join(lines)
+
+    def decompress(self, data):
+        """Decompresses the next chunk of the output."""
+        if not data:
+            return b''
+        self._received += len(data)
+        if not self._method:
+            self._method, data = data[:1], data[1:]
+            self._decompressor = self._create_decompressor(self._method)
+        if self._decompressor:
+            data = self._decompressor.decompress(data)
+        self._decompressed += len(data)
+        return data
+
+    def flush(self):
+        """Returns possible remaining decompressed output."""
+        if not self._decompressor or not hasattr(self._decompressor, 'flush'):
+            return b''
+        data = self._decompressor.flush()
+        self._decompressed += len(data)
+        return data
+
+    def _create_decompressor(self, marker):
+        if marker == b'g':
+            return zlib.decompressobj(16 + zlib.MAX_WBITS)
+        if marker == b'z':
+            if hasattr(zstd.ZstdDecompressor, 'decompressobj'):
+                return zstd.ZstdDecompressor().decompressobj()
+            return zstd.ZstdDecompressor()
+        if marker != self.PLAIN:
+            raise SSHClientException('Invalid compressed command output.')
+        return None
+
+    def log_statistics(self):
+        """Logs the achieved compression ratio and throughput."""
+        if not self._method:
+            return
+        elapsed = max(time.time() - self._start_time, 1e-6)
+        throughput = self._decompressed / elapsed / 1024 / 1024
+        if not self._decompressor:
+            logger.info(f'Compressor was not available on the remote host, received '
+                        f'{self._decompressed} bytes uncompressed in {elapsed:.2f} seconds '
+                        f'({throughput:.2f} MiB/s).')
+            return
+        name = [name for name, marker, _ in self._compressors if marker == self._method][0]
+        received = max(self._received - 1, 1)
+        logger.info(f'Received {received} bytes of {name} compressed output, '
+                    f'{self._decompressed} bytes decompressed (ratio {self._decompressed / received:.2f}), '
+                    f'in {elapsed:.2f} seconds ({throughput:.2f} MiB/s).')
+
+
+class SubsystemSession(object):
+    """A subsystem kept open for exchanging framed messages.
+
+    Unlike commands started with `invoke_subsystem`, the channel is not
+    closed after reading a reply but reused for any number of messages.
+    """
+
+    RECEIVE_SIZE = 65536
+
+    def __init__(self, channel, name, framer):
+        self._channel = channel
+        self.name = name
+        self._framer = framer
+
+    def send(self, message):
+        """Sends `message` (bytes) framed to the subsystem."""
+        if self._channel.closed:
+            raise SSHClientException(f"Subsystem '{self.name}' is closed.")
+        self._channel.sendall(self._framer.frame(message))
+
+    def read(self, timeout):
+        """Reads exactly one framed message from the subsystem.
+
+        Data received after the end of the message is kept for the
+        following reads.
+
+        :raises SSHClientException: If no complete message is received in
+            `timeout` seconds or the subsystem closes the channel.
+        """
+        end_time = time.time() + timeout
+        while True:
+            message = self._framer.next_message()
+            if message is not None:
+                return message
+            wait = end_time - time.time()
+            if wait <= 0:
+                raise SSHClientException(f"No complete message received from subsystem "
+                                         f"'{self.name}' in {timeout:g} seconds.")
+            if not self._channel.recv_ready():
+                select.select([self._channel], [], [], wait)
+                if not self._channel.recv_ready() and not self._channel.eof_received:
+                    continue
+            data = self._channel.recv(self.RECEIVE_SIZE)
+            if not data:
+                raise SSHClientException(f"Subsystem '{self.name}' closed the channel "
+                                         f"before a complete message was received.")
+            self._framer.feed(data)
+
+    def close(self):
+        self._channel.close()
+
+
+class MessageFramer(object):
+    """Frames outgoing messages and splits received data into messages.
+
+    With the `delimiter` framing each message is terminated with the
+    delimiter, which defaults to the NETCONF 1.0 end-of-message marker
+    `]]>]]>`. With the `chunked` framing messages are sent as length-prefixed
+    chunks as specified for NETCONF 1.1 in RFC 6242.
+
+    Received data is processed incrementally so that each byte is examined
+    only once regardless of how the data is split between reads.
+    """
+
+    FRAMINGS = ('delimiter', 'chunked')
+    DEFAULT_DELIMITER = b']]>]]>'
+    MAX_CHUNK_HEADER = 13
+
+    def __init__(self, framing='delimiter', delimiter=None):
+        framing = str(framing).lower()
+        if framing not in self.FRAMINGS:
+            raise SSHClientException(f"Invalid framing '{framing}'. "
+                                     f"Supported values are {' and '.join(self.FRAMINGS)}.")
+        self._chunked = framing == 'chunked'
+        self._delimiter = delimiter or self.DEFAULT_DELIMITER
+        self._buffer = bytearray()
+        self._scanned = 0
+        self._chunks = bytearray()
+
+    def frame(self, message):
+        if not self._chunked:
+            return message + self._delimiter
+        if not message:
+            raise SSHClientException('Chunked framing cannot send empty messages.')
+        return b'\n#%d\n%s\n##\n' % (len(message), message)
+
+    def feed(self, data):
+        self._buffer.extend(data)
+
+    def next_message(self):
+        """Returns the next complete message or `None` if there is none yet."""
+        if self._chunked:
+            return self._next_chunked_message()
+        return self._next_delimited_message()
+
+    def _next_delimited_message(self):
+        # The delimiter may have been split between reads, so the search
+        # continues from where a partial delimiter could have started.
+        start = max(self._scanned - len(self._delimiter) + 1, 0)
+        index = self._buffer.find(self._delimiter, start)
+        if index < 0:
+            self._scanned = len(self._buffer)
+            return None
+        message = bytes(self._buffer[:index])
+        del self._buffer[:index + len(self._delimiter)]
+        self._scanned = 0
+        return message
+
+    def _next_chunked_message(self):
+        while True:
+            header_end = self._buffer.find(b'\n', 1, self.MAX_CHUNK_HEADER)
+            if header_end < 0:
+                if len(self._buffer) >= self.MAX_CHUNK_HEADER:
+                    self._invalid_chunk_header()
+                return None
+            header = bytes(self._buffer[:header_end + 1])
+            if header == b'\n##\n':
+                del self._buffer[:header_end + 1]
+                message = bytes(self._chunks)
+                self._chunks = bytearray()
+                return message
+            if not header.startswith(b'\n#') or not header[2:-1].isdigit():
+                self._invalid_chunk_header()
+            size = int(header[2:-1])
+            if len(self._buffer) < header_end + 1 + size:
+                return None
+            self._chunks.extend(self._buffer[header_end + 1:header_end + 1 + size])
+            del self._buffer[:header_end + 1 + size]
+
+    def _invalid_chunk_header(self):
+        raise SSHClientException(f'Invalid chunk header in received data: {bytes(self._buffer[:20])!r}.')
+
+
 class SFTPFileInfo(object):
     """Wrapper class for the language specific file information objects.
 
     Returned by the concrete SFTP client implementations.
     """
 
-    def __init__(self, name, mode):
+    def __init__(self, name, mode, size=None):
         self.name = name
         self.mode = mode
+        self.size = size
 
     def is_regular(self):
         """Checks if this file is a regular file.
@@ -15,8 +15,6 @@
 
 from __future__ import print_function
 
-import re
-
 from .logger import logger
 
 from robot.utils import is_string, is_truthy, plural_or_not
@@ -140,6 +138,17 @@ class SSHLibrary:
 
     By default ``encoding_errors`` is set to ``strict``. ``encoding_errors``
     is new in SSHLibrary 3.7.0.
+
+    === Max buffer size ===
+
+    Argument ``max_buffer_size`` limits the number of characters of server
+    output kept in memory per shell, for example when `Read Until` does not
+    find a match in continuous output, or when output is left unconsumed.
+    If the limit is exceeded, the oldest output is discarded and can no
+    longer be read or matched. Use `Start Shell Transcript` to keep a full
+    record of long sessions. By default the size is not limited.
+    ``max_buffer_size`` is new in SSHLibrary 3.9.0.
+
     === Path separator ===
 
     Argument ``path_separator`` must be set to the one known by the operating
@@ -158,6 +167,29 @@ class SSHLibrary:
     using `Set Default Configuration`, `Set Client Configuration` and `Open
     Connection`.
 
+    === Parallel transfers ===
+
+    Argument ``parallel_transfers`` is the maximum number of files that
+    `Get File`, `Get Directory`, `Put File` and `Put Directory` transfer at
+    the same time. Each parallel transfer uses its own SFTP session on the
+    same connection, and the largest files are transferred first. Transferring
+    many files in parallel is considerably faster over high latency
+    connections. The additional sessions are opened when they are needed for
+    the first time and reused by later transfers. The default value is ``1``,
+    which transfers files one at a time. The value can also be given to the
+    file transfer keywords to override the connection specific value.
+    ``parallel_transfers`` is new in SSHLibrary 3.9.0.
+
+    === Block size ===
+
+    Argument ``block_size`` is the number of bytes `Put File` and
+    `Put Directory` read from a local file at a time. The blocks are sent
+    to the server as pipelined write requests without waiting for each
+    request to be acknowledged, which keeps the connection busy also over
+    high latency links. The default value is ``262144`` (256 KiB). Values
+    from 32 KiB to a few megabytes are sensible. ``block_size`` is new in
+    SSHLibrary 3.9.0.
+
     === Timeout ===
 
     Argument ``timeout`` is used by `Read Until` variants. The default value
@@ -182,6 +214,11 @@ class SSHLibrary:
     sequences that appear in the output when the remote machine has
     Windows as operating system.
 
+    The sequences are removed from the output as it is received, before
+    `Read Until` variants search it. Sequences split between two reads are
+    removed as well. Since SSHLibrary 3.9.0, non-ASCII characters are
+    preserved as is.
+
     == Not configurable per connection ==
 
     === Loglevel ===
@@ -211,12 +248,22 @@ class SSHLibrary:
        These keywords operate in an interactive shell, which means that changes
        to the environment are visible to the subsequent keywords.
 
+    Subsystems such as NETCONF can be run with `Execute Command` using its
+    ``invoke_subsystem`` argument, or kept open for exchanging several
+    messages using `Open Subsystem` and `Send Subsystem Request`.
+
     = Interactive shells =
 
     `Write`, `Write Bare`, `Write Until Expected Output`, `Read`,
     `Read Until`, `Read Until Prompt` and `Read Until Regexp` can be used
     to interact with the server within the same shell.
 
+    Several shells can be open on the same connection at the same time.
+    Additional shells are opened with `Open Shell` and the current shell
+    is changed with `Switch Shell`. Keywords writing and reading also
+    accept ``shell`` argument for using another than the current shell
+    without switching.
+
     == Consumed output ==
 
     All of these keywords, except `Write Bare`, consume the read or the written
@@ -239,9 +286,9 @@ class SSHLibrary:
 
     == Reading ==
 
-    `Read`, `Read Until`, `Read Until Prompt` and `Read Until Regexp` can be
-    used to read from the server. The read text is also consumed from
-    the server output.
+    `Read`, `Read Until`, `Read Until Prompt`, `Read Until Regexp` and
+    `Read Until Any` can be used to read from the server. The read text is
+    also consumed from the server output.
 
     `Read` reads everything available on the server output, thus clearing it.
 
@@ -388,6 +435,7 @@ class SSHLibrary:
      | OFF      | Transfer is done using SFTP only. This is the default value                                             |
      | TRANSFER | Directory listings (needed for logging) will be done using SFTP. Actual file transfer is done with SCP. |
      | ALL      | Only SCP is used for file transfer. No logging available.                                               |
+     | TAR      | `Put Directory` and `Get Directory` transfer the directory as a single tar archive. See `Transfer directories with tar`. |
 
      There are some limitations to the current SCP implementation::
      - When using SCP, files cannot be altered during transfer and ``newline`` argument does not work.
@@ -405,6 +453,72 @@ class SSHLibrary:
 
     ``scp_preserve_times`` was introduced in SSHLibrary 3.6.0.
 
+    == Transfer directories with tar ==
+    Transferring a directory file by file is slow when it contains lots of
+    small files, because every file costs several round trips to the remote
+    machine. With ``scp=TAR``, `Put Directory` and `Get Directory` instead
+    run ``tar`` on the remote machine and stream the whole directory through
+    it as a single archive. The archive is packed and unpacked on the fly,
+    so no archive files are created on either machine.
+
+    Modes, modification times and symlinks of the transferred files and
+    directories are kept, so the ``mode``, ``newline``, ``newline_pattern``
+    and ``scp_preserve_times`` arguments are not used. With
+    ``compression=gzip`` the archive is also compressed, which helps with
+    compressible files over slow links. Compression is skipped if
+    ``gzip`` is not available on the remote machine.
+
+    Tar transfer requires ``tar`` and a POSIX compatible shell on the remote
+    machine. If ``tar`` cannot be run, the directory is transferred with
+    SFTP instead. With other keywords ``scp=TAR`` is the same as ``scp=OFF``.
+
+    Transferring directories with tar is new in SSHLibrary 3.9.0.
+
+    = Resuming transfers =
+    `Put File` and `Get File` can continue transfers of large files that were
+    interrupted, for example, because the connection was lost. With
+    ``resume=True``, an existing destination file that is shorter than the
+    source file is considered a partial copy of it, and only the rest of the
+    source file is transferred and appended to it. Because files are written
+    in order, the partial destination file itself records how far the
+    transfer got. A destination file with the same size as the source file
+    is left as it is, and a larger one is overwritten.
+
+    With ``resume=checksum``, SHA-256 checksums of the existing destination
+    file and the beginning of the source file are compared first, and the
+    file is transferred completely if they differ. The remote checksum is
+    calculated with ``head`` and ``sha256sum`` on the remote machine, so they
+    must be available.
+
+    Resuming works only with SFTP. It is not used with ``scp`` enabled and,
+    when uploading, with the ``newline`` argument, because converting
+    newlines changes the size of the file.
+
+    Resuming transfers is new in SSHLibrary 3.9.0.
+
+    = Segmented transfers =
+    A single large file is transferred over one SFTP file handle, which
+    limits its throughput especially over high latency connections. With
+    ``segments``, `Put File` and `Get File` split files larger than two
+    segments into segments of ``segment_size`` bytes and transfer that many
+    segments at the same time, each over its own SFTP session. The
+    destination file is first created with its final size, and the segments
+    are written to it at their own offsets. The default ``segment_size`` is
+    ``16777216`` (16 MiB).
+
+    The sessions are shared with `Parallel transfers`, so other files are
+    transferred at the same time as well, using at most ``segments`` or
+    ``parallel_transfers`` sessions, whichever is larger. After the transfer
+    the SHA-256 checksums of the source and the destination file are
+    compared and the keyword fails if they differ. The remote checksum is
+    calculated with ``head`` and ``sha256sum`` on the remote machine. If they
+    are not available, a warning is logged instead.
+
+    Segmented transfers work only with SFTP. Files are not transferred in
+    segments when resuming or, when uploading, with the ``newline`` argument.
+
+    Segmented transfers are new in SSHLibrary 3.9.0.
+
     = Aliases =
     SSHLibrary allows the use of an alias when opening a new connection using the parameter ``alias``.
 
@@ -449,6 +563,9 @@ class SSHLibrary:
     DEFAULT_ENCODING = "UTF-8"
     DEFAULT_ESCAPE_ANSI = False
     DEFAULT_ENCODING_ERRORS = "strict"
+    DEFAULT_MAX_BUFFER_SIZE = None
+    DEFAULT_PARALLEL_TRANSFERS = 1
+    DEFAULT_BLOCK_SIZE = 262144
 
     def __init__(
         self,
@@ -463,6 +580,9 @@ class SSHLibrary:
         encoding=DEFAULT_ENCODING,
         escape_ansi=DEFAULT_ESCAPE_ANSI,
         encoding_errors=DEFAULT_ENCODING_ERRORS,
+        max_buffer_size=DEFAULT_MAX_BUFFER_SIZE,
+        parallel_transfers=DEFAULT_PARALLEL_TRANSFERS,
+        block_size=DEFAULT_BLOCK_SIZE,
     ):
         """SSHLibrary allows some import time `configuration`.
 
@@ -502,6 +622,9 @@ class SSHLibrary:
             encoding or self.DEFAULT_ENCODING,
             escape_ansi or self.DEFAULT_ESCAPE_ANSI,
             encoding_errors or self.DEFAULT_ENCODING_ERRORS,
+            max_buffer_size or self.DEFAULT_MAX_BUFFER_SIZE,
+            parallel_transfers or self.DEFAULT_PARALLEL_TRANSFERS,
+            block_size or self.DEFAULT_BLOCK_SIZE,
         )
         self._last_commands = dict()
 
@@ -523,6 +646,9 @@ class SSHLibrary:
         encoding=None,
         escape_ansi=None,
         encoding_errors=None,
+        max_buffer_size=None,
+        parallel_transfers=None,
+        block_size=None,
     ):
         """Update the default `configuration`.
 
@@ -566,6 +692,9 @@ class SSHLibrary:
             encoding=encoding,
             escape_ansi=escape_ansi,
             encoding_errors=encoding_errors,
+            max_buffer_size=max_buffer_size,
+            parallel_transfers=parallel_transfers,
+            block_size=block_size,
         )
 
     @keyword(tags=("configuration",))
@@ -581,6 +710,9 @@ class SSHLibrary:
         encoding=None,
         escape_ansi=None,
         encoding_errors=None,
+        max_buffer_size=None,
+        parallel_transfers=None,
+        block_size=None,
     ):
         """Update the `configuration` of the current connection.
 
@@ -621,6 +753,9 @@ class SSHLibrary:
             encoding=encoding,
             escape_ansi=escape_ansi,
             encoding_errors=encoding_errors,
+            max_buffer_size=max_buffer_size,
+            parallel_transfers=parallel_transfers,
+            block_size=block_size,
         )
 
     @keyword(tags=("configuration",))
@@ -660,6 +795,9 @@ class SSHLibrary:
         encoding=None,
         escape_ansi=None,
         encoding_errors=None,
+        max_buffer_size=None,
+        parallel_transfers=None,
+        block_size=None,
     ):
         """Opens a new SSH connection to the given ``host`` and ``port``.
 
@@ -728,6 +866,9 @@ class SSHLibrary:
         encoding = encoding or self._config.encoding
         escape_ansi = escape_ansi or self._config.escape_ansi
         encoding_errors = encoding_errors or self._config.encoding_errors
+        max_buffer_size = max_buffer_size or self._config.max_buffer_size
+        parallel_transfers = parallel_transfers or self._config.parallel_transfers
+        block_size = block_size or self._config.block_size
         client = SSHClient(
             host,
             alias,
@@ -742,6 +883,9 @@ class SSHLibrary:
             encoding,
             escape_ansi,
             encoding_errors,
+            max_buffer_size,
+            parallel_transfers,
+            block_size,
         )
         connection_index = self._connections.register(client, alias)
         client.config.update(index=connection_index)
@@ -1046,6 +1190,7 @@ class SSHLibrary:
         read_config=False,
         jumphost_index_or_alias=None,
         keep_alive_interval="0 seconds",
+        quiet_period=None,
     ):
         """Logs into the SSH server with the given ``username`` and ``password``.
 
@@ -1054,7 +1199,8 @@ class SSHLibrary:
         This keyword reads, returns and logs the server output after logging
         in. If the `prompt` is set, everything until the prompt is read.
         Otherwise the output is read using the `Read` keyword with the given
-        ``delay``. The output is logged using the default `log level`.
+        ``delay``, or with ``quiet_period`` if it is given. The output is
+        logged using the default `log level`.
 
         ``proxy_cmd`` is used to connect through a SSH proxy.
 
@@ -1082,6 +1228,10 @@ class SSHLibrary:
 
         ``keep_alive_interval`` is new in SSHLibrary 3.7.0.
 
+        ``quiet_period`` makes reading the output return once no output has
+        arrived for the given time instead of using a fixed ``delay``. See
+        `Read` for details. It is new in SSHLibrary 3.9.0.
+
         Example that logs in and returns the output:
 
         | `Open Connection` | linux.server.com |
@@ -1127,6 +1277,7 @@ class SSHLibrary:
             is_truthy(read_config),
             jumphost_connection,
             keep_alive_interval,
+            quiet_period,
         )
 
     @keyword(tags=("login",))
@@ -1142,6 +1293,7 @@ class SSHLibrary:
         jumphost_index_or_alias=None,
         read_config=False,
         keep_alive_interval="0 seconds",
+        quiet_period=None,
     ):
         """Logs into the SSH server using key-based authentication.
 
@@ -1169,7 +1321,8 @@ class SSHLibrary:
         This keyword reads, returns and logs the server output after logging
         in. If the `prompt` is set, everything until the prompt is read.
         Otherwise the output is read using the `Read` keyword with the given
-        ``delay``. The output is logged using the default `log level`.
+        ``delay``, or with ``quiet_period`` if it is given. The output is
+        logged using the default `log level`.
 
         Example that logs in using a private key and returns the output:
 
@@ -1196,6 +1349,10 @@ class SSHLibrary:
         set to ``0``, which means sending the ``keepalive`` packet is disabled.
 
         ``keep_alive_interval`` is new in SSHLibrary 3.7.0.
+
+        ``quiet_period`` makes reading the output return once no output has
+        arrived for the given time instead of using a fixed ``delay``. See
+        `Read` for details. It is new in SSHLibrary 3.9.0.
         """
         if proxy_cmd and jumphost_index_or_alias:
             raise ValueError(
@@ -1223,6 +1380,7 @@ class SSHLibrary:
             jumphost_connection,
             is_truthy(read_config),
             keep_alive_interval,
+            quiet_period,
         )
 
     def _login(self, login_method, username, *args):
@@ -1232,8 +1390,6 @@ class SSHLibrary:
         )
         try:
             login_output = login_method(username, *args)
-            if is_truthy(self.current.config.escape_ansi):
-                login_output = self._escape_ansi_sequences(login_output)
             self._log(f"Read output: {login_output}", self._config.loglevel)
             return login_output
         except SSHClientException as e:
@@ -1286,6 +1442,9 @@ class SSHLibrary:
         output_if_timeout=False,
         invoke_subsystem=False,
         forward_agent=False,
+        compression=None,
+        output_mode="TEXT",
+        idle_timeout=None,
     ):
         """Executes ``command`` on the remote machine and returns its outputs.
 
@@ -1352,6 +1511,41 @@ class SSHLibrary:
 
         ``output_if_timeout`` if the executed command doesn't end before reaching timeout, the parameter will log the
         output of the command at the moment of timeout.
+
+        ``compression`` compresses the standard output of the ``command`` on
+        the remote machine before it is transferred, which speeds up commands
+        printing lots of compressible text over slow links. Possible values
+        are ``gzip`` and ``zstd``, and true values like ``True`` that are the
+        same as ``gzip``. The output is decompressed while it is read
+        and the achieved compression ratio and throughput are logged. If the
+        compressor is not available on the remote machine, the output is
+        transferred uncompressed. ``zstd`` falls back to ``gzip`` on
+        the remote machine and requires the
+        [https://pypi.org/project/zstandard|zstandard] module locally.
+        Compression requires a POSIX compatible shell on the remote machine.
+
+        | ${dmesg}= | `Execute Command` | dmesg | compression=gzip |
+
+        ``output_mode`` defines the type of the returned standard output and
+        error. With the default ``TEXT`` they are decoded using the connection
+        `encoding` and the trailing newline is removed. With ``BYTES`` they
+        are returned untouched as bytes, which is useful with binary output
+        such as images. ``MEMORYVIEW`` is like ``BYTES`` but returns
+        memoryviews over the buffers the output was read into, avoiding one
+        more copy of large outputs.
+
+        | ${image}= | `Execute Command` | cat image.png | output_mode=BYTES |
+
+        ``idle_timeout`` makes this keyword fail if the ``command`` does not
+        write anything to the standard output or error during the given time.
+        Unlike ``timeout``, this time is restarted whenever new output is
+        received. A hanging command is thus noticed quickly even if it is
+        allowed to run for a long time in total:
+
+        | `Execute Command` | make all | timeout=2 hours | idle_timeout=5 minutes |
+
+        ``compression``, ``output_mode`` and ``idle_timeout`` are new in
+        SSHLibrary 3.9.0.
         """
         if not is_truthy(sudo):
             self._log(f"Executing command '{command}'.", self._config.loglevel)
@@ -1367,6 +1561,9 @@ class SSHLibrary:
             output_if_timeout,
             is_truthy(invoke_subsystem),
             forward_agent,
+            compression if is_truthy(compression) else None,
+            output_mode,
+            idle_timeout,
         )
         return self._return_command_output(stdout, stderr, rc, *opts)
 
@@ -1378,6 +1575,7 @@ class SSHLibrary:
         sudo_password=None,
         invoke_subsystem=False,
         forward_agent=False,
+        compression=None,
     ):
         """Starts execution of the ``command`` on the remote machine and returns immediately.
 
@@ -1419,7 +1617,10 @@ class SSHLibrary:
 
         ``forward_agent`` argument behaves similarly as with `Execute Command` keyword.
 
-        ``invoke_subsystem`` is new in SSHLibrary 3.4.0.
+        ``compression`` argument behaves similarly as with `Execute Command` keyword.
+
+        ``invoke_subsystem`` is new in SSHLibrary 3.4.0. ``compression`` is new
+        in SSHLibrary 3.9.0.
         """
         if not is_truthy(sudo):
             self._log(f"Starting command '{command}'.", self._config.loglevel)
@@ -1436,11 +1637,18 @@ class SSHLibrary:
             sudo_password,
             is_truthy(invoke_subsystem),
             is_truthy(forward_agent),
+            compression if is_truthy(compression) else None,
         )
 
     @keyword(tags=("command",))
     def read_command_output(
-        self, return_stdout=True, return_stderr=False, return_rc=False, timeout=None
+        self,
+        return_stdout=True,
+        return_stderr=False,
+        return_rc=False,
+        timeout=None,
+        output_mode="TEXT",
+        idle_timeout=None,
     ):
         """Returns outputs of the most recent started command.
 
@@ -1487,6 +1695,9 @@ class SSHLibrary:
         | ${stdout}=       | `Read Command Output` |
         | `Should Contain` | ${stdout}             | 'HELLO'  |
 
+        ``output_mode`` and ``idle_timeout`` arguments behave similarly as
+        with `Execute Command` keyword. They are new in SSHLibrary 3.9.0.
+
         This keyword logs the read command with log level ``INFO``.
         """
         self._log(
@@ -1495,11 +1706,101 @@ class SSHLibrary:
         )
         opts = self._legacy_output_options(return_stdout, return_stderr, return_rc)
         try:
-            stdout, stderr, rc = self.current.read_command_output(timeout=timeout)
+            stdout, stderr, rc = self.current.read_command_output(
+                timeout=timeout, output_mode=output_mode, idle_timeout=idle_timeout
+            )
         except SSHClientException as msg:
             raise RuntimeError(msg)
         return self._return_command_output(stdout, stderr, rc, *opts)
 
+    @keyword(tags=("command",))
+    def open_subsystem(self, name, framing="DELIMITER", delimiter=None):
+        """Opens subsystem ``name`` on the remote machine and keeps it open.
+
+        Unlike `Execute Command` with ``invoke_subsystem``, which opens a new
+        channel and starts the subsystem again for every command, the
+        subsystem opened with this keyword stays running and any number of
+        messages can be exchanged with it using `Send Subsystem Request`,
+        `Write Subsystem Message` and `Read Subsystem Message`. The
+        subsystem is closed with `Close Subsystem` or when the connection
+        is closed. The ``name`` is used for identifying the subsystem with
+        the other keywords.
+
+        ``framing`` defines how the messages are separated from each other:
+
+        - ``DELIMITER`` (default) ends each message with the ``delimiter``,
+          which defaults to ``]]>]]>`` used by NETCONF 1.0.
+
+        - ``CHUNKED`` sends messages as length-prefixed chunks as specified
+          for NETCONF 1.1 in [https://tools.ietf.org/html/rfc6242|RFC 6242].
+
+        Example:
+        | `Open Subsystem`          | netconf                  |
+        | ${hello}=                 | `Read Subsystem Message` | netconf         |
+        | `Write Subsystem Message` | netconf                  | ${CLIENT HELLO} |
+        | ${reply}=                 | `Send Subsystem Request` | netconf         | ${GET CONFIG} |
+        | `Close Subsystem`         | netconf                  |
+
+        New in SSHLibrary 3.9.0.
+        """
+        self._log(f"Opening subsystem '{name}'.", self._config.loglevel)
+        self._run_subsystem_command(self.current.open_subsystem, name, framing, delimiter)
+
+    @keyword(tags=("command",))
+    def send_subsystem_request(self, name, message, timeout=None, loglevel=None):
+        """Sends ``message`` to subsystem ``name`` and returns one reply message.
+
+        The subsystem must have been opened with `Open Subsystem`. The
+        ``message`` is framed as configured when opening the subsystem and
+        exactly one framed reply is read and returned without the framing.
+        Possible further messages are left to be read by the next keywords.
+
+        If no complete reply is received within ``timeout``, this keyword
+        fails. The ``timeout`` defaults to the connection `timeout`.
+
+        The reply is logged. ``loglevel`` can be used to override the
+        default `log level`.
+
+        New in SSHLibrary 3.9.0.
+        """
+        self.write_subsystem_message(name, message)
+        return self.read_subsystem_message(name, timeout, loglevel)
+
+    @keyword(tags=("command",))
+    def write_subsystem_message(self, name, message):
+        """Sends ``message`` to subsystem ``name`` without reading a reply.
+
+        See `Open Subsystem` for more details. New in SSHLibrary 3.9.0.
+        """
+        self._run_subsystem_command(self.current.send_subsystem_message, name, message)
+
+    @keyword(tags=("command",))
+    def read_subsystem_message(self, name, timeout=None, loglevel=None):
+        """Reads and returns exactly one message from subsystem ``name``.
+
+        See `Send Subsystem Request` for the meaning of ``timeout`` and
+        ``loglevel``, and `Open Subsystem` for more details.
+
+        New in SSHLibrary 3.9.0.
+        """
+        message = self._run_subsystem_command(self.current.read_subsystem_message, name, timeout)
+        self._log(message, loglevel)
+        return message
+
+    @keyword(tags=("command",))
+    def close_subsystem(self, name):
+        """Closes subsystem ``name`` opened with `Open Subsystem`.
+
+        New in SSHLibrary 3.9.0.
+        """
+        self._run_subsystem_command(self.current.close_subsystem, name)
+
+    def _run_subsystem_command(self, command, *args):
+        try:
+            return command(*args)
+        except SSHClientException as e:
+            raise RuntimeError(e)
+
     @keyword(tags=("connection",))
     def create_local_ssh_tunnel(
         self, local_port, remote_host, remote_port=22, bind_address=None
@@ -1536,6 +1837,59 @@ class SSHLibrary:
             local_port, remote_host, remote_port, bind_address
         )
 
+    @keyword(tags=("command",))
+    def start_resource_sampler(self, interval="1 second", output=None, format=None):
+        """Starts sampling resource usage of the remote machine in the background.
+
+        CPU, memory, load average and disk I/O are read from ``/proc`` every
+        ``interval`` over a single channel of the current connection while
+        other keywords keep running normally. The remote machine must thus
+        be Linux. Sampling continues until `Stop Resource Sampler` is used
+        or the connection is closed.
+
+        If ``output`` is given, samples are written to that local file as
+        they are collected. ``format`` can be ``CSV`` or ``JSON``, the latter
+        writing one JSON object per line. By default ``JSON`` is used if
+        ``output`` has extension ``.json`` or ``.jsonl`` and ``CSV`` otherwise.
+
+        Each sample contains the following values: ``timestamp``,
+        ``cpu_percent``, ``iowait_percent``, ``memory_used_percent``,
+        ``memory_used_kb``, ``load_1``, ``load_5``, ``load_15``,
+        ``disk_read_kb_per_second`` and ``disk_write_kb_per_second``.
+
+        Example:
+        | `Start Resource Sampler` | interval=0.5s                   | output=${OUTPUT DIR}/resources.csv |
+        | `Execute Command`        | ./run_load_test                 |
+        | ${stats}=                | `Stop Resource Sampler`         |
+        | `Should Be True`         | ${stats}[cpu_percent][max] < 90 |
+
+        New in SSHLibrary 3.9.0.
+        """
+        try:
+            self.current.start_resource_sampler(interval, output, format)
+        except SSHClientException as e:
+            raise RuntimeError(e)
+        if output:
+            self._log(f"Writing resource samples to '{output}'.", self._config.loglevel)
+
+    @keyword(tags=("command",))
+    def stop_resource_sampler(self):
+        """Stops the sampler started with `Start Resource Sampler` and returns statistics.
+
+        The returned dictionary contains the number of ``samples``, the
+        ``duration`` between the first and the last sample in seconds, and
+        for each sampled value a dictionary with its ``min``, ``max`` and
+        ``mean``. The statistics are also logged.
+
+        New in SSHLibrary 3.9.0.
+        """
+        try:
+            summary = self.current.stop_resource_sampler()
+        except SSHClientException as e:
+            raise RuntimeError(e)
+        self._log(f"Resource usage: {summary}", self._config.loglevel)
+        return summary
+
     def _legacy_output_options(self, stdout, stderr, rc):
         if not is_string(stdout):
             return stdout, stderr, rc
@@ -1552,9 +1906,9 @@ class SSHLibrary:
         self._log(f"Command exited with return code {rc}.", self._config.loglevel)
         ret = []
         if is_truthy(return_stdout):
-            ret.append(stdout.rstrip("\n"))
+            ret.append(stdout.rstrip("\n") if is_string(stdout) else stdout)
         if is_truthy(return_stderr):
-            ret.append(stderr.rstrip("\n"))
+            ret.append(stderr.rstrip("\n") if is_string(stderr) else stderr)
         if is_truthy(return_rc):
             ret.append(rc)
         if len(ret) == 1:
@@ -1562,7 +1916,135 @@ class SSHLibrary:
         return ret
 
     @keyword(tags=("command",))
-    def write(self, text, loglevel=None):
+    def open_shell(self, name, term_type=None, width=None, height=None, prompt=None):
+        """Opens a new interactive shell ``name`` on the current connection.
+
+        The opened shell becomes the current shell used by `Write`, `Read`
+        and other keywords described in the `Interactive shells` section.
+        All shells share the same connection, so opening a shell is much
+        cheaper than opening a new connection with its own handshake and
+        authentication.
+
+        Each shell has its own pseudo terminal, its own buffer of read but
+        not yet consumed output and its own prompt. ``term_type``,
+        ``width``, ``height`` and ``prompt`` default to the `configuration`
+        of the connection. A shell opened without ``width`` and ``height``
+        follows the terminal size of the connection also when it is changed
+        with `Set Client Configuration`.
+
+        Output printed by the new shell, such as its prompt, is not read by
+        this keyword.
+
+        The shell that `Login` reads from is called ``default``. It is
+        opened automatically when it is needed and no other shell is open.
+
+        Example:
+        | `Open Connection`   | my.server.com       | prompt=$       |
+        | `Login`             | johndoe             | secretpasswd   |
+        | `Open Shell`        | logs                | width=200      |
+        | `Read Until Prompt` |
+        | `Write`             | tail -f /var/log/messages |
+        | `Switch Shell`      | default             |
+        | `Write`             | service myapp restart |
+        | `Read Until`        | Started myapp       | shell=logs     | # Read from the logs shell |
+
+        New in SSHLibrary 3.9.0.
+        """
+        self._run_shell_command(self.current.open_shell, name, term_type, width, height, prompt)
+
+    @keyword(tags=("command",))
+    def switch_shell(self, name):
+        """Makes shell ``name`` the current shell of the current connection.
+
+        The shell must have been opened with `Open Shell` or be the
+        ``default`` shell opened by `Login`. Returns the name of the
+        previous current shell, which can be used to switch back to it.
+
+        Instead of switching shells, keywords reading from and writing to
+        shells accept ``shell`` argument for using another than the current
+        shell. See `Open Shell` for an example.
+
+        New in SSHLibrary 3.9.0.
+        """
+        return self._run_shell_command(self.current.switch_shell, name)
+
+    @keyword(tags=("command",))
+    def close_shell(self, name=None):
+        """Closes shell ``name`` or the current shell by default.
+
+        If the current shell is closed, another shell must be made current
+        with `Switch Shell` or `Open Shell`. If no shell is open, the
+        ``default`` shell is opened again when it is needed.
+
+        New in SSHLibrary 3.9.0.
+        """
+        self._run_shell_command(self.current.close_shell, name)
+
+    @keyword(tags=("command",))
+    def start_shell_transcript(self, path, format=None, shell=None):
+        """Starts writing everything the current shell receives to local file ``path``.
+
+        Output is appended to the file by a background thread as soon as
+        it is read from the server by any of the reading keywords, so a long
+        console session can be recorded fully even if only parts of it are
+        logged or the `max buffer size` discards old output from memory.
+        The text written by the keywords is not recorded separately, but
+        it is included if the server echoes it.
+
+        ``format`` can be ``text`` or ``asciicast``. In the ``text`` format
+        each line is prefixed with the time it was received. The
+        ``asciicast`` format is the
+        [https://docs.asciinema.org/manual/asciicast/v2/|asciicast v2]
+        format that can be replayed with the original timing using
+        [https://asciinema.org|asciinema]. By default ``asciicast`` is used
+        if ``path`` has ``.cast`` extension and ``text`` otherwise. An
+        existing ``text`` transcript is appended to, but an existing
+        ``asciicast`` transcript is overwritten, because an asciicast file
+        can contain only one recording.
+
+        ``shell`` can be used for recording another than the current shell,
+        see `Open Shell`. The transcript is stopped with `Stop Shell
+        Transcript` or when the shell or the connection is closed.
+
+        Example:
+        | `Start Shell Transcript` | ${OUTPUT DIR}/console.cast |
+        | `Write`                  | ./install.sh               |
+        | `Read Until`             | Installation complete      | loglevel=NONE |
+        | `Stop Shell Transcript`  |
+
+        New in SSHLibrary 3.9.0.
+        """
+        self._run_shell_command(self._in_shell, shell, self.current.start_transcript, path, format)
+        self._log(f'Writing shell transcript to <a href="{path}">{path}</a>.', "HTML")
+
+    @keyword(tags=("command",))
+    def stop_shell_transcript(self, shell=None):
+        """Stops the transcript started with `Start Shell Transcript`.
+
+        Returns the path to the transcript file. ``shell`` can be used for
+        stopping the transcript of another than the current shell.
+
+        New in SSHLibrary 3.9.0.
+        """
+        return self._run_shell_command(self._in_shell, shell, self.current.stop_transcript)
+
+    def _run_shell_command(self, command, *args):
+        try:
+            return command(*args)
+        except SSHClientException as e:
+            raise RuntimeError(e)
+
+    def _in_shell(self, shell, method, *args):
+        if not shell:
+            return method(*args)
+        previous = self.current.switch_shell(shell)
+        try:
+            return method(*args)
+        finally:
+            self.current.switch_shell(previous)
+
+    @keyword(tags=("command",))
+    def write(self, text, loglevel=None, shell=None):
         """Writes the given ``text`` on the remote machine and appends a newline.
 
         Appended `newline` can be configured.
@@ -1584,13 +2066,16 @@ class SSHLibrary:
         | ${output}=           | `Read`          |
         | `Should Contain`     | ${output}       | su: Authentication failure |
 
+        ``shell`` can be used for writing to another than the current
+        shell, see `Open Shell`. It is new in SSHLibrary 3.9.0.
+
         See also `Write Bare`.
         """
-        self._write(text, add_newline=True)
-        return self._read_and_log(loglevel, self.current.read_until_newline)
+        self._write(text, add_newline=True, shell=shell)
+        return self._read_and_log(loglevel, self._in_shell, shell, self.current.read_until_newline)
 
     @keyword(tags=("command",))
-    def write_bare(self, text):
+    def write_bare(self, text, shell=None):
         """Writes the given ``text`` on the remote machine without appending a newline.
 
         Unlike `Write`, this keyword returns and consumes nothing. See the
@@ -1605,13 +2090,16 @@ class SSHLibrary:
         | ${output}=       | `Read`           |
         | `Should Contain` | ${output}        | su: Authentication failure |
 
+        ``shell`` can be used for writing to another than the current
+        shell, see `Open Shell`. It is new in SSHLibrary 3.9.0.
+
         See also `Write`.
         """
-        self._write(text)
+        self._write(text, shell=shell)
 
-    def _write(self, text, add_newline=False):
+    def _write(self, text, add_newline=False, shell=None):
         try:
-            self.current.write(text, is_truthy(add_newline))
+            self._in_shell(shell, self.current.write, text, is_truthy(add_newline))
         except SSHClientException as e:
             raise RuntimeError(e)
 
@@ -1652,7 +2140,7 @@ class SSHLibrary:
         )
 
     @keyword(tags=("command",))
-    def read(self, loglevel=None, delay=None):
+    def read(self, loglevel=None, delay=None, shell=None, quiet_period=None):
         """Consumes and returns everything available on the server output.
 
         If ``delay`` is given, this keyword waits that amount of time and
@@ -1660,6 +2148,14 @@ class SSHLibrary:
         further reads return more output or the default `timeout` expires.
         ``delay`` must be given in Robot Framework's `time format`.
 
+        If ``quiet_period`` is given, this keyword instead reads until no
+        output has arrived for ``quiet_period``, measured from the last
+        received output, or the default `timeout` expires. Unlike with
+        ``delay``, output is read as soon as it arrives, so the keyword
+        returns ``quiet_period`` after the output has ended and waits
+        longer only if the output continues. ``quiet_period`` must be given
+        in Robot Framework's `time format` and is new in SSHLibrary 3.9.0.
+
         This keyword is most useful for reading everything from
         the server output, thus clearing it.
 
@@ -1676,13 +2172,16 @@ class SSHLibrary:
         | ${output}=        | `Read`        | loglevel=WARN | # Shown in the console due to loglevel |
         | `Should Contain`  | ${output}     | root@                        |
 
+        ``shell`` can be used for reading from another than the current
+        shell, see `Open Shell`. It is new in SSHLibrary 3.9.0.
+
         See `interactive shells` for more information about writing and
         reading in general.
         """
-        return self._read_and_log(loglevel, self.current.read, delay)
+        return self._read_and_log(loglevel, self._in_shell, shell, self.current.read, delay, quiet_period)
 
     @keyword(tags=("command",))
-    def read_until(self, expected, loglevel=None):
+    def read_until(self, expected, loglevel=None, shell=None):
         """Consumes and returns the server output until ``expected`` is encountered.
 
         Text up until and including the ``expected`` will be returned.
@@ -1702,14 +2201,159 @@ class SSHLibrary:
         | ${output}=        | `Read Until`  | @                            |
         | `Should End With` | ${output}     | root@                        |
 
+        ``shell`` can be used for reading from another than the current
+        shell, see `Open Shell`. It is new in SSHLibrary 3.9.0.
+
         See also `Read Until Prompt` and `Read Until Regexp` keywords. For
         more details about reading and writing in general, see the
         `Interactive shells` section.
         """
-        return self._read_and_log(loglevel, self.current.read_until, expected)
+        return self._read_and_log(loglevel, self._in_shell, shell, self.current.read_until, expected)
+
+    @keyword(tags=("command",))
+    def read_until_any(self, *patterns, loglevel=None, shell=None):
+        """Consumes the server output until any of the ``patterns`` is found
+        and returns the index of the found pattern and the output.
+
+        ``patterns`` are literal texts like with `Read Until` by default.
+        Patterns starting with ``REGEXP:`` are regular expressions like
+        with `Read Until Regexp`. See the `Regular expressions` section for
+        more details about their syntax.
+
+        The output is scanned once for all the patterns, so waiting for
+        several alternatives does not cost more than waiting for one.
+        If several patterns match, the one whose match starts first in the
+        output is returned. The returned index is zero-based and the
+        returned output contains text up until and including the match.
+
+        If the `timeout` expires before any of the patterns is found, this
+        keyword fails.
+
+        The read output is logged. ``loglevel`` can be used to override
+        the default `log level`.
+
+        Example:
+        | `Write`          | ssh admin@device |
+        | ${index}         | ${output} =      | `Read Until Any` | password: | (yes/no)? | REGEXP:[#>] |
+        | `Run Keyword If` | ${index} == 1    | `Write`          | yes       |
+
+        ``shell`` can be used for reading from another than the current
+        shell, see `Open Shell`.
+
+        See also `Run Dialog` for running whole interactive flows. For more
+        details about reading and writing in general, see the `Interactive
+        shells` section.
+
+        New in SSHLibrary 3.9.0.
+        """
+        try:
+            index, output = self._in_shell(shell, self.current.read_until_any, patterns)
+        except SSHClientException as e:
+            raise RuntimeError(e)
+        self._log(output, loglevel)
+        return index, output
+
+    @keyword(tags=("command",))
+    def run_dialog(self, *steps, fail_on=None, loglevel=None):
+        """Runs an interactive dialog consisting of ``steps`` in the current shell.
+
+        Each step is a dictionary with the following keys:
+
+        - ``expect``: Text to wait for. Texts starting with ``REGEXP:`` are
+          regular expressions. Mandatory.
+        - ``send``: Text to write after ``expect`` has been found. The
+          configured `newline` is added. Nothing is written if not given.
+        - ``timeout``: Time to wait for ``expect``. Defaults to the
+          connection `timeout`.
+        - ``name``: Name of the step. Defaults to the index of the step.
+        - ``next``: Name of the step to continue with or ``END`` to end the
+          dialog. By default the dialog continues with the next step.
+
+        The whole dialog runs in one keyword call, which avoids the overhead
+        of separate `Write` and `Read Until` keywords. Steps sharing the same
+        ``name`` are alternatives: the dialog waits for any of their
+        ``expect`` patterns and continues with the step that matched. Using
+        ``name`` and ``next`` dialogs can thus be written as state machines.
+
+        The keyword fails if a step times out or if output matching any of
+        the ``fail_on`` patterns is encountered. ``fail_on`` can be a single
+        pattern or a list of patterns, using the same syntax as ``expect``.
+
+        Returns the transcript of the dialog as a list of dictionaries, one
+        per executed step, containing ``step`` (the index of the step),
+        ``name``, ``expect``, ``output``, ``sent`` and ``elapsed`` (seconds
+        spent waiting for the output). The transcript is logged.
+        ``loglevel`` can be used to override the default `log level`.
+
+        Example:
+        | &{login} =      | `Create Dictionary` | expect=login:      | send=admin  |
+        | &{password} =   | `Create Dictionary` | expect=Password:   | send=secret | timeout=10s |
+        | &{yes no} =     | `Create Dictionary` | expect=(y/n)       | send=y      | name=menu   | next=menu |
+        | &{prompt} =     | `Create Dictionary` | expect=REGEXP:[#>] | name=menu   |
+        | ${transcript} = | `Run Dialog`        | ${login}           | ${password} | ${yes no}   | ${prompt} | fail_on=Login incorrect |
+
+        New in SSHLibrary 3.9.0.
+        """
+        try:
+            transcript = self.current.run_dialog(steps, fail_on)
+        except SSHClientException as e:
+            raise RuntimeError(e)
+        self._log("\n".join(
+            f"Step {item['name']}: found '{item['expect']}' after {item['elapsed']} seconds, "
+            f"sent {item['sent']!r}." for item in transcript), loglevel)
+        return transcript
 
     @keyword(tags=("command",))
-    def read_until_prompt(self, loglevel=None, strip_prompt=False):
+    def read_until_in_any_connection(self, expected, *connections, timeout=None, loglevel=None):
+        """Consumes the server output of several connections until ``expected``
+        is found in any of them.
+
+        ``connections`` are indices or aliases of the connections to read
+        from. By default all open connections that have a shell open are
+        used, so connections used only for `Execute Command` or not logged
+        in are skipped. The current shell of each connection is read, see
+        `Open Shell` for more information about shells.
+
+        ``expected`` is a literal text like with `Read Until` by default.
+        Texts starting with ``REGEXP:`` are regular expressions like with
+        `Read Until Regexp`.
+
+        All the connections are waited on at the same time, so the keyword
+        returns as soon as the matching output arrives to any of them. The
+        keyword returns the alias of the matching connection, or its index
+        if it has no alias, the output up until and including ``expected``
+        and the time the output was received as seconds since the epoch.
+        Only the returned output is consumed. Output read from the other
+        connections is left to be read by the other reading keywords.
+
+        If ``timeout`` expires before ``expected`` is found, this keyword
+        fails. ``timeout`` defaults to the longest `timeout` of the
+        connections and must be given in Robot Framework's `time format`.
+
+        The read output is logged. ``loglevel`` can be used to override
+        the default `log level`.
+
+        Example:
+        | ${leader} | ${output} | ${time} = | `Read Until In Any Connection` | became leader | node1 | node2 | node3 | timeout=1 min |
+        | `Switch Connection` | ${leader} |
+        | `Write`             | stop      |
+
+        New in SSHLibrary 3.9.0.
+        """
+        if connections:
+            clients = [self._connections.get_connection(connection) for connection in connections]
+        else:
+            clients = [client for client in self._connections._connections
+                       if client and client.shell_is_open]
+        try:
+            client, output, received = SSHClient.read_until_in_any(clients, expected, timeout)
+        except SSHClientException as e:
+            raise RuntimeError(e)
+        self._log(output, loglevel)
+        return client.config.alias or client.config.index, output, received
+
+    @keyword(tags=("command",))
+    def read_until_prompt(self, loglevel=None, strip_prompt=False, shell=None):
         """Consumes and returns the server output until the prompt is found.
 
         Text up and until prompt is returned. The `prompt` must be set before
@@ -1742,14 +2386,18 @@ class SSHLibrary:
         make sure that the expression spans the whole prompt, because only the part of the
         output that matches the regular expression is stripped away.
 
-        ``strip_prompt`` argument is new in SSHLibrary 3.2.0.
+        ``shell`` can be used for reading from another than the current
+        shell, see `Open Shell`. The prompt of that shell is used.
+
+        ``strip_prompt`` argument is new in SSHLibrary 3.2.0 and ``shell``
+        in SSHLibrary 3.9.0.
         """
         return self._read_and_log(
-            loglevel, self.current.read_until_prompt, is_truthy(strip_prompt)
+            loglevel, self._in_shell, shell, self.current.read_until_prompt, is_truthy(strip_prompt)
         )
 
     @keyword(tags=("command",))
-    def read_until_regexp(self, regexp, loglevel=None):
+    def read_until_regexp(self, regexp, loglevel=None, shell=None):
         """Consumes and returns the server output until a match to ``regexp`` is found.
 
         ``regexp`` can be a regular expression pattern or a compiled regular
@@ -1773,35 +2421,35 @@ class SSHLibrary:
         | ${output}=        | `Read Until Regexp` | .*@                          |
         | `Should Contain`  | ${output}           | root@                        |
 
+        ``shell`` can be used for reading from another than the current
+        shell, see `Open Shell`. It is new in SSHLibrary 3.9.0.
+
         See also `Read Until` and `Read Until Prompt` keywords. For more
         details about reading and writing in general, see the `Interactive
         shells` section.
         """
-        return self._read_and_log(loglevel, self.current.read_until_regexp, regexp)
+        return self._read_and_log(loglevel, self._in_shell, shell, self.current.read_until_regexp, regexp)
 
     def _read_and_log(self, loglevel, reader, *args):
         try:
             output = reader(*args)
         except SSHClientException as e:
-            if is_truthy(self.current.config.escape_ansi):
-                message = self._escape_ansi_sequences(e.args[0])
-                raise RuntimeError(message)
             raise RuntimeError(e)
-        if is_truthy(self.current.config.escape_ansi):
-            output = self._escape_ansi_sequences(output)
         self._log(output, loglevel)
         return output
 
-    @staticmethod
-    def _escape_ansi_sequences(output):
-        ansi_escape = re.compile(
-            r"(?:\x1B[@-_]|[\x80-\x9F])[0-?]*[ -/]*[@-~]", flags=re.IGNORECASE
-        )
-        output = ansi_escape.sub("", output)
-        return (f"{output!r}")[1:-1].encode().decode("unicode-escape")
-
     @keyword(tags=("file",))
-    def get_file(self, source, destination=".", scp="OFF", scp_preserve_times=False):
+    def get_file(
+        self,
+        source,
+        destination=".",
+        scp="OFF",
+        scp_preserve_times=False,
+        parallel_transfers=None,
+        resume=False,
+        segments=None,
+        segment_size=None,
+    ):
         """Downloads file(s) from the remote machine to the local machine.
 
         ``source`` is a path on the remote machine. Both absolute paths and
@@ -1820,10 +2468,23 @@ class SSHLibrary:
         ``scp_preserve_times`` preserve modification time and access time
         of transferred files and directories.
 
+        ``parallel_transfers`` is the maximum number of files transferred at
+        the same time. Defaults to the connection specific value. See
+        `Parallel transfers` for more details.
+
+        ``resume`` continues interrupted downloads. See `Resuming transfers`
+        for more details.
+
+        ``segments`` and ``segment_size`` split large files into segments
+        downloaded at the same time. See `Segmented transfers` for more
+        details.
+
         Examples:
         | `Get File` | /var/log/auth.log | /tmp/                      |
         | `Get File` | /tmp/example.txt  | C:\\\\temp\\\\new_name.txt |
         | `Get File` | /path/to/*.txt    |
+        | `Get File` | /tmp/large.iso    | /tmp/                      | resume=checksum |
+        | `Get File` | /tmp/large.iso    | /tmp/                      | segments=4      |
 
         The local ``destination`` is created using the rules explained below:
 
@@ -1853,9 +2514,19 @@ class SSHLibrary:
         See also `Get Directory`.
 
         ``scp_preserve_times`` is new in SSHLibrary 3.6.0.
+        ``parallel_transfers``, ``resume``, ``segments`` and ``segment_size``
+        are new in SSHLibrary 3.9.0.
         """
         return self._run_command(
-            self.current.get_file, source, destination, scp, scp_preserve_times
+            self.current.get_file,
+            source,
+            destination,
+            scp,
+            scp_preserve_times,
+            parallel_transfers,
+            resume,
+            segments,
+            segment_size,
         )
 
     @keyword(tags=("file",))
@@ -1866,6 +2537,8 @@ class SSHLibrary:
         recursive=False,
         scp="OFF",
         scp_preserve_times=False,
+        parallel_transfers=None,
+        compression=None,
     ):
         """Downloads a directory, including its content, from the remote machine to the local machine.
 
@@ -1886,11 +2559,20 @@ class SSHLibrary:
         ``scp_preserve_times`` preserve modification time and access time
         of transferred files and directories.
 
+        ``parallel_transfers`` is the maximum number of files transferred at
+        the same time. Defaults to the connection specific value. See
+        `Parallel transfers` for more details.
+
+        ``compression`` compresses the directory when it is transferred with
+        ``scp=TAR``. The only supported value is ``gzip``. See
+        `Transfer directories with tar` for more details.
+
         Examples:
         | `Get Directory` | /var/logs      | /tmp                |
         | `Get Directory` | /var/logs      | /tmp/non/existing   |
         | `Get Directory` | /var/logs      |
         | `Get Directory` | /var/logs      | recursive=True      |
+        | `Get Directory` | /var/logs      | recursive=True      | scp=TAR | compression=gzip |
 
         The local ``destination`` is created as following:
 
@@ -1910,6 +2592,8 @@ class SSHLibrary:
         See also `Get File`.
 
         ``scp_preserve_times`` is new in SSHLibrary 3.6.0.
+        ``parallel_transfers``, ``compression`` and ``scp=TAR`` are new in
+        SSHLibrary 3.9.0.
         """
         return self._run_command(
             self.current.get_directory,
@@ -1918,6 +2602,8 @@ class SSHLibrary:
             is_truthy(recursive),
             scp,
             scp_preserve_times,
+            parallel_transfers,
+            compression if is_truthy(compression) else None,
         )
 
     @keyword(tags=("file",))
@@ -1929,6 +2615,10 @@ class SSHLibrary:
         newline="",
         scp="OFF",
         scp_preserve_times=False,
+        parallel_transfers=None,
+        resume=False,
+        segments=None,
+        segment_size=None,
     ):
         """Uploads file(s) from the local machine to the remote machine.
 
@@ -1957,11 +2647,24 @@ class SSHLibrary:
         ``scp_preserve_times`` preserve modification time and access time
         of transferred files and directories.
 
+        ``parallel_transfers`` is the maximum number of files transferred at
+        the same time. Defaults to the connection specific value. See
+        `Parallel transfers` for more details.
+
+        ``resume`` continues interrupted uploads. See `Resuming transfers`
+        for more details.
+
+        ``segments`` and ``segment_size`` split large files into segments
+        uploaded at the same time. See `Segmented transfers` for more
+        details.
+
         Examples:
         | `Put File` | /path/to/*.txt          |
         | `Put File` | /path/to/*.txt          | /home/groups/robot | mode=0770 |
         | `Put File` | /path/to/*.txt          | /home/groups/robot | mode=None |
         | `Put File` | /path/to/*.txt          | newline=CRLF       |
+        | `Put File` | /path/to/large.iso      | /tmp/              | resume=True |
+        | `Put File` | /path/to/large.iso      | /tmp/              | segments=4  | segment_size=67108864 |
 
         The remote ``destination`` is created as following:
 
@@ -1986,6 +2689,8 @@ class SSHLibrary:
         See also `Put Directory`.
 
         ``scp_preserve_times`` is new in SSHLibrary 3.6.0.
+        ``parallel_transfers``, ``resume``, ``segments`` and ``segment_size``
+        are new in SSHLibrary 3.9.0.
         """
         return self._run_command(
             self.current.put_file,
@@ -1995,6 +2700,10 @@ class SSHLibrary:
             newline,
             scp,
             scp_preserve_times,
+            parallel_transfers,
+            resume,
+            segments,
+            segment_size,
         )
 
     @keyword(tags=("file",))
@@ -2007,6 +2716,9 @@ class SSHLibrary:
         recursive=False,
         scp="OFF",
         scp_preserve_times=False,
+        parallel_transfers=None,
+        newline_pattern=None,
+        compression=None,
     ):
         """Uploads a directory, including its content, from the local machine to the remote machine.
 
@@ -2025,6 +2737,11 @@ class SSHLibrary:
         written to the remote files. Valid values are ``LF`` and ``CRLF``.
         Does not work if ``scp`` is enabled.
 
+        ``newline_pattern`` limits the ``newline`` conversion to the files
+        whose name matches the given pattern (see `glob patterns`). Other
+        files, for example binary files in the same directory, are uploaded
+        unchanged. By default the conversion applies to all files.
+
         ``recursive`` specifies whether to recursively upload all
         subdirectories inside ``source``. Subdirectories are uploaded if the
         argument value evaluates to true (see `Boolean arguments`).
@@ -2035,13 +2752,23 @@ class SSHLibrary:
         ``scp_preserve_times`` preserve modification time and access time
         of transferred files and directories.
 
+        ``parallel_transfers`` is the maximum number of files transferred at
+        the same time. Defaults to the connection specific value. See
+        `Parallel transfers` for more details.
+
+        ``compression`` compresses the directory when it is transferred with
+        ``scp=TAR``. The only supported value is ``gzip``. See
+        `Transfer directories with tar` for more details.
+
         Examples:
         | `Put Directory` | /var/logs | /tmp               |
         | `Put Directory` | /var/logs | /tmp/non/existing  |
         | `Put Directory` | /var/logs |
         | `Put Directory` | /var/logs | recursive=True     |
         | `Put Directory` | /var/logs | /home/groups/robot | mode=0770 |
-        | `Put Directory` | /var/logs | newline=CRLF       |Get File With SCP (transfer) And Preserve Time
+        | `Put Directory` | /var/logs | newline=CRLF       |
+        | `Put Directory` | /var/logs | newline=CRLF       | newline_pattern=*.txt |
+        | `Put Directory` | /var/logs | recursive=True     | scp=TAR   | compression=gzip |
 
         The remote ``destination`` is created as following:
 
@@ -2058,6 +2785,8 @@ class SSHLibrary:
         See also `Put File`.
 
         ``scp_preserve_times`` is new in SSHLibrary 3.6.0.
+        ``parallel_transfers``, ``newline_pattern``, ``compression`` and
+        ``scp=TAR`` are new in SSHLibrary 3.9.0.
         """
         return self._run_command(
             self.current.put_directory,
@@ -2068,6 +2797,9 @@ class SSHLibrary:
             is_truthy(recursive),
             scp,
             scp_preserve_times,
+            parallel_transfers,
+            newline_pattern,
+            compression if is_truthy(compression) else None,
         )
 
     def _run_command(self, command, *args):
@@ -2159,7 +2891,10 @@ class SSHLibrary:
         By default, the item names are returned relative to the given
         remote path (e.g. ``file.txt``). If you want them be returned in the
         absolute format (e.g. ``/home/johndoe/file.txt``), set the
-        ``absolute`` argument to any non-empty string.
+        ``absolute`` argument to any non-empty string. The absolute path of
+        ``path`` is resolved only once per connection, so if ``path`` goes
+        through a symlink that is later changed, the returned paths still
+        use the original target.
 
         If ``pattern`` is given, only items matching it are returned. The
         pattern is a glob pattern and its syntax is explained in the
@@ -2193,7 +2928,6 @@ class SSHLibrary:
             files = self.current.list_files_in_dir(path, pattern, absolute)
         except SSHClientException as msg:
             raise RuntimeError(msg)
-        files = self.current.list_files_in_dir(path, pattern, absolute)
         self._log(
             "{0} file{1}:\n{2}".format(
                 len(files), plural_or_not(files), "\n".join(files)
@@ -2233,6 +2967,9 @@ class _DefaultConfiguration(Configuration):
         encoding,
         escape_ansi,
         encoding_errors,
+        max_buffer_size,
+        parallel_transfers,
+        block_size,
     ):
         super(_DefaultConfiguration, self).__init__(
             timeout=TimeEntry(timeout),
@@ -2246,4 +2983,7 @@ class _DefaultConfiguration(Configuration):
             encoding=StringEntry(encoding),
             escape_ansi=StringEntry(escape_ansi),
             encoding_errors=StringEntry(encoding_errors),
+            max_buffer_size=IntegerEntry(max_buffer_size),
+            parallel_transfers=IntegerEntry(parallel_transfers),
+            block_size=IntegerEntry(block_size),
         )
@@ -0,0 +1,202 @@
+#  Copyright 2008-2015 Nokia Networks
+#  Copyright 2016-     Robot Framework Foundation
+#
+#  Licensed under the Apache License, Version 2.0 (the "License");
+#  you may not use this file except in compliance with the License.
+#  You may obtain a copy of the License at
+#
+#      http://www.apache.org/licenses/LICENSE-2.0
+#
+#  Unless required by applicable law or agreed to in writing, software
+#  distributed under the License is distributed on an "AS IS" BASIS,
+#  WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+#  See the License for the specific language governing permissions and
+#  limitations under the License.
+
+import csv
+import json
+import re
+import threading
+import time
+
+from .logger import logger
+
+
+class ResourceSampler(object):
+    """Samples CPU, memory, load and disk I/O of the remote host.
+
+    A single shell loop is started on its own channel. It prints snapshots of
+    the needed `/proc` files at the given interval and a background thread
+    parses them as they arrive. Each snapshot after the first one produces
+    a sample that is kept in memory and optionally written to a CSV or
+    JSON Lines file.
+    """
+
+    FIELDS = ('timestamp', 'cpu_percent', 'iowait_percent', 'memory_used_percent',
+              'memory_used_kb', 'load_1', 'load_5', 'load_15',
+              'disk_read_kb_per_second', 'disk_write_kb_per_second')
+    FORMATS = ('csv', 'json')
+    SECTIONS = (('uptime', 'cat /proc/uptime'),
+                ('stat', 'head -n 1 /proc/stat'),
+                ('meminfo', 'cat /proc/meminfo'),
+                ('loadavg', 'cat /proc/loadavg'),
+                ('diskstats', 'cat /proc/diskstats'))
+    SECTOR_SIZE_KB = 0.5
+    # Virtual and stacked devices whose I/O is also seen on the real disks.
+    _virtual_disk = re.compile(r'^(loop|ram|zram|fd|sr|dm-|md)\d')
+    _partition_suffix = re.compile(r'^p?\d+$')
+
+    def __init__(self, transport, interval, output=None, output_format=None, encoding='utf8'):
+        self._transport = transport
+        self.interval = interval
+        self.output = output
+        self._format = self._get_format(output, output_format)
+        self._encoding = encoding
+        self.samples = []
+        self._channel = None
+        self._thread = None
+        self._file = None
+        self._writer = None
+        self._previous = None
+        self._error = None
+
+    def _get_format(self, output, output_format):
+        if not output_format:
+            output_format = 'json' if output and output.lower().endswith(('.json', '.jsonl')) else 'csv'
+        output_format = output_format.lower()
+        if output_format not in self.FORMATS:
+            raise ValueError(f"Invalid output format '{output_format}'. "
+                             f"Supported values are {' and '.join(self.FORMATS)}.")
+        return output_format
+
+    @property
+    def command(self):
+        snapshot = '; '.join(f'echo "#{name}"; {command}' for name, command in self.SECTIONS)
+        return f'while :; do {snapshot}; echo "#end"; sleep {self.interval:g}; done'
+
+    def start(self):
+        self._channel = self._transport.open_session()
+        try:
+            self._channel.exec_command(self.command)
+            if self.output:
+                self._open_output()
+        except BaseException:
+            self._channel.close()
+            self._channel = None
+            raise
+        self._thread = threading.Thread(target=self._read_samples)
+        self._thread.daemon = True
+        self._thread.start()
+
+    def _open_output(self):
+        self._file = open(self.output, 'w', newline='' if self._format == 'csv' else None)
+        if self._format == 'csv':
+            self._writer = csv.DictWriter(self._file, self.FIELDS)
+            self._writer.writeheader()
+
+    def stop(self):
+        """Stops sampling and returns the summary of the collected samples."""
+        if self._channel:
+            self._channel.close()
+        if self._thread:
+            self._thread.join()
+        if self._file:
+            self._file.close()
+            self._file = None
+        if self._error:
+            logger.warn(f'Resource sampling failed: {self._error}')
+        return self.summary()
+
+    def summary(self):
+        """Returns the number of samples, their time span and the minimum,
+        maximum and mean of each sampled value."""
+        summary = {'samples': len(self.samples),
+                   'duration': round(self.samples[-1]['timestamp'] - self.samples[0]['timestamp'], 3)
+                   if self.samples else 0.0}
+        for field in self.FIELDS[1:]:
+            values = [sample[field] for sample in self.samples if sample[field] is not None]
+            if values:
+                summary[field] = {'min': min(values), 'max': max(values),
+                                  'mean': round(sum(values) / len(values), 2)}
+        return summary
+
+    def _read_samples(self):
+        pending = b''
+        snapshot = {}
+        section = None
+        try:
+            while True:
+                data = self._channel.recv(32768)
+                if not data:
+                    break
+                lines = (pending + data).split(b'\n')
+                pending = lines.pop()
+                for line in lines:
+                    line = line.decode(self._encoding, 'replace')
+                    if line.startswith('#'):
+                        section = line[1:]
+                        if section == 'end':
+                            self._add_snapshot(snapshot)
+                            snapshot = {}
+                        else:
+                            snapshot[section] = []
+                    elif section in snapshot:
+                        snapshot[section].append(line.split())
+        except Exception as error:
+            self._error = error
+
+    def _add_snapshot(self, snapshot):
+        current = self._parse_snapshot(snapshot)
+        if self._previous:
+            sample = self._create_sample(self._previous, current)
+            self.samples.append(sample)
+            if self._writer:
+                self._writer.writerow(sample)
+            elif self._file:
+                self._file.write(json.dumps(sample) + '\n')
+            if self._file:
+                self._file.flush()
+        self._previous = current
+
+    def _parse_snapshot(self, snapshot):
+        cpu = [int(value) for value in snapshot['stat'][0][1:]]
+        meminfo = {fields[0].rstrip(':'): int(fields[1]) for fields in snapshot['meminfo'] if len(fields) > 1}
+        disks = {fields[2]: (int(fields[5]), int(fields[9]))
+                 for fields in snapshot['diskstats'] if len(fields) > 9}
+        return {'uptime': float(snapshot['uptime'][0][0]),
+                'cpu': cpu,
+                'meminfo': meminfo,
+                'load': [float(value) for value in snapshot['loadavg'][0][:3]],
+                'disks': {name: stats for name, stats in disks.items() if self._is_whole_disk(name, disks)}}
+
+    def _is_whole_disk(self, name, disks):
+        if self._virtual_disk.match(name):
+            return False
+        # Partitions, e.g. sda1 or nvme0n1p1, would be counted twice.
+        return not any(name != other and name.startswith(other) and
+                       self._partition_suffix.match(name[len(other):]) for other in disks)
+
+    def _create_sample(self, previous, current):
+        elapsed = max(current['uptime'] - previous['uptime'], 1e-3)
+        cpu = [new - old for new, old in zip(current['cpu'], previous['cpu'])]
+        total = sum(cpu[:8]) or 1
+        idle = cpu[3] + (cpu[4] if len(cpu) > 4 else 0)
+        memory = current['meminfo']
+        available = memory.get('MemAvailable',
+                               memory.get('MemFree', 0) + memory.get('Buffers', 0) + memory.get('Cached', 0))
+        used = memory['MemTotal'] - available
+        read = write = 0
+        for name, (sectors_read, sectors_written) in current['disks'].items():
+            old_read, old_written = previous['disks'].get(name, (sectors_read, sectors_written))
+            read += sectors_read - old_read
+            write += sectors_written - old_written
+        return {'timestamp': round(time.time(), 3),
+                'cpu_percent': round(100.0 * (total - idle) / total, 2),
+                'iowait_percent': round(100.0 * cpu[4] / total, 2) if len(cpu) > 4 else None,
+                'memory_used_percent': round(100.0 * used / memory['MemTotal'], 2),
+                'memory_used_kb': used,
+                'load_1': current['load'][0],
+                'load_5': current['load'][1],
+                'load_15': current['load'][2],
+                'disk_read_kb_per_second': round(read * self.SECTOR_SIZE_KB / elapsed, 2),
+                'disk_write_kb_per_second': round(write * self.SECTOR_SIZE_KB / elapsed, 2)}
@@ -0,0 +1,141 @@
+#  Copyright 2008-2015 Nokia Networks
+#  Copyright 2016-     Robot Framework Foundation
+#
+#  Licensed under the Apache License, Version 2.0 (the "License");
+#  you may not use this file except in compliance with the License.
+#  You may obtain a copy of the License at
+#
+#      http://www.apache.org/licenses/LICENSE-2.0
+#
+#  Unless required by applicable law or agreed to in writing, software
+#  distributed under the License is distributed on an "AS IS" BASIS,
+#  WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+#  See the License for the specific language governing permissions and
+#  limitations under the License.
+
+import codecs
+import json
+import queue
+import threading
+import time
+from datetime import datetime
+
+from .logger import logger
+
+
+class ShellTranscript:
+    """Writes everything received by a shell to a local file.
+
+    Received chunks are queued with the time they were received and written
+    by a background thread, so writing the file does not slow down reading
+    the output. Chunks are decoded separately from the shell using the
+    `replace` error handler, so the transcript never fails because of
+    undecodable output.
+
+    In the `text` format each line is prefixed with the time its first
+    character was received. The `asciicast` format is the asciicast v2
+    format of asciinema, which can be replayed with the timing of the
+    original session. Text transcripts are appended to an existing file,
+    asciicast transcripts overwrite it because the format allows only one
+    header.
+
+    If writing the file fails, the transcript stops accepting output and
+    the error is logged as a warning when it is closed.
+    """
+
+    FORMATS = ('text', 'asciicast')
+
+    def __init__(self, path, output_format=None, encoding='utf8', width=80, height=24, term_type=None):
+        self.path = path
+        self._format = self._get_format(path, output_format)
+        self._decoder = codecs.getincrementaldecoder(encoding)('replace')
+        self._width = width
+        self._height = height
+        self._term_type = term_type
+        self._queue = queue.Queue()
+        self._thread = None
+        self._file = None
+        self._start_time = None
+        self._line_start = True
+        self._error = None
+
+    def _get_format(self, path, output_format):
+        if not output_format:
+            output_format = 'asciicast' if path.lower().endswith('.cast') else 'text'
+        output_format = output_format.lower()
+        if output_format not in self.FORMATS:
+            raise ValueError(f"Invalid transcript format '{output_format}'. "
+                             f"Supported values are {' and '.join(self.FORMATS)}.")
+        return output_format
+
+    def start(self):
+        self._start_time = time.time()
+        self._file = open(self.path, 'w' if self._format == 'asciicast' else 'a', encoding='utf8')
+        if self._format == 'asciicast':
+            header = {'version': 2, 'width': self._width, 'height': self._height,
+                      'timestamp': int(self._start_time)}
+            if self._term_type:
+                header['env'] = {'TERM': self._term_type}
+            self._file.write(json.dumps(header) + '\n')
+            self._file.flush()
+        self._thread = threading.Thread(target=self._write_chunks)
+        self._thread.daemon = True
+        self._thread.start()
+
+    def write(self, data):
+        """Queues received bytes to be written to the transcript.
+
+        Nothing is queued after writing the file has failed.
+        """
+        if self._error is None:
+            self._queue.put((time.time(), data))
+
+    def close(self):
+        """Writes the queued chunks and closes the file."""
+        if self._thread:
+            self._queue.put(None)
+            self._thread.join()
+            self._thread = None
+        if self._file:
+            self._file.close()
+            self._file = None
+        if self._error:
+            logger.warn(f"Writing transcript '{self.path}' failed: {self._error}")
+
+    def _write_chunks(self):
+        try:
+            while True:
+                item = self._queue.get()
+                while item is not None:
+                    self._write_chunk(*item)
+                    try:
+                        item = self._queue.get_nowait()
+                    except queue.Empty:
+                        break
+                self._file.flush()
+                if item is None:
+                    break
+        except Exception as error:
+            self._error = error
+
+    def _write_chunk(self, received, data):
+        text = self._decoder.decode(data)
+        if not text:
+            return
+        if self._format == 'asciicast':
+            event = [round(received - self._start_time, 6), 'o', text]
+            self._file.write(json.dumps(event, ensure_ascii=False) + '\n')
+        else:
+            self._file.write(self._add_timestamps(received, text))
+
+    def _add_timestamps(self, received, text):
+        timestamp = datetime.fromtimestamp(received).strftime('[%Y-%m-%d %H:%M:%S.%f')[:-3] + '] '
+        result = []
+        for index, line in enumerate(text.split('\n')):
+            if index:
+                result.append('\n')
+            if line and (index or self._line_start):
+                result.append(timestamp)
+            result.append(line)
+        self._line_start = text.endswith('\n')
+        return ''.join(result)